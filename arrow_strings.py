@@ -0,0 +1,57 @@
+import logging
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  只用于判断是否可用
+except ImportError:
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+_warned = False
+
+
+def arrow_string_dtype() -> Optional[pd.StringDtype]:
+    """pyarrow 存储、空值为 NaN 的字符串类型（即 pandas 3 默认的 str 类型）；不可用时返回 None
+
+    空值仍为 NaN，astype(str)、fillna、to_csv 等的结果与普通字符串列相同。
+    """
+    if pyarrow is None:
+        return None
+    try:
+        return pd.StringDtype('pyarrow', na_value=np.nan)
+    except TypeError:
+        pass
+    try:
+        # pandas 2.1 / 2.2
+        return pd.StringDtype('pyarrow_numpy')
+    except (TypeError, ValueError):
+        return None
+
+
+def to_arrow_strings(df: pd.DataFrame) -> pd.DataFrame:
+    """把只含字符串（和空值）的 object 列转换为 pyarrow 字符串列，strip、正则匹配、去重都在 Arrow 中完成
+
+    pyarrow 未安装或 pandas 版本过低时记录一次警告并原样返回。
+    """
+    global _warned
+    dtype = arrow_string_dtype()
+    if dtype is None:
+        if not _warned:
+            logger.warning("未安装pyarrow或pandas版本低于2.1，无法使用pyarrow字符串列，继续使用普通字符串列")
+            _warned = True
+        return df
+    converted = {}
+    for position, col in enumerate(df.columns):
+        series = df.iloc[:, position]
+        if series.dtype == object and pd.api.types.infer_dtype(series, skipna=True) in ('string', 'empty'):
+            converted[position] = series.astype(dtype)
+    if not converted:
+        return df
+    df = df.copy(deep=False)
+    for position, series in converted.items():
+        df.isetitem(position, series)
+    return df
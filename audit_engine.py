@@ -0,0 +1,614 @@
+import io
+import os
+
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from arrow_strings import to_arrow_strings
+from csv_loader import read_csv
+
+GROUP_COLS = ['设备类型', '同类型设备号']
+
+# 取值很少、审核前转换为分类类型的列（分组列另由 normalize_group_cols 转换）
+CATEGORY_COLS = ['量测类型', '是否控制']
+_CATEGORY_TYPES = {'string', 'integer', 'floating', 'boolean', 'empty'}
+
+
+class AuditFindings:
+    """一个文件的审核结果：每条记录对应一条规则（或规则在某个分组上）的问题，行号已汇总"""
+
+    def __init__(self, file_name: str):
+        self.file_name = file_name
+        self.items: List[Dict] = []
+
+    def add(self, rule: str, message: str, rows=None, level: str = "ERROR"):
+        """记录一条问题；rows 为CSV中的行号（含表头，从2开始），按给定顺序输出，None 表示不涉及行号"""
+        self.items.append({
+            'rule': rule,
+            'level': level,
+            'message': message,
+            'rows': [int(row) for row in rows] if rows is not None else None,
+        })
+
+    @property
+    def has_error(self) -> bool:
+        return any(item['level'] == "ERROR" for item in self.items)
+
+    def rows_by_rule(self) -> Dict[str, List[int]]:
+        """按规则汇总所有问题行号"""
+        result: Dict[str, List[int]] = {}
+        for item in self.items:
+            result.setdefault(item['rule'], []).extend(item['rows'] or [])
+        return result
+
+    def messages(self) -> Iterator[Tuple[str, str]]:
+        """逐条生成 (级别, 日志文本)"""
+        for item in self.items:
+            if item['rows'] is not None:
+                yield item['level'], f"{item['message']}，行号: {','.join(map(str, item['rows']))}"
+            else:
+                yield item['level'], item['message']
+        if not self.has_error:
+            yield "INFO", f"{self.file_name}: 审核通过，无错误。"
+
+
+def read_audit_csv(file_path: str, arrow_strings: bool = False, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """读取待审核的CSV；arrow_strings 为真时字符串列转换为 pyarrow 字符串列，columns 不为空时只读取其中存在的列"""
+    df = read_csv(file_path, usecols=(lambda col: col in columns) if columns is not None else None)
+    return to_arrow_strings(df) if arrow_strings else df
+
+
+# read_csv 默认识别为空值的字符串
+CSV_NA_VALUES = frozenset([
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+])
+CSV_BOOL_VALUES = {'True': True, 'TRUE': True, 'true': True, 'False': False, 'FALSE': False, 'false': False}
+_INT_PATTERN = r'\s*[+-]?\d+\s*'
+
+
+def as_csv_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """把内存中的转换结果变成“写出CSV再用 read_csv 读回”时的样子，不经过文件
+
+    包括空值字符串识别、整数/浮点/布尔类型推断、重名列改名以及从0开始的行索引，
+    这样直接审核内存数据与审核写出的CSV结果一致。
+    """
+    columns = {}
+    for position, name in enumerate(_csv_column_names(df.columns)):
+        columns[name] = _csv_column(df.iloc[:, position])
+    return pd.DataFrame(columns, index=pd.RangeIndex(len(df)))
+
+
+def _csv_column_names(columns) -> List[str]:
+    """表头写出再读回后的列名（空列名变为 Unnamed: i，重名列加 .1、.2 后缀）"""
+    names = []
+    seen = set()
+    for position, col in enumerate(columns):
+        name = '' if col is None or (isinstance(col, float) and np.isnan(col)) else str(col)
+        if name == '':
+            name = f"Unnamed: {position}"
+        base, count = name, 0
+        while name in seen:
+            count += 1
+            name = f"{base}.{count}"
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+def _csv_column(series: pd.Series) -> pd.Series:
+    dtype = series.dtype
+    if dtype == np.bool_ or dtype == np.float64:
+        return series.reset_index(drop=True)
+    if pd.api.types.is_integer_dtype(dtype) and isinstance(dtype, np.dtype):
+        return series.astype(np.int64).reset_index(drop=True)
+
+    # 其余列按写出的文本推断类型；推断只在不同取值上进行，再按编码还原到每一行
+    values = series.to_numpy(dtype=object)
+    if pd.api.types.infer_dtype(values, skipna=True) != 'string':
+        values = np.array([val if isinstance(val, str) or pd.isna(val) else str(val) for val in values], dtype=object)
+    # 编码 -1（空值）对应各取值数组末尾追加的空值项
+    codes, uniques = pd.factorize(values)
+    uniques = np.asarray(uniques, dtype=object)
+    unique_missing = pd.Series(uniques, dtype=object).isin(CSV_NA_VALUES).to_numpy()
+    missing = np.append(unique_missing, True)[codes]
+    present = uniques[~unique_missing]
+    if missing.all():
+        return pd.Series(np.nan, index=pd.RangeIndex(len(values)), dtype=np.float64)
+    if _has_big_int(present):
+        return _csv_parsed_column(series)
+
+    numbers = _parse_int_text(present)
+    if numbers is None:
+        try:
+            numbers = pd.to_numeric(present)  # 遇到非数字文本立即失败，文本列不必全部解析
+        except (ValueError, TypeError):
+            numbers = None
+    if numbers is not None:
+        if numbers.dtype.kind == 'i' and not missing.any():
+            unique_numbers = np.zeros(len(uniques), dtype=np.int64)
+            unique_numbers[~unique_missing] = numbers
+            return pd.Series(unique_numbers[codes])
+        unique_numbers = np.full(len(uniques) + 1, np.nan)
+        unique_numbers[:-1][~unique_missing] = numbers.astype(np.float64)
+        return pd.Series(unique_numbers[codes])
+
+    is_bool = all(val in CSV_BOOL_VALUES for val in present)
+    unique_values = uniques.copy()
+    if is_bool:
+        unique_values[~unique_missing] = [CSV_BOOL_VALUES[val] for val in present]
+    unique_values[unique_missing] = np.nan
+    result = np.append(unique_values, np.nan)[codes]
+    if is_bool:
+        return pd.Series(result, dtype=object) if missing.any() else pd.Series(result.astype(bool))
+    return pd.Series(result)
+
+
+def _parse_int_text(present: np.ndarray) -> Optional[np.ndarray]:
+    """整数文本的快速解析；int() 还接受下划线和非ASCII数字，而 read_csv 不接受，这两种情况交给 to_numeric"""
+    joined = ''.join(present)
+    if not joined.isascii() or '_' in joined:
+        return None
+    try:
+        return present.astype(np.int64)
+    except (ValueError, OverflowError):
+        return None
+
+
+def _has_big_int(present: np.ndarray) -> bool:
+    """是否含超出 int64 范围的整数文本"""
+    lengths = np.fromiter(map(len, present), dtype=np.int64, count=len(present))
+    long_text = pd.Series(present[lengths >= 19], dtype=object)
+    long_ints = long_text[long_text.str.fullmatch(_INT_PATTERN)]
+    return any(not -2 ** 63 <= int(val) < 2 ** 63 for val in long_ints)
+
+
+def _csv_parsed_column(series: pd.Series) -> pd.Series:
+    """直接用 read_csv 解析一列（超大整数的溢出处理规则较多，不逐一模拟；这种列极少出现）"""
+    buffer = io.StringIO()
+    pd.DataFrame({'row': 0, 'value': series.to_numpy(dtype=object)}).to_csv(buffer, index=False)
+    buffer.seek(0)
+    return pd.read_csv(buffer)['value'].rename(None)
+
+
+def csv_rows(df: pd.DataFrame, mask) -> List[int]:
+    """布尔掩码对应的CSV行号（索引+2：表头占第1行）"""
+    return (df.index[np.asarray(mask, dtype=bool)] + 2).tolist()
+
+
+def is_not_zero(val) -> bool:
+    if pd.isna(val):
+        return True
+    try:
+        return float(val) != 0
+    except Exception:
+        return str(val).strip() != '0'
+
+
+def not_zero_mask(series: pd.Series) -> np.ndarray:
+    """与逐行 apply(is_not_zero) 结果相同，但每个不同取值只判断一次"""
+    codes, uniques = pd.factorize(series)
+    flags = np.fromiter((is_not_zero(val) for val in uniques), dtype=bool, count=len(uniques))
+    # 空值的编码为 -1，取到末尾追加的 True（整列都是空值时 uniques 为空）
+    return np.append(flags, True)[codes]
+
+
+def blank_mask(series: pd.Series) -> np.ndarray:
+    return (series.isna() | (series.astype(str).str.strip() == '')).to_numpy()
+
+
+def text_mask(series: pd.Series, predicate: Callable[[pd.Series], pd.Series]) -> np.ndarray:
+    """对 series.astype(str).str.strip() 的结果求布尔掩码；分类列只对各分类（和空值）求一次再按编码取回"""
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        return np.asarray(predicate(series.astype(str).str.strip()), dtype=bool)
+    categories = series.cat.categories
+    codes = series.cat.codes.to_numpy()
+    flags = np.asarray(predicate(pd.Series(categories).astype(str).str.strip()), dtype=bool)
+    na_flag = False
+    if (codes < 0).any():
+        # 空值按原列的类型处理（整数分类的列本身不会有空值）
+        na_dtype = object if categories.dtype.kind in 'iub' else categories.dtype
+        na_flag = bool(np.asarray(predicate(pd.Series([np.nan], dtype=na_dtype).astype(str).str.strip()))[0])
+    return np.append(flags, na_flag)[codes]
+
+
+def pairing_mask(df: pd.DataFrame) -> np.ndarray:
+    """设备类型、同类型设备号只有一个有值的行（两列已统一为去空格字符串）"""
+    has_dev = text_mask(df['设备类型'], lambda text: text != '')
+    has_num = text_mask(df['同类型设备号'], lambda text: text != '')
+    return has_dev != has_num
+
+
+def normalize_group_cols(df: pd.DataFrame):
+    """统一空值并去空格，结果为按取值排序的分类列；去空格只对每个不同取值做一次"""
+    for col in GROUP_COLS:
+        series = df[col] if isinstance(df[col].dtype, pd.CategoricalDtype) else df[col].astype('category')
+        text = pd.Series(series.cat.categories).astype(str).str.strip().to_numpy(dtype=object)
+        # 末尾一格对应空值（编码-1）
+        codes, values = pd.factorize(np.append(text, ''), sort=True)
+        df[col] = pd.Categorical.from_codes(codes[series.cat.codes.to_numpy()], categories=values)
+
+
+def encode_key_columns(df: pd.DataFrame):
+    """把取值很少的关键列（量测类型、是否控制）转换为分类类型，取值不变
+
+    去空格、取值校验只需对各分类做一次，分组和查重直接使用整数编码。
+    只有单一类型的列才转换（分类会把 1 和 1.0 等视为同一个值）。
+    """
+    for col in CATEGORY_COLS:
+        if col not in df.columns or isinstance(df[col].dtype, pd.CategoricalDtype):
+            continue
+        if pd.api.types.infer_dtype(df[col], skipna=True) in _CATEGORY_TYPES:
+            df[col] = df[col].astype('category')
+
+
+class GroupIndex:
+    """按 设备类型+同类型设备号 分组：分组键只 factorize 一次，组号按键排序（与 groupby 的组顺序一致）"""
+
+    def __init__(self, df: pd.DataFrame):
+        dev_codes, dev_values = pd.factorize(df[GROUP_COLS[0]], sort=True)
+        num_codes, num_values = pd.factorize(df[GROUP_COLS[1]], sort=True)
+        combined = dev_codes.astype(np.int64) * max(len(num_values), 1) + num_codes
+        keys, codes = np.unique(combined, return_inverse=True)
+        self.codes = codes.reshape(-1)
+        self.labels = [(dev_values[key // len(num_values)], num_values[key % len(num_values)]) for key in keys]
+
+    def first_positions(self, mask: np.ndarray) -> Dict[int, int]:
+        """每组中满足 mask 的第一行位置"""
+        positions = np.flatnonzero(mask)
+        group_codes, first = np.unique(self.codes[positions], return_index=True)
+        return dict(zip(group_codes.tolist(), positions[first].tolist()))
+
+
+def value_codes(series: pd.Series) -> np.ndarray:
+    """取值编码，空值也编为同一个码（与 duplicated 把空值视为相同一致）"""
+    return pd.factorize(series, use_na_sentinel=False)[0]
+
+
+def group_duplicates(group_codes: np.ndarray, codes: np.ndarray, mask=None) -> List[Tuple[int, int, np.ndarray]]:
+    """组内重复取值：对 (组号, 取值编码) 做一次稳定排序后找出出现多次的键
+
+    返回 [(组号, 首次出现位置, 该值在组内的全部位置)]，位置均为升序。
+    """
+    positions = np.arange(len(codes)) if mask is None else np.flatnonzero(mask)
+    if len(positions) == 0:
+        return []
+    keys = group_codes[positions].astype(np.int64) * (int(codes.max()) + 1) + codes[positions]
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    counts = np.diff(np.r_[starts, len(sorted_keys)])
+    runs = []
+    for start, count in zip(starts[counts > 1].tolist(), counts[counts > 1].tolist()):
+        run = positions[order[start:start + count]]
+        runs.append((int(group_codes[run[0]]), int(run[0]), run))
+    return runs
+
+
+def value_rows(df: pd.DataFrame, series: pd.Series, first: int, run: np.ndarray) -> List[int]:
+    """重复值对应的行号；值为空时按 series == NaN 的结果为空列表"""
+    if pd.isna(series.iat[first]):
+        return []
+    return (df.index[run] + 2).tolist()
+
+
+def display_keys(group_keys) -> Tuple[str, str]:
+    return group_keys[0] if group_keys[0] else '(空)', group_keys[1] if group_keys[1] else '(空)'
+
+
+SCOPE_TABLE = 'table'          # 整表
+SCOPE_GROUP = 'group'          # 按 设备类型+同类型设备号 分组
+SCOPE_COMPONENT = 'component'  # 分组内 分量ID=1 的子集（没有分量ID列时为整组）
+
+
+class AuditRule:
+    """声明式审核规则
+
+    columns 为规则需要的列（缺少任一列时跳过该规则），scope 为作用范围，
+    duplicates 为规则需要做重复值扫描的列（同一列、同一范围的扫描由所有规则共享），
+    reads 为列存在时规则还会读取的其他列（只读取审核所需的列时用到）。
+    check(ctx) 返回问题列表：整表规则为 [(信息, 行号)]，分组规则为 [(组号, 组内顺序, 信息, 行号)]。
+    """
+
+    def __init__(self, rule_id: str, columns: List[str], check: Callable, scope: str = SCOPE_TABLE,
+                 duplicates: Tuple[str, ...] = (), reads: Tuple[str, ...] = ()):
+        self.rule_id = rule_id
+        self.columns = list(columns)
+        self.check = check
+        self.scope = scope
+        self.duplicates = tuple(duplicates)
+        self.reads = tuple(reads)
+
+    def required_columns(self) -> List[str]:
+        if self.scope == SCOPE_TABLE:
+            return self.columns
+        return GROUP_COLS + self.columns
+
+    def read_columns(self) -> List[str]:
+        """规则可能读取的全部列"""
+        columns = self.required_columns() + list(self.reads)
+        if self.scope == SCOPE_COMPONENT:
+            columns.append('分量ID')
+        return columns
+
+    def applies_to(self, columns) -> bool:
+        return all(col in columns for col in self.required_columns())
+
+
+class AuditContext:
+    """一次审核共享的中间结果：分组编码、取值编码和重复扫描都只计算一次"""
+
+    def __init__(self, df: pd.DataFrame, file_name: str):
+        self.df = df
+        self.file_name = file_name
+        self._groups: Optional[GroupIndex] = None
+        self._codes: Dict[str, np.ndarray] = {}
+        self._duplicates: Dict[Tuple[str, str], list] = {}
+        self._scope_masks: Dict[str, Optional[np.ndarray]] = {}
+
+    @property
+    def groups(self) -> GroupIndex:
+        if self._groups is None:
+            self._groups = GroupIndex(self.df)
+        return self._groups
+
+    def scope_mask(self, scope: str) -> Optional[np.ndarray]:
+        """作用范围对应的行掩码，None 表示全部行"""
+        if scope not in self._scope_masks:
+            mask = None
+            if scope == SCOPE_COMPONENT and '分量ID' in self.df.columns:
+                mask = (self.df['分量ID'].astype(str).str.strip() == '1').to_numpy()
+            self._scope_masks[scope] = mask
+        return self._scope_masks[scope]
+
+    def codes(self, col: str) -> np.ndarray:
+        if col not in self._codes:
+            self._codes[col] = value_codes(self.df[col])
+        return self._codes[col]
+
+    def duplicates(self, col: str, scope: str) -> List[Tuple[int, int, np.ndarray]]:
+        """范围内的重复取值 [(组号, 首次出现位置, 全部位置)]；整表范围的组号均为0"""
+        key = (col, scope)
+        if key not in self._duplicates:
+            if scope == SCOPE_TABLE:
+                group_codes = np.zeros(len(self.df), dtype=np.int64)
+            else:
+                group_codes = self.groups.codes
+            self._duplicates[key] = group_duplicates(group_codes, self.codes(col), self.scope_mask(scope))
+        return self._duplicates[key]
+
+    def rows(self, mask) -> List[int]:
+        return csv_rows(self.df, mask)
+
+    def value_rows(self, col: str, first: int, run: np.ndarray) -> List[int]:
+        return value_rows(self.df, self.df[col], first, run)
+
+
+class AuditPlan:
+    """根据数据中实际存在的列选出可执行的规则，并汇总它们需要的分组和重复扫描
+
+    执行时先一次性完成分组和各列的重复扫描，再依次运行规则；
+    连续的分组规则按组号合并输出，与逐组检查时的输出顺序一致。
+    """
+
+    def __init__(self, rules: List[AuditRule], columns):
+        self.rules = [rule for rule in rules if rule.applies_to(columns)]
+        self.needs_groups = any(rule.scope != SCOPE_TABLE for rule in self.rules)
+        self.scans = list(dict.fromkeys((col, rule.scope) for rule in self.rules for col in rule.duplicates))
+
+    def execute(self, ctx: AuditContext) -> AuditFindings:
+        if self.needs_groups:
+            ctx.groups
+        for col, scope in self.scans:
+            ctx.duplicates(col, scope)
+
+        findings = AuditFindings(ctx.file_name)
+        block = []  # 连续分组规则的问题：(组号, 规则序号, 组内顺序, 规则, 信息, 行号)
+        for index, rule in enumerate(self.rules):
+            if rule.scope == SCOPE_TABLE:
+                _flush_group_block(findings, block)
+                for message, rows in rule.check(ctx):
+                    findings.add(rule.rule_id, message, rows)
+            else:
+                block.extend((gid, index, order, rule.rule_id, message, rows)
+                             for gid, order, message, rows in rule.check(ctx))
+        _flush_group_block(findings, block)
+        return findings
+
+
+def _flush_group_block(findings: AuditFindings, block: list):
+    for _, _, _, rule_id, message, rows in sorted(block, key=lambda item: item[:3]):
+        findings.add(rule_id, message, rows)
+    block.clear()
+
+
+# ---------------- 内置规则 ----------------
+
+def _type_empty_flags(ctx: AuditContext, runs) -> np.ndarray:
+    """重复的量测类型是否为空（按 astype(str).strip() 为 '' 或 'nan' 判断）"""
+    firsts = [first for _, first, _ in runs]
+    return text_mask(ctx.df['量测类型'].iloc[firsts], lambda text: (text == '') | (text == 'nan'))
+
+
+def _check_ana_type_empty(ctx: AuditContext):
+    runs = ctx.duplicates('量测类型', SCOPE_GROUP)
+    empty_runs: Dict[int, list] = {}
+    for (gid, _, run), empty in zip(runs, _type_empty_flags(ctx, runs)):
+        if empty:
+            empty_runs.setdefault(gid, []).append(run)
+    for gid, group_runs in empty_runs.items():
+        dev_type, dev_num = display_keys(ctx.groups.labels[gid])
+        yield (gid, 0, f"{ctx.file_name}: 设备类型={dev_type}, 同类型设备号={dev_num} 组内量测类型为空",
+               (ctx.df.index[np.sort(np.concatenate(group_runs))] + 2).tolist())
+
+
+def _check_ana_type_duplicate(ctx: AuditContext):
+    runs = ctx.duplicates('量测类型', SCOPE_GROUP)
+    types = ctx.df['量测类型']
+    for (gid, first, run), empty in zip(runs, _type_empty_flags(ctx, runs)):
+        if not empty:
+            dev_type, dev_num = display_keys(ctx.groups.labels[gid])
+            yield (gid, first, f"{ctx.file_name}: 设备类型={dev_type}, 同类型设备号={dev_num} 组内量测类型“{types.iat[first]}”重复",
+                   ctx.value_rows('量测类型', first, run))
+
+
+def _check_ana_desc_duplicate(ctx: AuditContext):
+    descs = ctx.df['描述']
+    for gid, first, run in ctx.duplicates('描述', SCOPE_GROUP):
+        dev_type, dev_num = display_keys(ctx.groups.labels[gid])
+        yield (gid, first, f"{ctx.file_name}: 设备类型={dev_type}, 同类型设备号={dev_num} 组内描述“{descs.iat[first]}”重复",
+               ctx.value_rows('描述', first, run))
+
+
+def _check_dig_type_duplicate(ctx: AuditContext):
+    types = ctx.df['量测类型']
+    for gid, first, run in ctx.duplicates('量测类型', SCOPE_COMPONENT):
+        dev_type, dev_num = ctx.groups.labels[gid]
+        yield (gid, first, f"{ctx.file_name}: 设备类型={dev_type}, 同类型设备号={dev_num} 组内量测类型“{types.iat[first]}”重复",
+               ctx.value_rows('量测类型', first, run))
+
+
+def _check_dig_desc_duplicate(ctx: AuditContext):
+    descs = ctx.df['描述']
+    for gid, first, run in ctx.duplicates('描述', SCOPE_COMPONENT):
+        dev_type, dev_num = display_keys(ctx.groups.labels[gid])
+        yield (gid, first, f"{ctx.file_name}: 设备类型={dev_type}, 同类型设备号={dev_num} 分量ID=1 组内 描述“{descs.iat[first]}”重复",
+               ctx.value_rows('描述', first, run))
+
+
+def _check_component_mismatch(ctx: AuditContext):
+    """每组第一条分量ID=1与第一条分量ID=2的行比较"""
+    df = ctx.df
+    first_id1 = ctx.groups.first_positions((df['分量ID'] == 1).to_numpy())
+    first_id2 = ctx.groups.first_positions((df['分量ID'] == 2).to_numpy())
+    compare_cols = [col for col in ['量测类型', '是否控制', '控制点号'] if col in df.columns]
+    for gid in first_id1.keys() & first_id2.keys():
+        pos1, pos2 = first_id1[gid], first_id2[gid]
+        dev_type, dev_num = ctx.groups.labels[gid]
+        for order, col in enumerate(compare_cols):
+            if str(df[col].iat[pos1]).strip() != str(df[col].iat[pos2]).strip():
+                yield (gid, order, f"{ctx.file_name}: 设备类型={dev_type}, 同类型设备号={dev_num} 分量ID=2的{col}与分量ID=1不一致",
+                       [df.index[pos1] + 2, df.index[pos2] + 2])
+
+
+def _check_point_duplicate(ctx: AuditContext):
+    dup = ctx.df.duplicated(subset=['点号'], keep=False)
+    if dup.any():
+        yield f"{ctx.file_name}: 点号重复", ctx.rows(dup)
+
+
+def _check_signal_point_duplicate(ctx: AuditContext):
+    points = ctx.df['遥信点号']
+    for _, first, run in ctx.duplicates('遥信点号', SCOPE_TABLE):
+        yield f"{ctx.file_name}: 遥信点号“{points.iat[first]}”重复", ctx.value_rows('遥信点号', first, run)
+
+
+def _check_control_flag(ctx: AuditContext):
+    invalid = ~text_mask(ctx.df['是否控制'], lambda text: text.isin(['0', '1']))
+    if invalid.any():
+        yield f"{ctx.file_name}: 是否控制只能为0或1", ctx.rows(invalid)
+
+
+def _check_naming_rule(ctx: AuditContext):
+    wrong = not_zero_mask(ctx.df['命名规则'])
+    if wrong.any():
+        yield f"{ctx.file_name}: 命名规则不为0", ctx.rows(wrong)
+
+
+def _check_device_pairing(ctx: AuditContext):
+    unpaired = pairing_mask(ctx.df)
+    if unpaired.any():
+        yield f"{ctx.file_name}: 设备类型、同类型设备号必须同时有值或同时为空", ctx.rows(unpaired)
+
+
+def _check_control_point_duplicate(ctx: AuditContext):
+    df = ctx.df
+    sub = df[(df['分量ID'] == 1).to_numpy() & text_mask(df['是否控制'], lambda text: text == '1')]
+    dup = sub.duplicated(subset=['控制点号'], keep=False)
+    if dup.any():
+        yield f"{ctx.file_name}: 分量ID=1且是否控制为1的控制点号重复", csv_rows(sub, dup)
+
+
+def not_empty_rule(rule_id: str, col: str) -> AuditRule:
+    """列值不能为空（空值或只含空格）"""
+    def check(ctx: AuditContext):
+        empty = blank_mask(ctx.df[col])
+        if empty.any():
+            yield f"{ctx.file_name}: {col}为空", ctx.rows(empty)
+    return AuditRule(rule_id, [col], check)
+
+
+NAMING_RULE = AuditRule('naming_rule_not_zero', ['命名规则'], _check_naming_rule)
+CONTROL_FLAG_RULE = AuditRule('control_flag_invalid', ['是否控制'], _check_control_flag)
+DEVICE_PAIRING_RULE = AuditRule('device_pairing', GROUP_COLS, _check_device_pairing)
+
+# 各文件的审核规则，按输出顺序排列；站点自定义规则通过 register_rule 追加
+AUDIT_RULES: Dict[str, List[AuditRule]] = {
+    'ana': [
+        AuditRule('ana_type_empty', ['量测类型'], _check_ana_type_empty, SCOPE_GROUP, duplicates=('量测类型',)),
+        AuditRule('ana_type_duplicate', ['量测类型'], _check_ana_type_duplicate, SCOPE_GROUP, duplicates=('量测类型',)),
+        AuditRule('ana_desc_duplicate', ['描述'], _check_ana_desc_duplicate, SCOPE_GROUP, duplicates=('描述',)),
+        AuditRule('ana_point_duplicate', ['点号'], _check_point_duplicate),
+        CONTROL_FLAG_RULE,
+        NAMING_RULE,
+        not_empty_rule('ana_coef_empty', '系数'),
+        DEVICE_PAIRING_RULE,
+    ],
+    'dig': [
+        AuditRule('dig_type_duplicate', ['量测类型'], _check_dig_type_duplicate, SCOPE_COMPONENT, duplicates=('量测类型',)),
+        AuditRule('dig_desc_duplicate', ['描述'], _check_dig_desc_duplicate, SCOPE_COMPONENT, duplicates=('描述',)),
+        AuditRule('dig_point_duplicate', ['遥信点号'], _check_signal_point_duplicate, duplicates=('遥信点号',)),
+        NAMING_RULE,
+        not_empty_rule('dig_priority_empty', '告警优先级'),
+        DEVICE_PAIRING_RULE,
+        CONTROL_FLAG_RULE,
+        AuditRule('dig_component_mismatch', ['分量ID'], _check_component_mismatch, SCOPE_GROUP,
+                  reads=('量测类型', '是否控制', '控制点号')),
+        AuditRule('dig_control_point_duplicate', ['分量ID', '是否控制', '控制点号'], _check_control_point_duplicate),
+    ],
+}
+
+
+def register_rule(file_kind: str, rule: AuditRule, position: Optional[int] = None):
+    """注册审核规则（file_kind 为 ana / dig）；position 为空时追加到末尾"""
+    rules = AUDIT_RULES.setdefault(file_kind, [])
+    rules.insert(len(rules) if position is None else position, rule)
+
+
+def audit_kind(file_path: str) -> Optional[str]:
+    """按文件名判断审核类型（ana.csv → ana），没有对应规则时返回None"""
+    kind = os.path.splitext(os.path.basename(file_path))[0].lower()
+    return kind if kind in AUDIT_RULES else None
+
+
+def audit_columns(file_kind: str) -> List[str]:
+    """审核该类文件时规则可能读取的列，只读取这些列审核的结果与读取整个文件相同"""
+    return list(dict.fromkeys(col for rule in AUDIT_RULES[file_kind] for col in rule.read_columns()))
+
+
+def audit_dataframe(df: pd.DataFrame, file_kind: str, rules: Optional[List[AuditRule]] = None) -> AuditFindings:
+    """按注册的规则审核一个表，返回审核结果"""
+    if rules is None:
+        rules = AUDIT_RULES[file_kind]
+    if all(col in df.columns for col in GROUP_COLS):
+        normalize_group_cols(df)
+    encode_key_columns(df)
+    plan = AuditPlan(rules, df.columns)
+    return plan.execute(AuditContext(df, f"{file_kind}.csv"))
+
+
+def audit_ana(df: pd.DataFrame) -> AuditFindings:
+    return audit_dataframe(df, 'ana')
+
+
+def audit_dig(df: pd.DataFrame) -> AuditFindings:
+    return audit_dataframe(df, 'dig')
+
+
+def audit_csv(file_path: str, file_kind: Optional[str] = None, arrow_strings: bool = False,
+              prune_columns: bool = False) -> AuditFindings:
+    """按文件类型（ana / dig，默认取文件名）审核CSV；prune_columns 为真时只读取审核规则用到的列"""
+    kind = file_kind or os.path.splitext(os.path.basename(file_path))[0].lower()
+    columns = audit_columns(kind) if prune_columns else None
+    return audit_dataframe(read_audit_csv(file_path, arrow_strings, columns), kind)
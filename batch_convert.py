@@ -0,0 +1,287 @@
+"""命令行批量转换工具（无需图形界面）
+
+用法示例：
+    python batch_convert.py D:\\数据\\工作簿 -o D:\\数据\\输出 -j 4
+    python batch_convert.py "D:\\数据\\**\\*.xlsx" --summary 汇总.csv --log-file 转换.log
+"""
+import argparse
+import csv
+import glob
+import logging
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from config_cache import load_compiled_config
+from conversion_cache import DEFAULT_MAX_MB, ConversionCache
+from converter import ExcelConverter, get_config_path
+from pipeline_metrics import metrics_records, write_metrics
+
+EXCEL_EXTENSIONS = ('.xlsx', '.xlsm')
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+LOG_LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR')
+
+logger = logging.getLogger(__name__)
+
+
+def setup_logging(level: str = 'INFO', log_file: Optional[str] = None):
+    """日志输出到控制台，指定 log_file 时同时追加写入该文件"""
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file, encoding='utf-8'))
+    logging.basicConfig(level=getattr(logging, level), format=LOG_FORMAT, handlers=handlers, force=True)
+
+
+def input_root(item: str) -> str:
+    """输入项的根目录：目录本身，或路径中第一个含通配符的部分之前的目录"""
+    if os.path.isdir(item):
+        return os.path.abspath(item)
+    root = os.path.dirname(item)
+    while glob.has_magic(root):
+        root = os.path.dirname(root)
+    return os.path.abspath(root)
+
+
+def find_workbooks(inputs: List[str], recursive: bool = False) -> List[Tuple[str, str]]:
+    """展开目录或通配符，返回去重后的 (工作簿, 输入根目录) 列表（跳过Excel临时文件 ~$*）"""
+    found = {}
+    for item in inputs:
+        if os.path.isdir(item):
+            pattern = os.path.join(item, '**', '*') if recursive else os.path.join(item, '*')
+            candidates = glob.glob(pattern, recursive=recursive)
+        else:
+            candidates = glob.glob(item, recursive=True)
+        root = input_root(item)
+        for path in sorted(candidates):
+            name = os.path.basename(path)
+            if os.path.isfile(path) and name.lower().endswith(EXCEL_EXTENSIONS) and not name.startswith('~$'):
+                found.setdefault(os.path.abspath(path), root)
+    return list(found.items())
+
+
+def get_output_dir(excel_file: str, output_root: Optional[str], root: Optional[str] = None) -> str:
+    """每个工作簿输出到以其文件名命名的子目录
+
+    指定输出根目录时保留工作簿相对于输入根目录的路径，递归或通配符查找到的不同目录下的同名工作簿
+    输出到不同的子目录；未指定时输出到工作簿所在目录。
+    """
+    stem = os.path.splitext(excel_file)[0]
+    if not output_root:
+        return stem
+    relative = os.path.relpath(stem, root) if root else os.path.basename(stem)
+    if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+        relative = os.path.basename(stem)
+    return os.path.join(output_root, relative)
+
+
+def output_conflicts(tasks: List[Tuple[str, str]]) -> Dict[str, List[str]]:
+    """输出到同一目录的工作簿（如同一目录下的 报表.xlsx 和 报表.xlsm），输出目录 -> 工作簿列表"""
+    by_dir: Dict[str, List[str]] = {}
+    for excel_file, output_dir in tasks:
+        by_dir.setdefault(os.path.normcase(os.path.abspath(output_dir)), []).append(excel_file)
+    return {output_dir: files for output_dir, files in by_dir.items() if len(files) > 1}
+
+
+# 工作进程内的转换器，每个进程只构建一次
+_worker_converter: Optional[ExcelConverter] = None
+
+
+def _init_worker(config, fuzzy_engine=None, log_level: str = 'INFO', log_file: Optional[str] = None):
+    global _worker_converter
+    if not logging.getLogger().hasHandlers():
+        # spawn 方式启动的工作进程不继承主进程的日志配置
+        setup_logging(log_level, log_file)
+    _worker_converter = ExcelConverter(config, fuzzy_engine)
+
+
+def convert_file(excel_file: str, output_dir: str, clean_options: dict,
+                 converter: Optional[ExcelConverter] = None) -> Dict:
+    """转换单个工作簿，返回汇总信息；失败时记录错误而不抛出"""
+    converter = converter or _worker_converter
+    start = time.perf_counter()
+    summary = {
+        'file': excel_file,
+        'output_dir': output_dir,
+        'status': 'ok',
+        'sheets': 0,
+        'rows': 0,
+        'warnings': 0,
+        'findings': 0,
+        'cached': False,
+        'unchanged': 0,
+        'seconds': 0.0,
+        'error': '',
+    }
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        results = converter.convert_workbook(excel_file, output_dir, clean_options)
+        summary['sheets'] = len(results)
+        summary['rows'] = sum(result['rows'] for result in results)
+        summary['warnings'] = sum(len(result['warnings']) for result in results)
+        summary['cached'] = bool(results) and all(result.get('cached', False) for result in results)
+        summary['unchanged'] = sum(1 for result in results if result.get('unchanged', False))
+        if clean_options.get('profile', False):
+            summary['metrics'] = metrics_records(excel_file, results)
+        for result in results:
+            findings = result['findings']
+            if findings is not None:
+                summary['findings'] += len(findings.items)
+                for level, message in findings.messages():
+                    logger.log(logging.ERROR if level == "ERROR" else logging.INFO, message)
+        if not results:
+            summary['status'] = 'no_sheet'
+            summary['error'] = '没有找到匹配的Sheet名称'
+    except Exception as e:
+        summary['status'] = 'failed'
+        summary['error'] = str(e)
+        logger.error(f"转换失败: {excel_file}\n{traceback.format_exc()}")
+    summary['seconds'] = round(time.perf_counter() - start, 3)
+    return summary
+
+
+def run_batch(tasks: List[Tuple[str, str]], config, clean_options: dict, jobs: int = 1, fuzzy_engine=None,
+              log_level: str = 'INFO', log_file: Optional[str] = None) -> List[Dict]:
+    """按 (工作簿, 输出目录) 分发到进程池批量转换，结果按输入顺序返回"""
+    if jobs <= 1 or len(tasks) <= 1:
+        converter = ExcelConverter(config, fuzzy_engine)
+        summaries = []
+        for excel_file, output_dir in tasks:
+            summaries.append(convert_file(excel_file, output_dir, clean_options, converter))
+            _log_summary(summaries[-1])
+        return summaries
+
+    with ProcessPoolExecutor(max_workers=min(jobs, len(tasks)), initializer=_init_worker,
+                             initargs=(config, fuzzy_engine, log_level, log_file)) as executor:
+        futures = [executor.submit(convert_file, excel_file, output_dir, clean_options)
+                   for excel_file, output_dir in tasks]
+        summaries = []
+        for future in futures:
+            summaries.append(future.result())
+            _log_summary(summaries[-1])
+    return summaries
+
+
+def _log_summary(summary: Dict):
+    if summary['status'] == 'failed':
+        logger.error(f"[失败] {summary['file']}: {summary['error']}")
+    else:
+        cached = "（使用转换缓存）" if summary['cached'] else ""
+        if summary['unchanged']:
+            cached += f"（{summary['unchanged']} 个Sheet未变化）"
+        logger.info(f"[完成] {summary['file']}: {summary['sheets']} 个Sheet，{summary['rows']} 行，"
+                    f"耗时 {summary['seconds']} 秒{cached}")
+
+
+def write_summary(summaries: List[Dict], summary_path: str):
+    """写出每个文件的转换汇总（utf-8-sig，Excel可直接打开）"""
+    os.makedirs(os.path.dirname(os.path.abspath(summary_path)), exist_ok=True)
+    fields = ['file', 'output_dir', 'status', 'sheets', 'rows', 'warnings', 'findings', 'cached', 'unchanged',
+              'seconds', 'error']
+    with open(summary_path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(summaries)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="批量将Excel工作簿转换为CSV（无图形界面）")
+    parser.add_argument('inputs', nargs='+', help="工作簿所在目录或通配符（如 \"data/**/*.xlsx\"）")
+    parser.add_argument('-c', '--config', default=get_config_path("config.ini"), help="配置文件路径")
+    parser.add_argument('-o', '--output-dir',
+                        help="输出根目录，默认为各工作簿所在目录；每个工作簿输出到同名子目录（保留相对于输入目录的路径）")
+    parser.add_argument('-r', '--recursive', action='store_true', help="输入为目录时递归查找子目录")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help="并行进程数")
+    parser.add_argument('--summary', help="汇总文件路径，默认为输出根目录下的 batch_summary.csv")
+    parser.add_argument('--chunk-size', type=int, default=0, help="分块流式转换的每块行数，0表示整表读取")
+    parser.add_argument('--remove-duplicates', action='store_true', help="删除重复行")
+    parser.add_argument('--remove-empty-rows', action='store_true', help="删除空行")
+    parser.add_argument('--no-trim', action='store_true', help="不去除首尾空格")
+    parser.add_argument('--no-fill-na', action='store_true', help="不填充空值")
+    parser.add_argument('--fill-na-value', default='NA', help="空值填充内容")
+    parser.add_argument('--in-place', action='store_true', help="就地清洗（减少整表复制），并在日志中报告清洗峰值内存")
+    parser.add_argument('--arrow-strings', action='store_true',
+                        help="字符串列使用pyarrow存储（需安装pyarrow），减少内存占用")
+    parser.add_argument('--audit', action='store_true', help="转换后直接审核 ana.csv / dig.csv（整表转换时不重新读取CSV）")
+    parser.add_argument('--profile', metavar='FILE',
+                        help="记录每个Sheet各阶段的耗时、行数、内存和各规则的匹配耗时，写入该 JSON lines 文件")
+    parser.add_argument('--incremental', action='store_true',
+                        help="按输出目录中的转换清单只转换有变化的Sheet，未变化的Sheet保留现有CSV")
+    parser.add_argument('--cache-dir', help="转换缓存目录：工作簿、配置和清洗选项都未变化时直接复用上次转换出的CSV")
+    parser.add_argument('--cache-max-mb', type=float, default=DEFAULT_MAX_MB,
+                        help="转换缓存容量上限（MB），超过时删除最久未使用的条目")
+    parser.add_argument('--cache-link', action='store_true', help="从缓存恢复CSV时使用硬链接代替复制")
+    parser.add_argument('--clear-cache', action='store_true', help="转换前清空转换缓存（使全部缓存失效）")
+    parser.add_argument('--log-file', help="同时把日志追加写入该文件（默认只输出到控制台）")
+    parser.add_argument('--log-level', default='INFO', choices=LOG_LEVELS, help="日志级别")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    setup_logging(args.log_level, args.log_file)
+
+    try:
+        # 模糊映射规则引擎在开始转换时构建，配置未变化时由编译缓存的规则表还原
+        compiled = load_compiled_config(args.config)
+    except Exception as e:
+        logger.error(f"配置加载失败: {str(e)}")
+        return 2
+
+    workbooks = find_workbooks(args.inputs, args.recursive)
+    if not workbooks:
+        logger.error("没有找到需要转换的Excel文件")
+        return 2
+    tasks = [(excel_file, get_output_dir(excel_file, args.output_dir, root)) for excel_file, root in workbooks]
+    conflicts = output_conflicts(tasks)
+    if conflicts:
+        for output_dir, files in conflicts.items():
+            logger.error(f"以下工作簿会输出到同一目录 {output_dir}，CSV会互相覆盖: {', '.join(files)}")
+        logger.error("请调整输入或重命名工作簿后再转换")
+        return 2
+    logger.info(f"共找到 {len(tasks)} 个工作簿，并行进程数: {args.jobs}")
+
+    clean_options = {
+        'apply_fuzzy_mapping': True,
+        'trim_spaces': not args.no_trim,
+        'remove_empty_rows': args.remove_empty_rows,
+        'remove_duplicates': args.remove_duplicates,
+        'fill_na': not args.no_fill_na,
+        'fill_na_value': args.fill_na_value,
+        'in_place': args.in_place,
+        'arrow_strings': args.arrow_strings,
+        'chunk_size': args.chunk_size,
+        'audit': args.audit,
+        'profile': bool(args.profile),
+        'incremental': args.incremental,
+        'cache_dir': args.cache_dir,
+        'cache_max_mb': args.cache_max_mb,
+        'cache_link': args.cache_link,
+    }
+    if args.clear_cache:
+        if args.cache_dir:
+            ConversionCache.from_options(clean_options).clear()
+        else:
+            logger.warning("未指定 --cache-dir，忽略 --clear-cache")
+    start = time.perf_counter()
+    summaries = run_batch(tasks, compiled.config, clean_options, args.jobs, compiled.fuzzy_engine,
+                          args.log_level, args.log_file)
+
+    summary_path = args.summary or os.path.join(args.output_dir or os.getcwd(), 'batch_summary.csv')
+    write_summary(summaries, summary_path)
+    if args.profile:
+        write_metrics(args.profile, [record for summary in summaries for record in summary.get('metrics', [])])
+        logger.info(f"性能统计已写入: {args.profile}")
+
+    failed = [s for s in summaries if s['status'] == 'failed']
+    logger.info(f"批量转换结束：成功 {len(summaries) - len(failed)} 个，失败 {len(failed)} 个，"
+                f"总耗时 {time.perf_counter() - start:.1f} 秒，汇总: {summary_path}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()  # 打包后多进程转换需要
+    sys.exit(main())
@@ -0,0 +1,341 @@
+"""性能基准测试：用合成数据分别计时转换、清洗、模糊映射、审核等各环节，结果写成JSON
+
+用法示例：
+    python benchmarks/run_benchmarks.py -o 基准.json
+    python benchmarks/run_benchmarks.py --rows 100000 --rules 5000 --only convert fuzzy_mapping
+    python benchmarks/run_benchmarks.py -o 新.json --baseline 基准.json
+    python benchmarks/run_benchmarks.py --compare 基准.json 新.json
+
+同样的 --rows/--rules/--seed 生成的数据完全相同，不同提交的结果可以直接比较；
+日志在计时期间关闭，耗时不含日志输出。
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import synthetic  # noqa: E402
+from audit_engine import audit_csv  # noqa: E402
+from config_cache import get_cache_path, load_compiled_config  # noqa: E402
+from converter import ExcelConverter  # noqa: E402
+from data_cleaner import DataCleaner  # noqa: E402
+from fuzzy_matcher import FuzzyMappingEngine  # noqa: E402
+from rule_codec import rules_to_table, table_to_rules  # noqa: E402
+
+# 结果文件格式版本
+RESULT_VERSION = 1
+
+# 与图形界面默认勾选一致的清洗选项
+CLEAN_OPTIONS = {
+    'apply_fuzzy_mapping': True,
+    'trim_spaces': True,
+    'remove_empty_rows': True,
+    'remove_duplicates': True,
+    'fill_na': True,
+    'fill_na_value': 'NA',
+}
+
+
+class BenchData:
+    """一组参数对应的合成数据；指定工作目录时已生成的文件直接复用"""
+
+    def __init__(self, workdir: str, rows: int, rules: int, seed: int):
+        self.workdir = workdir
+        self.rows = rows
+        self.rules = rules
+        self.seed = seed
+        prefix = os.path.join(workdir, f"r{rows}_k{rules}_s{seed}")
+        self.workbook = f"{prefix}.xlsx"
+        self.config_file = f"{prefix}.ini"
+        self.output_dir = f"{prefix}_out"
+        self.audit_files = {
+            (kind, encoding): f"{prefix}_{kind}_{encoding}.csv"
+            for kind in ('ana', 'dig') for encoding in ('utf8', 'gbk')
+        }
+
+    def prepare(self):
+        if not os.path.exists(self.workbook):
+            synthetic.generate_workbook(self.workbook, self.rows, self.seed)
+        if not os.path.exists(self.config_file):
+            synthetic.generate_config(self.config_file, self.rules, self.seed)
+        for (kind, encoding), path in self.audit_files.items():
+            if not os.path.exists(path):
+                synthetic.generate_audit_csv(path, kind, self.rows, self.seed,
+                                             'gbk' if encoding == 'gbk' else 'utf-8-sig')
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.config = load_compiled_config(self.config_file).config
+        self.dig_frame = pd.read_excel(self.workbook, sheet_name=synthetic.DIG_SHEET, dtype=str)
+
+
+class Scenario:
+    """一个计时场景：setup(data) 返回每次计时调用的函数，该函数返回处理的行数
+
+    before_each 在每次计时前调用（不计时），用于清理缓存等。
+    """
+
+    def __init__(self, name: str, description: str, setup: Callable[[BenchData], Callable[[], int]],
+                 before_each: Optional[Callable[[BenchData], None]] = None):
+        self.name = name
+        self.description = description
+        self.setup = setup
+        self.before_each = before_each
+
+
+def _remove_config_cache(data: BenchData):
+    cache_path = get_cache_path(data.config_file)
+    if os.path.exists(cache_path):
+        os.remove(cache_path)
+
+
+def _setup_config_load(data: BenchData):
+    def run():
+        return len(load_compiled_config(data.config_file).fuzzy_engine.rules)
+    return run
+
+
+def _setup_fuzzy_compile(data: BenchData):
+    items = list(data.config['KeywordFuzzyMapping'].items())
+
+    def run():
+        FuzzyMappingEngine(items)
+        return len(items)
+    return run
+
+
+def _setup_fuzzy_mapping(data: BenchData):
+    cleaner = DataCleaner(data.config)
+    cleaner.get_fuzzy_engine()  # 规则编译不计入
+
+    def run():
+        return len(cleaner.apply_fuzzy_mapping(data.dig_frame))
+    return run
+
+
+def _setup_clean_data(data: BenchData):
+    cleaner = DataCleaner(data.config)
+    options = dict(CLEAN_OPTIONS, apply_fuzzy_mapping=False)
+
+    def run():
+        return len(cleaner.clean_data(data.dig_frame, options))
+    return run
+
+
+def _setup_convert(chunk_size: int):
+    def setup(data: BenchData):
+        converter = ExcelConverter(data.config)
+        options = dict(CLEAN_OPTIONS, chunk_size=chunk_size)
+
+        def run():
+            results = converter.convert_workbook(data.workbook, data.output_dir, options)
+            return sum(result['rows'] for result in results)
+        return run
+    return setup
+
+
+def _setup_audit(kind: str, encoding: str):
+    def setup(data: BenchData):
+        path = data.audit_files[(kind, encoding)]
+
+        def run():
+            audit_csv(path, kind)
+            return data.rows
+        return run
+    return setup
+
+
+def _setup_rule_codec(data: BenchData):
+    items = list(data.config['KeywordFuzzyMapping'].items())
+
+    def run():
+        keys, _ = table_to_rules(rules_to_table(items))
+        return len(keys)
+    return run
+
+
+SCENARIOS: List[Scenario] = [
+    Scenario('config_load_cold', "解析 config.ini 并构建规则引擎（无缓存）", _setup_config_load, _remove_config_cache),
+    Scenario('config_load_warm', "解析 config.ini，由编译缓存的规则表构建规则引擎", _setup_config_load),
+    Scenario('fuzzy_compile', "编译 KeywordFuzzyMapping 规则引擎", _setup_fuzzy_compile),
+    Scenario('fuzzy_mapping', "对遥信表执行模糊映射（apply_fuzzy_mapping）", _setup_fuzzy_mapping),
+    Scenario('clean_data', "清洗遥信表（去空格、去空行、去重、填充空值）", _setup_clean_data),
+    Scenario('convert', "转换整个工作簿（process_excel_file 默认选项）", _setup_convert(0)),
+    Scenario('convert_chunked', "分块转换整个工作簿（每块5000行）", _setup_convert(5000)),
+    Scenario('audit_ana_utf8', "审核 ana.csv（UTF-8）", _setup_audit('ana', 'utf8')),
+    Scenario('audit_dig_utf8', "审核 dig.csv（UTF-8）", _setup_audit('dig', 'utf8')),
+    Scenario('audit_ana_gbk', "审核 ana.csv（GBK）", _setup_audit('ana', 'gbk')),
+    Scenario('audit_dig_gbk', "审核 dig.csv（GBK）", _setup_audit('dig', 'gbk')),
+    Scenario('rule_codec', "规则与配置表格互相转换", _setup_rule_codec),
+]
+
+
+def run_scenario(scenario: Scenario, data: BenchData, repeat: int) -> Dict:
+    """运行 repeat 次并记录每次耗时（秒）；最短耗时用于比较"""
+    run = scenario.setup(data)
+    times = []
+    rows = 0
+    for _ in range(repeat):
+        if scenario.before_each:
+            scenario.before_each(data)
+        start = time.perf_counter()
+        rows = run()
+        times.append(time.perf_counter() - start)
+    best = min(times)
+    return {
+        'description': scenario.description,
+        'rows': rows,
+        'runs': [round(t, 6) for t in times],
+        'best': round(best, 6),
+        'median': round(statistics.median(times), 6),
+        'rows_per_sec': round(rows / best, 1) if best > 0 else None,
+    }
+
+
+def _git(*args) -> Optional[str]:
+    try:
+        return subprocess.run(['git', *args], cwd=REPO_ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def environment() -> Dict:
+    try:
+        import pyarrow
+        pyarrow_version = pyarrow.__version__
+    except ImportError:
+        pyarrow_version = None
+    status = _git('status', '--porcelain', '--untracked-files=no')
+    return {
+        'commit': _git('rev-parse', 'HEAD'),
+        'dirty': bool(status) if status is not None else None,
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'pyarrow': pyarrow_version,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def run_benchmarks(names: List[str], rows: int, rules: int, seed: int, repeat: int,
+                   workdir: Optional[str] = None) -> Dict:
+    """生成数据并运行选中的场景，返回结果（可直接写成JSON）"""
+    temp_dir = None
+    if workdir is None:
+        workdir = temp_dir = tempfile.mkdtemp(prefix='excel_converter_bench_')
+    os.makedirs(workdir, exist_ok=True)
+    try:
+        data = BenchData(workdir, rows, rules, seed)
+        print(f"生成测试数据: {rows} 行, {rules} 条规则, 种子 {seed}")
+        data.prepare()
+        results = {}
+        logging.disable(logging.WARNING)
+        try:
+            for scenario in SCENARIOS:
+                if scenario.name not in names:
+                    continue
+                result = results[scenario.name] = run_scenario(scenario, data, repeat)
+                print(f"{scenario.name:<20} 最短 {result['best']:>9.4f}s  中位 {result['median']:>9.4f}s  "
+                      f"{result['rows']} 行")
+        finally:
+            logging.disable(logging.NOTSET)
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+    return {
+        'version': RESULT_VERSION,
+        'environment': environment(),
+        'params': {'rows': rows, 'rules': rules, 'seed': seed, 'repeat': repeat},
+        'scenarios': results,
+    }
+
+
+def compare_results(baseline: Dict, current: Dict, threshold: float) -> int:
+    """按最短耗时比较两份结果，返回变慢超过 threshold（比例）的场景数"""
+    if baseline.get('params', {}).get('rows') != current.get('params', {}).get('rows') or \
+            baseline.get('params', {}).get('rules') != current.get('params', {}).get('rules'):
+        print(f"警告：两份结果的数据规模不同 {baseline.get('params')} / {current.get('params')}")
+    print(f"基准: {baseline['environment'].get('commit')}  当前: {current['environment'].get('commit')}")
+    print(f"{'场景':<20} {'基准(s)':>10} {'当前(s)':>10} {'比例':>8}")
+    regressions = 0
+    for name, result in current['scenarios'].items():
+        base = baseline['scenarios'].get(name)
+        if base is None:
+            print(f"{name:<20} {'-':>10} {result['best']:>10.4f} {'新增':>8}")
+            continue
+        ratio = result['best'] / base['best'] if base['best'] > 0 else float('inf')
+        mark = ''
+        if ratio > 1 + threshold:
+            regressions += 1
+            mark = '  变慢'
+        elif ratio < 1 - threshold:
+            mark = '  变快'
+        print(f"{name:<20} {base['best']:>10.4f} {result['best']:>10.4f} {ratio:>8.2f}{mark}")
+    return regressions
+
+
+def load_results(path: str) -> Dict:
+    with open(path, encoding='utf-8') as f:
+        results = json.load(f)
+    if results.get('version') != RESULT_VERSION:
+        raise ValueError(f"不支持的结果文件版本: {path}")
+    return results
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Excel转CSV工具性能基准测试")
+    parser.add_argument('-o', '--output', help="结果JSON文件路径")
+    parser.add_argument('--rows', type=int, default=20000, help="遥信表及审核CSV的行数（遥测表为一半），默认20000")
+    parser.add_argument('--rules', type=int, default=2000, help="KeywordFuzzyMapping 规则数，默认2000")
+    parser.add_argument('--seed', type=int, default=0, help="随机种子，默认0")
+    parser.add_argument('--repeat', type=int, default=3, help="每个场景的运行次数，取最短耗时，默认3")
+    parser.add_argument('--only', nargs='+', metavar='场景', choices=[s.name for s in SCENARIOS],
+                        help="只运行指定场景")
+    parser.add_argument('--workdir', help="测试数据目录（保留并复用已生成的数据），默认使用临时目录")
+    parser.add_argument('--baseline', help="与此前的结果JSON比较")
+    parser.add_argument('--compare', nargs=2, metavar=('基准', '当前'), help="只比较两份已有的结果JSON，不运行测试")
+    parser.add_argument('--threshold', type=float, default=0.1, help="比较时判定变慢/变快的比例，默认0.1")
+    parser.add_argument('--list', action='store_true', help="列出全部场景")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.list:
+        for scenario in SCENARIOS:
+            print(f"{scenario.name:<20} {scenario.description}")
+        return 0
+    if args.compare:
+        regressions = compare_results(load_results(args.compare[0]), load_results(args.compare[1]), args.threshold)
+        return 1 if regressions else 0
+
+    names = args.only or [scenario.name for scenario in SCENARIOS]
+    results = run_benchmarks(names, args.rows, args.rules, args.seed, args.repeat, args.workdir)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入: {args.output}")
+    if args.baseline:
+        return 1 if compare_results(load_results(args.baseline), results, args.threshold) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
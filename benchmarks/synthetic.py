@@ -0,0 +1,186 @@
+"""基准测试用的合成数据：工作簿、ana/dig CSV、config.ini 和 KeywordFuzzyMapping 规则
+
+同样的参数（行数、规则数、种子）总是生成完全相同的内容，不同提交之间的测试结果可以直接比较。
+"""
+import configparser
+import csv
+import random
+from typing import List, Tuple
+
+import openpyxl
+
+# 工作簿中的Sheet名（用中文名，避免 ConfigParser 把键转换为小写后对不上）及转换后的CSV
+DIG_SHEET = '遥信表'
+ANA_SHEET = '遥测表'
+
+STATIONS = ['城东变', '城西变', '江北变', '河口变', '青山变', '白沙变', '南湖变', '石桥变']
+DEVICES = ['主变', '母线', '开关', '刀闸', '线路', '电容器', '电抗器', 'PT', 'CT', '站用变']
+SIGNALS = ['合位', '分位', '保护动作', '告警', '事故总', '弹簧未储能', '控制回路断线', 'SF6压力低', '装置异常', '通信中断']
+MEASURES = ['有功', '无功', '电流', '电压', '功率因数', '频率', '温度', '档位', 'Ia', 'Ub']
+DEVICE_TYPES = ['1', '2', '3', '4', '5', '6']
+PRIORITIES = ['1', '2', '3', '4']
+
+DIG_SOURCE_COLUMNS = ['名称', '优先级', '备注', '设备类型', '同类型设备号', '是否控制', '分量ID', '控制点号', '遥信点号']
+ANA_SOURCE_COLUMNS = ['名称', '系数', '备注', '设备类型', '同类型设备号', '是否控制', '点号']
+DIG_OUTPUT_COLUMNS = ['名称', '描述', '量测类型', '告警优先级', '设备类型', '同类型设备号', '命名规则',
+                      '是否控制', '分量ID', '控制点号', '遥信点号']
+ANA_OUTPUT_COLUMNS = ['名称', '描述', '量测类型', '系数', '设备类型', '同类型设备号', '命名规则', '是否控制', '点号']
+
+
+def _name(rng: random.Random, words: List[str]) -> str:
+    return f"{rng.choice(STATIONS)}{rng.randint(1, 9)}号{rng.choice(DEVICES)}{rng.choice(words)}"
+
+
+def _dirty(rng: random.Random, value):
+    """按一定比例加上首尾空格或置空，模拟人工维护的表格"""
+    roll = rng.random()
+    if roll < 0.03:
+        return None
+    if roll < 0.10 and isinstance(value, str):
+        return f" {value} "
+    return value
+
+
+def dig_rows(rows: int, seed: int = 0) -> List[list]:
+    """遥信表的数据行（列见 DIG_SOURCE_COLUMNS），含重复行和空行"""
+    rng = random.Random(seed)
+    data = []
+    for i in range(rows):
+        roll = rng.random()
+        if data and roll < 0.02:
+            data.append(list(data[-1]))
+            continue
+        if roll < 0.04:
+            data.append([None] * len(DIG_SOURCE_COLUMNS))
+            continue
+        data.append([
+            _dirty(rng, _name(rng, SIGNALS)),
+            _dirty(rng, rng.choice(PRIORITIES)),
+            rng.choice([None, '', '检修', 'NA', ' 备用 ']),
+            _dirty(rng, rng.choice(DEVICE_TYPES)),
+            _dirty(rng, str(i // 8 + 1)),
+            rng.choice(['0', '1', '0', ' 1']),
+            rng.choice([1, 2]),
+            str(10000 + i // 2),
+            str(i + 1),
+        ])
+    return data
+
+
+def ana_rows(rows: int, seed: int = 0) -> List[list]:
+    """遥测表的数据行（列见 ANA_SOURCE_COLUMNS）"""
+    rng = random.Random(seed + 1)
+    data = []
+    for i in range(rows):
+        if rng.random() < 0.03:
+            data.append([None] * len(ANA_SOURCE_COLUMNS))
+            continue
+        data.append([
+            _dirty(rng, _name(rng, MEASURES)),
+            rng.choice([1, 0.5, 0.001, None, '1']),
+            rng.choice([None, '', 'NA', '计算值']),
+            _dirty(rng, rng.choice(DEVICE_TYPES)),
+            _dirty(rng, str(i // 6 + 1)),
+            rng.choice(['0', '1']),
+            str(i + 1),
+        ])
+    return data
+
+
+def generate_workbook(path: str, rows: int, seed: int = 0):
+    """生成含 遥信表（rows 行）和 遥测表（rows/2 行）的工作簿"""
+    wb = openpyxl.Workbook(write_only=True)
+    for title, columns, data in [(DIG_SHEET, DIG_SOURCE_COLUMNS, dig_rows(rows, seed)),
+                                 (ANA_SHEET, ANA_SOURCE_COLUMNS, ana_rows(rows // 2, seed))]:
+        ws = wb.create_sheet(title)
+        ws.append(columns)
+        for row in data:
+            ws.append(row)
+    wb.save(path)
+
+
+def generate_rules(count: int, seed: int = 0) -> List[Tuple[str, str]]:
+    """生成 KeywordFuzzyMapping 规则：约七成字面量关键字，其余为通配符和正则
+
+    键按 ConfigParser 的规则（小写）不重复；组合用完后在关键字后加序号（对应其他站点的点名）。
+    """
+    rng = random.Random(seed + 2)
+    rules = {}
+    words = SIGNALS + MEASURES
+    while len(rules) < count:
+        index = len(rules)
+        roll = rng.random()
+        word = rng.choice(words)
+        if index < len(words):
+            pattern = words[index]
+        elif roll < 0.7:
+            pattern = f"{rng.choice(STATIONS)}{rng.randint(1, 9)}号{rng.choice(DEVICES)}{word}"
+        elif roll < 0.9:
+            pattern = f"{rng.choice(DEVICES)}*{word}"
+        else:
+            pattern = f"{rng.choice(STATIONS)}[1-{rng.randint(2, 9)}]号{rng.choice(DEVICES)}"
+        key = f"名称_{pattern}"
+        if key.lower() in rules:
+            key = f"{key}{index}"
+        rules[key.lower()] = (key, f"描述:{word}描述{index},量测类型:{rng.randint(1, 40)},"
+                                   f"系数:{rng.choice([1, 10, 100])},告警优先级:{rng.choice(PRIORITIES)},"
+                                   f"命名规则:{rng.choice([0, 0, 1])}")
+    return list(rules.values())
+
+
+def generate_config(path: str, rules: int, seed: int = 0) -> configparser.ConfigParser:
+    """生成与 generate_workbook 配套的 config.ini（UTF-8）并返回解析结果"""
+    config = configparser.ConfigParser(strict=False)
+    config['SheetMapping'] = {DIG_SHEET: 'dig.csv', ANA_SHEET: 'ana.csv'}
+    config[f'{DIG_SHEET}_ColumnMapping'] = {'名称': '描述', '优先级': '告警优先级'}
+    config[f'{ANA_SHEET}_ColumnMapping'] = {'名称': '描述', '系数': '系数'}
+    config[f'{DIG_SHEET}_OutputColumns'] = {'columns': ','.join(DIG_OUTPUT_COLUMNS)}
+    config[f'{ANA_SHEET}_OutputColumns'] = {'columns': ','.join(ANA_OUTPUT_COLUMNS)}
+    config['DataType'] = {'备注': 'str'}
+    config['KeywordFuzzyMapping'] = dict(generate_rules(rules, seed))
+    with open(path, 'w', encoding='utf-8') as f:
+        config.write(f)
+    return config
+
+
+def audit_rows(kind: str, rows: int, seed: int = 0) -> Tuple[List[str], List[list]]:
+    """转换结果形式的 ana/dig 表（表头和数据行），按一定比例含重复、空值等审核问题"""
+    rng = random.Random(seed + (3 if kind == 'ana' else 4))
+    if kind == 'ana':
+        columns = ['设备类型', '同类型设备号', '量测类型', '描述', '点号', '是否控制', '命名规则', '系数']
+    else:
+        columns = ['设备类型', '同类型设备号', '量测类型', '描述', '遥信点号', '命名规则', '告警优先级',
+                   '是否控制', '分量ID', '控制点号']
+    data = []
+    control = '0'
+    for i in range(rows):
+        group = i // 8
+        no_device = rng.random() < 0.005
+        if i % 2 == 0:
+            # 分量ID=1、2 的两行是否控制相同（dig 审核会比较）
+            control = rng.choice(['0', '1', '0', '0']) if rng.random() > 0.01 else '2'
+        row = {
+            '设备类型': '' if no_device else DEVICE_TYPES[group % len(DEVICE_TYPES)],
+            '同类型设备号': '' if no_device or rng.random() < 0.002 else str(group + 1),
+            '量测类型': str((i % 8 if kind == 'ana' else i % 8 // 2) + 1) if rng.random() > 0.02 else rng.choice(['', '1']),
+            '描述': _name(rng, MEASURES if kind == 'ana' else SIGNALS),
+            '点号': str(i + 1) if rng.random() > 0.005 else '1',
+            '遥信点号': str(i + 1) if rng.random() > 0.005 else '1',
+            '是否控制': control,
+            '命名规则': '0' if rng.random() > 0.01 else '1',
+            '系数': rng.choice(['1', '0.5', '']) if rng.random() < 0.05 else '1',
+            '告警优先级': rng.choice(PRIORITIES) if rng.random() > 0.01 else '',
+            '分量ID': str(i % 2 + 1),
+            '控制点号': str(20000 + i // 2),
+        }
+        data.append([row[col] for col in columns])
+    return columns, data
+
+
+def generate_audit_csv(path: str, kind: str, rows: int, seed: int = 0, encoding: str = 'utf-8-sig'):
+    """写出 ana/dig CSV；encoding 可用 'gbk' 生成旧系统导出的文件"""
+    columns, data = audit_rows(kind, rows, seed)
+    with open(path, 'w', encoding=encoding, newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        writer.writerows(data)
@@ -7,6 +7,9 @@ pyinstaller --noconsole --onefile --add-data "config.ini;." --add-data "requirem
 REM 打包 config_maintainer.py
 pyinstaller --noconsole --onefile --add-data "config.ini;." --add-data "requirements.txt;." config_maintainer.py
 
+REM 打包 batch_convert.py（命令行批量转换，保留控制台）
+pyinstaller --onefile --add-data "config.ini;." --add-data "requirements.txt;." batch_convert.py
+
 REM 打包 excel_audit_tool.py
 pyinstaller --noconsole --onefile  --add-data "requirements.txt;." excel_audit_tool.py
 
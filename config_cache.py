@@ -0,0 +1,94 @@
+import configparser
+import hashlib
+import io
+import json
+import logging
+import os
+import sys
+from typing import List, Optional
+
+import pandas as pd
+
+from fuzzy_matcher import FuzzyMappingEngine
+
+# 缓存格式版本：缓存内容的结构变化时加1，旧缓存自动失效
+CACHE_VERSION = 3
+
+logger = logging.getLogger(__name__)
+
+
+class CompiledConfig:
+    """解析好的 config.ini，以及按需构建的 KeywordFuzzyMapping 规则引擎
+
+    规则引擎在首次访问 fuzzy_engine 时构建：编译缓存与配置文件一致时由缓存的规则表还原
+    （不重新解析规则、不预先编译正则），否则解析规则并写入缓存。只读取配置的调用方不承担这部分开销。
+    """
+
+    def __init__(self, config: configparser.ConfigParser, digest: str, cache_path: str):
+        self.config = config
+        self.digest = digest
+        self.cache_path = cache_path
+        self._fuzzy_engine: Optional[FuzzyMappingEngine] = None
+
+    @property
+    def fuzzy_engine(self) -> Optional[FuzzyMappingEngine]:
+        if self._fuzzy_engine is None and 'KeywordFuzzyMapping' in self.config:
+            table = _read_cache(self.cache_path, self.digest)
+            if table is not None:
+                self._fuzzy_engine = FuzzyMappingEngine.from_table(table)
+            else:
+                self._fuzzy_engine = FuzzyMappingEngine.from_config(self.config)
+                _write_cache(self.cache_path, self.digest, self._fuzzy_engine.to_table())
+        return self._fuzzy_engine
+
+
+def get_cache_path(config_file: str) -> str:
+    """编译缓存放在配置文件旁边"""
+    return config_file + '.cache'
+
+
+def cache_key(digest: str) -> dict:
+    """缓存键：配置文件内容哈希，加上缓存格式、Python 和 pandas 版本，任一变化时缓存失效"""
+    return {
+        'version': CACHE_VERSION,
+        'python': sys.version,
+        'pandas': pd.__version__,
+        'digest': digest,
+    }
+
+
+def load_compiled_config(config_file: str) -> CompiledConfig:
+    """读取配置文件（UTF-8编码）并记下内容的 SHA-256，规则引擎在首次使用时构建"""
+    with open(config_file, 'rb') as f:
+        data = f.read()
+    config = configparser.ConfigParser(strict=False)
+    # 与按文本模式（utf-8）打开文件读取的结果一致，包括换行符的转换
+    config.read_file(io.StringIO(data.decode('utf-8'), newline=None), source=config_file)
+    return CompiledConfig(config, hashlib.sha256(data).hexdigest(), get_cache_path(config_file))
+
+
+def _read_cache(cache_path: str, digest: str) -> Optional[List[list]]:
+    """缓存只保存纯数据（JSON）的规则表，读取时不会执行缓存文件中的任何代码"""
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached['key'] == cache_key(digest):
+            return cached['rules']
+    except Exception as e:
+        logger.warning(f"配置缓存读取失败，将重新解析规则: {str(e)}")
+    return None
+
+
+def _write_cache(cache_path: str, digest: str, table: List[list]):
+    """先写临时文件再替换；目录不可写时只记录警告"""
+    tmp_path = cache_path + '.tmp'
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'key': cache_key(digest), 'rules': table}, f, ensure_ascii=False)
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        logger.warning(f"配置缓存写入失败: {str(e)}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
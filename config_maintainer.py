@@ -6,10 +6,22 @@ import re
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QLabel,
     QLineEdit, QPushButton, QFileDialog, QMessageBox, 
-    QWidget, QTextEdit, QHBoxLayout
+    QWidget, QTextEdit, QHBoxLayout, QCheckBox
 )
 from PyQt5.QtCore import Qt
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from config_cache import load_compiled_config
+from csv_loader import read_csv
+from rule_codec import rules_to_table, table_to_rules
+from rule_profile import STATUS_DEAD, STATUS_SHADOWED, load_rule_records, rule_report
+from scan_index import ScanIndex, first_rows, scan_csv
+
+# 快速扫描时同时读取的文件数
+SCAN_WORKERS = min(8, os.cpu_count() or 1)
+# 规则命中报告（保存在配置表格旁）及日志中逐条列出的规则数上限
+RULE_REPORT_NAME = '规则命中报告.csv'
+RULE_REPORT_LOG_LIMIT = 20
 
 class ConfigMaintainer(QMainWindow):
     """配置维护工具"""
@@ -83,6 +95,11 @@ class ConfigMaintainer(QMainWindow):
         button_layout.addWidget(self.export_button)
         button_layout.addWidget(self.update_button)
         button_layout.addWidget(self.scan_button)
+        self.profile_button = QPushButton("规则命中分析")
+        button_layout.addWidget(self.profile_button)
+        self.fast_scan_check = QCheckBox("快速扫描（多线程，只读取所需列）")
+        self.fast_scan_check.setChecked(True)
+        button_layout.addWidget(self.fast_scan_check)
         main_layout.addLayout(button_layout)
         
         # 日志显示
@@ -105,6 +122,7 @@ class ConfigMaintainer(QMainWindow):
         self.export_button.clicked.connect(self.export_config_table)
         self.update_button.clicked.connect(self.update_config)
         self.scan_button.clicked.connect(self.scan_folder)
+        self.profile_button.clicked.connect(self.analyze_rule_hits)
         
     def select_config_file(self):
         """选择配置文件"""
@@ -127,8 +145,8 @@ class ConfigMaintainer(QMainWindow):
         try:
             if not os.path.exists(self.config_file):
                 self.create_default_config()
-            with open(self.config_file, 'r', encoding='utf-8') as f:
-                self.config.read_file(f)
+            # 配置文件未变化时直接加载编译缓存
+            self.config = load_compiled_config(self.config_file).config
             self.log_message("配置加载成功")
             self.auto_export_config_table()  # 自动导出配置表格
         except Exception as e:
@@ -175,45 +193,17 @@ class ConfigMaintainer(QMainWindow):
             self.log_message(f"创建配置文件失败: {str(e)}", "ERROR")
             raise
             
+    def build_config_table(self, default_coef: str = '') -> pd.DataFrame:
+        """把KeywordFuzzyMapping转换为按描述排序的配置表格"""
+        if 'KeywordFuzzyMapping' not in self.config:
+            raise ValueError("配置文件中没有KeywordFuzzyMapping部分")
+        df = rules_to_table(self.config['KeywordFuzzyMapping'].items(), default_coef)
+        return df.sort_values('描述')  # 按描述排序
+
     def export_config_table(self):
         """导出配置表格"""
         try:
-            if 'KeywordFuzzyMapping' not in self.config:
-                raise ValueError("配置文件中没有KeywordFuzzyMapping部分")
-                
-            # 创建DataFrame
-            data = []
-            for key, value in self.config['KeywordFuzzyMapping'].items():
-                if '_' in key:
-                    col, pattern = key.split('_', 1)
-                    # 解析命名规则字符串
-                    rule_dict = {}
-                    for rule in value.split(','):
-                        if ':' in rule:
-                            rule_col, rule_val = rule.split(':', 1)
-                            rule_dict[rule_col.strip()] = rule_val.strip()
-                    
-                    # 提取命名规则中的数字（最后一个值）
-                    rules = value.split(',')
-                    naming_rule = ''
-                    if rules:
-                        last_rule = rules[-1]
-                        if ':' in last_rule:
-                            naming_rule = last_rule.split(':')[-1]
-                    
-                    row = {
-                        '原列名称': col,
-                        '原列描述': pattern,
-                        '描述': rule_dict.get('描述', ''),
-                        '量测类型': rule_dict.get('量测类型', ''),
-                        '系数': rule_dict.get('系数', ''),
-                        '告警优先级': rule_dict.get('告警优先级', ''),
-                        '命名规则': naming_rule
-                    }
-                    data.append(row)
-                    
-            df = pd.DataFrame(data)
-            df = df.sort_values('描述')  # 按描述排序
+            df = self.build_config_table()
             
             # 保存为CSV
             save_path, _ = QFileDialog.getSaveFileName(
@@ -235,41 +225,11 @@ class ConfigMaintainer(QMainWindow):
                 self.log_message("未找到配置表格.csv，请先导出配置表格！", "ERROR")
                 return
 
-            try:
-                df = pd.read_csv(config_table_path, encoding='utf-8')
-            except Exception:
-                df = pd.read_csv(config_table_path, encoding='gbk')
-
-            # 更新配置
-            if 'KeywordFuzzyMapping' not in self.config:
-                self.config['KeywordFuzzyMapping'] = {}
+            df = read_csv(config_table_path)
 
-            self.config['KeywordFuzzyMapping'].clear()
-            for _, row in df.iterrows():
-                # 构建命名规则字符串
-                rules = []
-                if row['描述'] and not pd.isna(row['描述']):
-                    rules.append(f"描述:{row['描述']}")
-                if row['量测类型'] and not pd.isna(row['量测类型']):
-                    rules.append(f"量测类型:{row['量测类型']}")
-                if row['系数'] and not pd.isna(row['系数']):
-                    try:
-                        coef = int(float(row['系数']))
-                        rules.append(f"系数:{coef}")
-                    except Exception:
-                        pass
-                if row['告警优先级'] and not pd.isna(row['告警优先级']):
-                    try:
-                        alarm = int(float(row['告警优先级']))
-                        rules.append(f"告警优先级:{alarm}")
-                    except Exception:
-                        pass
-                if row['命名规则'] and not pd.isna(row['命名规则']):
-                    rules.append(f"命名规则:{row['命名规则']}")
-
-                key = f"{row['原列名称']}_{row['原列描述']}"
-                value = ','.join(rules)
-                self.config['KeywordFuzzyMapping'][key] = value
+            # 更新配置（整段替换，保持该段在文件中的位置）
+            keys, rules = table_to_rules(df)
+            self.config['KeywordFuzzyMapping'] = dict(zip(keys, rules))
 
             # 保存配置
             with open(self.config_file, 'w', encoding='utf-8') as f:
@@ -292,65 +252,70 @@ class ConfigMaintainer(QMainWindow):
                 self.log_message("未找到配置表格.csv，请先导出配置表格！", "ERROR")
                 return
 
-            try:
-                df = pd.read_csv(config_table_path, encoding='utf-8')
-            except Exception:
-                df = pd.read_csv(config_table_path, encoding='gbk')
+            df = read_csv(config_table_path)
 
             existing_descriptions = set(df['描述'].tolist())
             new_rows = []
+            # 配置表格中每个原列描述/描述第一次出现的行，补全缺失值时直接查字典
+            rows_by_pattern = first_rows(df, '原列描述')
+            rows_by_desc = first_rows(df, '描述')
+            # 扫描索引：未变化的文件直接使用上次提取的描述，不再重新读取
+            scan_index = ScanIndex(os.path.join(os.path.dirname(config_table_path), '扫描索引.json'))
+            skipped = 0
 
-            # 遍历所有csv文件
+            # 遍历所有csv文件，先按索引找出需要重新读取的文件
+            csv_files = []
             for root, _, files in os.walk(folder_path):
                 for file in files:
                     if file.lower().endswith('.csv'):
                         file_path = os.path.join(root, file)
-                        self.log_message(f"扫描文件: {file_path}")
-                        # 优先尝试utf-8，失败后尝试gbk
-                        file_df = None
-                        try:
-                            file_df = pd.read_csv(file_path, encoding='utf-8')
-                        except Exception as e_utf8:
-                            try:
-                                file_df = pd.read_csv(file_path, encoding='gbk')
-                                self.log_message(f"文件用gbk编码成功读取: {file_path}")
-                            except Exception as e_gbk:
-                                self.log_message(f"读取文件失败: {file_path}, 错误: {e_gbk}", "ERROR")
-                                continue
-                        if file_df is not None and '描述' in file_df.columns:
-                            for desc in file_df['描述'].unique():
-                                if desc not in existing_descriptions:
-                                    self.log_message(f"发现新描述: {desc}")
-                                    # 取第一个匹配该描述的行
-                                    csv_row = file_df[file_df['描述'] == desc].iloc[0]
-                                    def safe_get(col):
-                                        return csv_row[col] if col in csv_row and not pd.isna(csv_row[col]) else ''
-                                    new_row = {
-                                        '原列名称': '名称',
-                                        '原列描述': desc,
-                                        '描述': desc,
-                                        '量测类型': safe_get('量测类型'),
-                                        '系数':  safe_get('系数') or '1',
-                                        '告警优先级': safe_get('告警优先级'),
-                                        '命名规则': safe_get('命名规则') or '0'
-                                    }
-                                    # 如果csv没有这些列，再用配置表格补全
-                                    if not new_row['量测类型'] or not new_row['系数'] or not new_row['告警优先级'] or not new_row['命名规则']:
-                                        match_row = df[df['原列描述'] == desc]
-                                        if match_row.empty:
-                                            match_row = df[df['描述'] == desc]
-                                        if not match_row.empty:
-                                            row_data = match_row.iloc[0]
-                                            if not new_row['量测类型']:
-                                                new_row['量测类型'] = row_data.get('量测类型', '')
-                                            if not new_row['系数']:
-                                                new_row['系数'] = row_data.get('系数', '1')
-                                            if not new_row['告警优先级']:
-                                                new_row['告警优先级'] = row_data.get('告警优先级', '')
-                                            if not new_row['命名规则']:
-                                                new_row['命名规则'] = row_data.get('命名规则', '0')
-                                    new_rows.append(new_row)
-                                    existing_descriptions.add(desc)
+                        stat = os.stat(file_path)
+                        csv_files.append((file_path, stat, scan_index.lookup(file_path, stat)))
+            scanned_paths = [file_path for file_path, _, _ in csv_files]
+            to_read = [file_path for file_path, _, desc_rows in csv_files if desc_rows is None]
+            read_results = self.read_scan_files(to_read, self.fast_scan_check.isChecked())
+
+            # 按遍历顺序合并，结果与逐个读取时一致
+            for file_path, stat, desc_rows in csv_files:
+                if desc_rows is None:
+                    desc_rows = self.log_scan_result(file_path, *read_results[file_path])
+                    if desc_rows is None:
+                        continue
+                    scan_index.update(file_path, stat, desc_rows)
+                else:
+                    skipped += 1
+                for desc, values in desc_rows:
+                    if desc not in existing_descriptions:
+                        self.log_message(f"发现新描述: {desc}")
+                        new_row = {
+                            '原列名称': '名称',
+                            '原列描述': desc,
+                            '描述': desc,
+                            '量测类型': values['量测类型'],
+                            '系数':  values['系数'] or '1',
+                            '告警优先级': values['告警优先级'],
+                            '命名规则': values['命名规则'] or '0'
+                        }
+                        # 如果csv没有这些列，再用配置表格补全
+                        if not new_row['量测类型'] or not new_row['系数'] or not new_row['告警优先级'] or not new_row['命名规则']:
+                            row_data = rows_by_pattern.get(desc)
+                            if row_data is None:
+                                row_data = rows_by_desc.get(desc)
+                            if row_data is not None:
+                                if not new_row['量测类型']:
+                                    new_row['量测类型'] = row_data.get('量测类型', '')
+                                if not new_row['系数']:
+                                    new_row['系数'] = row_data.get('系数', '1')
+                                if not new_row['告警优先级']:
+                                    new_row['告警优先级'] = row_data.get('告警优先级', '')
+                                if not new_row['命名规则']:
+                                    new_row['命名规则'] = row_data.get('命名规则', '0')
+                        new_rows.append(new_row)
+                        existing_descriptions.add(desc)
+
+            scan_index.prune(folder_path, scanned_paths)
+            scan_index.save()
+            self.log_message(f"共扫描 {len(scanned_paths)} 个CSV文件，其中 {skipped} 个未变化，使用扫描索引")
 
             # 合并新行
             if new_rows:
@@ -365,41 +330,72 @@ class ConfigMaintainer(QMainWindow):
         except Exception as e:
             self.log_message(f"扫描文件夹失败: {str(e)}", "ERROR")
             
+    def analyze_rule_hits(self):
+        """根据转换时记录的性能统计，找出未命中和被后面规则完全覆盖的模糊映射规则"""
+        try:
+            file_paths, _ = QFileDialog.getOpenFileNames(
+                self, "选择性能统计文件（可多选）", "", "JSON Lines (*.jsonl)"
+            )
+            if not file_paths:
+                return
+            if 'KeywordFuzzyMapping' not in self.config:
+                self.config = load_compiled_config(self.config_file).config
+            records = load_rule_records(file_paths)
+            if not records:
+                self.log_message("所选文件中没有规则统计记录，请在转换时勾选性能统计", "ERROR")
+                return
+            report = rule_report(self.config['KeywordFuzzyMapping'].items(), records)
+
+            save_path = os.path.join(os.path.dirname(__file__), RULE_REPORT_NAME)
+            report.to_csv(save_path, index=False, encoding='utf-8-sig')
+            self.log_message(f"共分析 {len(file_paths)} 个统计文件、{len(report)} 条规则，"
+                             f"状态统计: {report['状态'].value_counts().to_dict()}")
+            for status in (STATUS_DEAD, STATUS_SHADOWED):
+                keys = report.loc[report['状态'] == status, '规则'].tolist()
+                if not keys:
+                    continue
+                self.log_message(f"{status}的规则 {len(keys)} 条（在所统计的数据上可考虑删除）:")
+                for key in keys[:RULE_REPORT_LOG_LIMIT]:
+                    self.log_message(f"  {key}")
+                if len(keys) > RULE_REPORT_LOG_LIMIT:
+                    self.log_message(f"  ……其余 {len(keys) - RULE_REPORT_LOG_LIMIT} 条见报告")
+            self.log_message(f"规则命中报告已保存到: {save_path}")
+
+        except Exception as e:
+            self.log_message(f"规则命中分析失败: {str(e)}", "ERROR")
+
+    def read_scan_files(self, file_paths, fast: bool):
+        """读取需要扫描的CSV，返回 {路径: (描述行, 编码, 错误)}
+
+        快速扫描时只读取扫描需要的列，并用线程池同时读取多个文件。
+        """
+        def read(file_path):
+            try:
+                desc_rows, encoding = scan_csv(file_path, prune_columns=fast)
+                return desc_rows, encoding, None
+            except Exception as e:
+                return None, None, e
+
+        workers = min(SCAN_WORKERS, len(file_paths)) if fast else 1
+        if workers <= 1:
+            return {file_path: read(file_path) for file_path in file_paths}
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return dict(zip(file_paths, pool.map(read, file_paths)))
+
+    def log_scan_result(self, file_path: str, desc_rows, encoding, error):
+        """在界面线程中按顺序写出单个文件的扫描日志，读取失败时返回None"""
+        self.log_message(f"扫描文件: {file_path}")
+        if error is not None:
+            self.log_message(f"读取文件失败: {file_path}, 错误: {error}", "ERROR")
+            return None
+        if encoding == 'gbk':
+            self.log_message(f"文件用gbk编码成功读取: {file_path}")
+        return desc_rows
+            
     def auto_export_config_table(self):
         """自动导出配置表格到当前目录，文件名为配置表格.csv"""
         try:
-            if 'KeywordFuzzyMapping' not in self.config:
-                raise ValueError("配置文件中没有KeywordFuzzyMapping部分")
-            # 创建DataFrame
-            data = []
-            for key, value in self.config['KeywordFuzzyMapping'].items():
-                if '_' in key:
-                    col, pattern = key.split('_', 1)
-                    # 解析命名规则字符串
-                    rule_dict = {}
-                    for rule in value.split(','):
-                        if ':' in rule:
-                            rule_col, rule_val = rule.split(':', 1)
-                            rule_dict[rule_col.strip()] = rule_val.strip()
-                    # 提取命名规则中的数字（最后一个值）
-                    rules = value.split(',')
-                    naming_rule = ''
-                    if rules:
-                        last_rule = rules[-1]
-                        if ':' in last_rule:
-                            naming_rule = last_rule.split(':')[-1]
-                    row = {
-                        '原列名称': col,
-                        '原列描述': pattern,
-                        '描述': rule_dict.get('描述', ''),
-                        '量测类型': rule_dict.get('量测类型', ''),
-                        '系数': rule_dict.get('系数', '1'),
-                        '告警优先级': rule_dict.get('告警优先级', ''),
-                        '命名规则': naming_rule
-                    }
-                    data.append(row)
-            df = pd.DataFrame(data)
-            df = df.sort_values('描述')  # 按描述排序
+            df = self.build_config_table(default_coef='1')
             save_path = os.path.join(os.path.dirname(__file__), '配置表格.csv')
             df.to_csv(save_path, index=False, encoding='utf-8-sig')
             self.log_message(f"配置表格已自动导出到: {save_path}")
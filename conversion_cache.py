@@ -0,0 +1,248 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+# 缓存格式版本：条目结构或转换结果的含义变化时加1，旧条目不再命中
+CACHE_VERSION = 1
+
+# 默认缓存目录名（放在配置文件旁）和容量上限
+CACHE_DIR_NAME = '转换缓存'
+DEFAULT_MAX_MB = 2048
+
+ENTRY_FILE = 'entry.json'
+# 参与配置指纹的配置段（名称或后缀）
+CONFIG_SECTIONS = ('SheetMapping', 'DataType', 'KeywordFuzzyMapping')
+CONFIG_SECTION_SUFFIXES = ('_ColumnMapping', '_OutputColumns')
+# 不影响输出CSV内容的选项，不参与缓存键
+RUNTIME_OPTIONS = frozenset(['max_workers', 'audit', 'profile', 'incremental', 'cache_dir', 'cache_max_mb',
+                             'cache_link'])
+
+logger = logging.getLogger(__name__)
+
+
+def file_digest(path: str, block_size: int = 1024 * 1024) -> str:
+    """文件内容的 SHA-256"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def config_fingerprint(config) -> List[list]:
+    """影响转换结果的配置段及其内容（保持规则顺序，后面的规则覆盖前面的规则）"""
+    sections = [section for section in config.sections()
+                if section in CONFIG_SECTIONS or section.endswith(CONFIG_SECTION_SUFFIXES)]
+    return [[section, list(config[section].items())] for section in sorted(sections)]
+
+
+def options_fingerprint(clean_options: dict) -> Dict:
+    return {key: value for key, value in clean_options.items() if key not in RUNTIME_OPTIONS}
+
+
+def break_hard_link(path: str):
+    """输出文件与缓存共用同一文件（硬链接恢复）时先删除，重新写出时不会改动缓存中的文件"""
+    try:
+        if os.stat(path).st_nlink > 1:
+            os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class ConversionCache:
+    """按内容寻址的转换缓存：工作簿内容、配置和清洗选项都未变化时直接复用上次转换出的CSV
+
+    每个条目是缓存目录下以缓存键命名的子目录，含各Sheet的CSV和 entry.json（行数、警告等）。
+    条目先写入临时目录再整体改名，多个进程同时使用同一缓存目录也不会读到写了一半的条目。
+    命中时更新 entry.json 的修改时间，超过容量上限时按修改时间删除最久未使用的条目。
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024, link: bool = False):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        # 恢复时用硬链接代替复制（不支持时自动退回复制）
+        self.link = link
+
+    @classmethod
+    def from_options(cls, clean_options: dict) -> Optional['ConversionCache']:
+        """clean_options['cache_dir'] 为空时不使用缓存"""
+        cache_dir = clean_options.get('cache_dir')
+        if not cache_dir:
+            return None
+        max_mb = clean_options.get('cache_max_mb', DEFAULT_MAX_MB)
+        return cls(cache_dir, int(max_mb * 1024 * 1024), clean_options.get('cache_link', False))
+
+    def make_key(self, excel_file: str, config, clean_options: dict) -> str:
+        """工作簿内容、配置、清洗选项和 pandas 版本共同决定的缓存键"""
+        fingerprint = {
+            'version': CACHE_VERSION,
+            'pandas': pd.__version__,
+            'workbook': file_digest(excel_file),
+            'config': config_fingerprint(config),
+            'options': options_fingerprint(clean_options),
+        }
+        data = json.dumps(fingerprint, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def _read_entry(self, entry_dir: str) -> Optional[dict]:
+        try:
+            with open(os.path.join(entry_dir, ENTRY_FILE), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            return entry if entry.get('version') == CACHE_VERSION else None
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"转换缓存条目读取失败: {entry_dir}: {str(e)}")
+            return None
+
+    def restore(self, key: str, output_dir: str) -> Optional[List[Dict]]:
+        """命中时把缓存的CSV恢复到输出目录，返回与转换结果相同格式的列表；未命中返回None"""
+        entry_dir = self._entry_dir(key)
+        entry = self._read_entry(entry_dir)
+        if entry is None:
+            return None
+        for sheet in entry['sheets']:
+            path = os.path.join(entry_dir, sheet['file'])
+            if not os.path.isfile(path) or os.path.getsize(path) != sheet['size']:
+                logger.warning(f"转换缓存条目已损坏，删除后重新转换: {entry_dir}")
+                self._remove(entry_dir)
+                return None
+
+        results = []
+        try:
+            for sheet in entry['sheets']:
+                output_path = os.path.join(output_dir, sheet['output_name'])
+                self._restore_file(os.path.join(entry_dir, sheet['file']), output_path)
+                results.append({
+                    'sheet': sheet['sheet'],
+                    'output': output_path,
+                    'rows': sheet['rows'],
+                    'warnings': list(sheet['warnings']),
+                    'findings': None,
+                    'metrics': None,
+                    'cached': True,
+                })
+            os.utime(os.path.join(entry_dir, ENTRY_FILE))  # 记为最近使用
+        except OSError as e:
+            logger.warning(f"转换缓存恢复失败，重新转换: {str(e)}")
+            return None
+        return results
+
+    def _restore_file(self, src: str, dest: str):
+        """先链接或复制到临时文件再替换，不会留下写了一半的CSV"""
+        tmp_path = dest + '.tmp'
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        linked = False
+        if self.link:
+            try:
+                os.link(src, tmp_path)
+                linked = True
+            except OSError:
+                pass  # 跨磁盘或文件系统不支持硬链接
+        if not linked:
+            shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dest)
+
+    def store(self, key: str, results: List[Dict], output_dir: str, excel_file: str = ''):
+        """转换成功后保存各Sheet的CSV；写入失败只记录警告，不影响转换结果"""
+        entry_dir = self._entry_dir(key)
+        if os.path.exists(entry_dir):
+            return
+        tmp_dir = os.path.join(self.cache_dir, f".tmp-{key}-{os.getpid()}-{threading.get_ident()}")
+        try:
+            sheets = []
+            size = 0
+            for index, result in enumerate(results):
+                sheet_size = os.path.getsize(result['output'])
+                sheets.append({
+                    'sheet': result['sheet'],
+                    'output_name': os.path.relpath(result['output'], output_dir),
+                    'file': f"sheet{index}.csv",
+                    'rows': result['rows'],
+                    'warnings': list(result['warnings']),
+                    'size': sheet_size,
+                })
+                size += sheet_size
+            if size > self.max_bytes:
+                logger.info(f"转换结果 {size / 1024 / 1024:.1f} MB 超过缓存容量上限，不缓存: {excel_file}")
+                return
+
+            os.makedirs(tmp_dir)
+            for result, sheet in zip(results, sheets):
+                shutil.copyfile(result['output'], os.path.join(tmp_dir, sheet['file']))
+            entry = {'version': CACHE_VERSION, 'workbook': excel_file, 'created': time.time(),
+                     'size': size, 'sheets': sheets}
+            with open(os.path.join(tmp_dir, ENTRY_FILE), 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            try:
+                os.rename(tmp_dir, entry_dir)
+            except OSError:
+                if not os.path.exists(entry_dir):
+                    raise
+                # 其他进程已写入同一条目
+            self.evict()
+        except Exception as e:
+            logger.warning(f"转换缓存写入失败: {str(e)}")
+        finally:
+            if os.path.exists(tmp_dir):
+                self._remove(tmp_dir)
+
+    def entries(self) -> List[dict]:
+        """全部条目的 {path, size, last_used}，按最近使用时间从旧到新排列"""
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for item in os.scandir(self.cache_dir):
+            if not item.is_dir() or item.name.startswith('.'):
+                continue
+            entry = self._read_entry(item.path)
+            if entry is None:
+                continue
+            try:
+                last_used = os.stat(os.path.join(item.path, ENTRY_FILE)).st_mtime
+            except OSError:
+                continue
+            entries.append({'path': item.path, 'size': entry['size'], 'last_used': last_used})
+        return sorted(entries, key=lambda entry: entry['last_used'])
+
+    def evict(self) -> int:
+        """删除最久未使用的条目直到总大小不超过上限，返回删除的条目数"""
+        entries = self.entries()
+        total = sum(entry['size'] for entry in entries)
+        removed = 0
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(entry['path'])
+            total -= entry['size']
+            removed += 1
+        if removed:
+            logger.info(f"转换缓存超过容量上限，已删除 {removed} 个最久未使用的条目")
+        return removed
+
+    def clear(self) -> int:
+        """使全部缓存失效（删除缓存目录下的所有条目），返回删除的条目数"""
+        if not os.path.isdir(self.cache_dir):
+            return 0
+        removed = 0
+        for item in os.scandir(self.cache_dir):
+            if item.is_dir():
+                self._remove(item.path)
+                removed += not item.name.startswith('.')
+        logger.info(f"已清空转换缓存: {self.cache_dir}，共 {removed} 个条目")
+        return removed
+
+    @staticmethod
+    def _remove(path: str):
+        shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,505 @@
+import os
+import sys
+import logging
+import configparser
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+from arrow_strings import to_arrow_strings
+from audit_engine import AuditFindings, as_csv_dtypes, audit_csv, audit_dataframe, audit_kind
+from config_cache import load_compiled_config
+from conversion_cache import ConversionCache, break_hard_link
+from csv_writer import atomic_output, write_csv, write_frame
+from data_cleaner import DataCleaner
+from fuzzy_matcher import FuzzyMappingEngine
+from pipeline_metrics import StageMetrics, measure, measure_iter
+from sheet_manifest import SheetManifest, sheet_keys
+from sheet_reader import DEFAULT_CHUNK_SIZE, estimate_sheet_rows, iter_sheet_chunks
+
+# 进度回调：progress_callback(完成比例0~1, 说明文字)
+ProgressCallback = Callable[[float, str], None]
+# Sheet内的进度回调：on_progress(已读取行数, 估计总行数, 说明文字)，说明文字为空时显示已读取行数
+SheetProgress = Callable[..., None]
+
+
+def get_config_path(config_name="config.ini"):
+    """动态获取配置文件路径（兼容打包环境）"""
+    if getattr(sys, 'frozen', False):
+        # 打包后：配置文件在EXE同级目录
+        base_dir = os.path.dirname(sys.executable)
+    else:
+        # 开发环境：配置文件在脚本所在目录
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base_dir, config_name)
+
+
+def load_config(config_file: str) -> configparser.ConfigParser:
+    """读取配置文件（UTF-8编码），文件未变化时直接使用编译缓存"""
+    return load_compiled_config(config_file).config
+
+
+class ConversionCancelled(Exception):
+    """用户取消了转换"""
+
+
+def _check_cancelled(cancel_event):
+    if cancel_event is not None and cancel_event.is_set():
+        raise ConversionCancelled("转换已取消")
+
+
+class _SheetWidened(Exception):
+    """分块转换中后面的块比已写出的块多出列（行超出表头宽度），需要按新的宽度重新转换"""
+
+    def __init__(self, width: int):
+        super().__init__(width)
+        self.width = width
+
+
+class _CastFailed(Exception):
+    """分块转换中后面的块类型转换失败，而前面已写出的块转换成功，需要对这些列不做转换重新转换"""
+
+    def __init__(self, columns: set):
+        super().__init__(columns)
+        self.columns = columns
+
+
+class WarningCollector(logging.Handler):
+    """收集转换过程中产生的警告及以上级别日志"""
+
+    def __init__(self):
+        super().__init__(level=logging.WARNING)
+        self.messages: List[str] = []
+
+    def emit(self, record: logging.LogRecord):
+        self.messages.append(record.getMessage())
+
+    @classmethod
+    @contextmanager
+    def capture(cls):
+        """在 with 块内挂到根日志器上收集警告"""
+        collector = cls()
+        root_logger = logging.getLogger()
+        root_logger.addHandler(collector)
+        try:
+            yield collector
+        finally:
+            root_logger.removeHandler(collector)
+
+
+class ExcelConverter:
+    """Excel转CSV的转换逻辑（不依赖Qt，GUI和工作进程共用）"""
+
+    def __init__(self, config, fuzzy_engine: Optional[FuzzyMappingEngine] = None):
+        self.config = config
+        self.cleaner = DataCleaner(config, fuzzy_engine)
+        self.logger = logging.getLogger(__name__)
+        # 最近一个Sheet的阶段统计（clean_options['profile'] 为真时）
+        self.last_metrics: Optional[StageMetrics] = None
+
+    def process_excel_file(self, excel_file: str, output_dir: str, clean_options: dict = None,
+                           progress_callback: Optional[ProgressCallback] = None, cancel_event=None) -> int:
+        """转换工作簿中所有已映射的Sheet，返回成功转换的Sheet数"""
+        return len(self.convert_workbook(excel_file, output_dir, clean_options, progress_callback, cancel_event))
+
+    def convert_workbook(self, excel_file: str, output_dir: str, clean_options: dict = None,
+                         progress_callback: Optional[ProgressCallback] = None, cancel_event=None) -> List[Dict]:
+        """转换工作簿中所有已映射的Sheet，按 SheetMapping 顺序返回每个Sheet的行数和警告
+
+        cancel_event（threading.Event）被置位后在下一个Sheet或数据块边界抛出 ConversionCancelled，
+        未写完的临时文件会被删除，已有的CSV保持不变。clean_options['cache_dir'] 不为空时使用转换缓存：工作簿、配置和清洗选项
+        都未变化时直接恢复上次转换出的CSV（结果带 'cached' 标记）；未命中时按 clean_options['incremental']
+        只转换有变化的Sheet（见 convert_all_sheets）。
+        """
+        if clean_options is None:
+            clean_options = {}
+
+        cache = ConversionCache.from_options(clean_options)
+        if cache is None:
+            return self.convert_all_sheets(excel_file, output_dir, clean_options, progress_callback, cancel_event)
+
+        key = cache.make_key(excel_file, self.config, clean_options)
+        results = cache.restore(key, output_dir)
+        if results is not None:
+            self.logger.info(f"工作簿和配置未变化，使用转换缓存: {excel_file}")
+            for result in results:
+                self.logger.info(f"Sheet '{result['sheet']}' 从缓存恢复，共 {result['rows']} 行")
+                if clean_options.get('audit', False):
+                    result['findings'] = self.audit_file(result['output'], clean_options.get('arrow_strings', False))
+            if clean_options.get('incremental', False):
+                self.record_manifest(excel_file, output_dir, results, clean_options)
+            if progress_callback:
+                progress_callback(1.0, f"使用转换缓存，共 {len(results)} 个Sheet")
+            return results
+
+        results = self.convert_all_sheets(excel_file, output_dir, clean_options, progress_callback, cancel_event)
+        cache.store(key, results, output_dir, excel_file)
+        return results
+
+    def convert_all_sheets(self, excel_file: str, output_dir: str, clean_options: dict,
+                           progress_callback: Optional[ProgressCallback] = None, cancel_event=None) -> List[Dict]:
+        """逐个或并行转换全部已映射的Sheet（不使用转换缓存）
+
+        clean_options['incremental'] 为真时按输出目录中的转换清单跳过未变化的Sheet，保留其现有CSV
+        （结果带 'unchanged' 标记），转换完成后更新清单。
+        """
+        with pd.ExcelFile(excel_file, engine='openpyxl') as xls:
+            tasks = [(sheet_name, output_name) for sheet_name, output_name in self.config['SheetMapping'].items()
+                     if sheet_name in xls.sheet_names]
+            manifest = None
+            keys: Dict[str, str] = {}
+            unchanged: Dict[str, Dict] = {}
+            if clean_options.get('incremental', False):
+                manifest = SheetManifest(output_dir)
+                keys = sheet_keys(excel_file, self.config, tasks, clean_options)
+                unchanged = self.unchanged_sheets(manifest, keys, output_dir, tasks, clean_options)
+            pending = [task for task in tasks if task[0] not in unchanged]
+            for _, output_name in pending:
+                break_hard_link(os.path.join(output_dir, output_name))
+
+            max_workers = clean_options.get('max_workers', 0)
+            parallel = max_workers > 1 and len(pending) > 1
+            if not parallel:
+                converted = self.convert_sheets_serial(xls, output_dir, pending, clean_options,
+                                                       progress_callback, cancel_event)
+        if parallel:
+            converted = self.convert_sheets_parallel(excel_file, output_dir, pending, clean_options, max_workers,
+                                                     progress_callback, cancel_event)
+
+        by_sheet = dict(unchanged)
+        by_sheet.update((result['sheet'], result) for result in converted)
+        if manifest is not None:
+            for result in converted:
+                manifest.update(keys.get(result['sheet']), result)
+            manifest.save(by_sheet)
+        return [by_sheet[sheet_name] for sheet_name, _ in tasks]
+
+    def convert_sheets_serial(self, xls: pd.ExcelFile, output_dir: str, tasks: list, clean_options: dict,
+                              progress_callback: Optional[ProgressCallback] = None,
+                              cancel_event=None) -> List[Dict]:
+        """在当前进程中逐个转换Sheet"""
+        results = []
+        for index, (sheet_name, output_name) in enumerate(tasks):
+            _check_cancelled(cancel_event)
+            output_path = os.path.join(output_dir, output_name)
+            on_progress = _sheet_progress(progress_callback, index, len(tasks), sheet_name)
+            with WarningCollector.capture() as collector:
+                rows, findings = self.convert_sheet(xls, sheet_name, output_path, clean_options,
+                                                    on_progress, cancel_event)
+            results.append(_sheet_result(sheet_name, output_path, rows, collector, findings, self.last_metrics))
+            if progress_callback:
+                progress_callback((index + 1) / len(tasks), f"Sheet '{sheet_name}' 转换完成，共 {rows} 行")
+        return results
+
+    def unchanged_sheets(self, manifest: SheetManifest, keys: Dict[str, str], output_dir: str, tasks: list,
+                         clean_options: dict) -> Dict[str, Dict]:
+        """转换清单中未变化且输出CSV未被改动的Sheet，返回 Sheet名 → 转换结果（沿用上次的行数和警告）"""
+        unchanged = {}
+        for sheet_name, output_name in tasks:
+            output_path = os.path.join(output_dir, output_name)
+            entry = manifest.lookup(sheet_name, keys.get(sheet_name), output_path)
+            if entry is None:
+                continue
+            self.logger.info(f"Sheet '{sheet_name}' 未变化，保留现有CSV，共 {entry['rows']} 行")
+            findings = None
+            if clean_options.get('audit', False):
+                findings = self.audit_file(output_path, clean_options.get('arrow_strings', False))
+            unchanged[sheet_name] = {
+                'sheet': sheet_name,
+                'output': output_path,
+                'rows': entry['rows'],
+                'warnings': list(entry['warnings']),
+                'findings': findings,
+                'metrics': None,
+                'unchanged': True,
+            }
+        return unchanged
+
+    def record_manifest(self, excel_file: str, output_dir: str, results: List[Dict], clean_options: dict):
+        """把从转换缓存恢复的CSV记入转换清单，之后工作簿变化时未变化的Sheet仍可跳过"""
+        tasks = [(result['sheet'], self.config['SheetMapping'][result['sheet']]) for result in results]
+        keys = sheet_keys(excel_file, self.config, tasks, clean_options)
+        manifest = SheetManifest(output_dir)
+        for result in results:
+            manifest.update(keys.get(result['sheet']), result)
+        manifest.save([sheet_name for sheet_name, _ in tasks])
+
+    def convert_sheets_parallel(self, excel_file: str, output_dir: str, tasks: list,
+                                clean_options: dict, max_workers: int,
+                                progress_callback: Optional[ProgressCallback] = None,
+                                cancel_event=None) -> List[Dict]:
+        """在多个进程中并行转换Sheet，每个进程独立打开工作簿并写出自己的CSV
+
+        结果按 SheetMapping 顺序返回；任一Sheet失败时抛出按该顺序最先失败的异常。
+        取消时尚未开始的Sheet不再转换，已在进程中运行的Sheet会完整写完。
+        """
+        workers = min(max_workers, len(tasks))
+        self.logger.info(f"并行转换 {len(tasks)} 个Sheet，进程数: {workers}")
+        # 规则引擎随配置一起传给工作进程，不在每个进程中重新编译
+        fuzzy_engine = self.cleaner.get_fuzzy_engine() if 'KeywordFuzzyMapping' in self.config else None
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(self.config, fuzzy_engine)) as executor:
+            futures = [
+                executor.submit(_convert_sheet_worker, excel_file, sheet_name,
+                                os.path.join(output_dir, output_name), clean_options)
+                for sheet_name, output_name in tasks
+            ]
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                if progress_callback and done:
+                    finished = len(futures) - len(pending)
+                    progress_callback(finished / len(futures), f"已完成 {finished}/{len(futures)} 个Sheet")
+                if pending and cancel_event is not None and cancel_event.is_set():
+                    for future in pending:
+                        future.cancel()
+                    raise ConversionCancelled("转换已取消")
+            results = [future.result() for future in futures]
+
+        for result in results:
+            self.logger.info(
+                f"Sheet '{result['sheet']}' 转换完成，共 {result['rows']} 行，警告 {len(result['warnings'])} 条"
+            )
+        return results
+
+    def convert_sheet(self, xls: pd.ExcelFile, sheet_name: str, output_path: str, clean_options: dict,
+                      on_progress: Optional[SheetProgress] = None,
+                      cancel_event=None) -> Tuple[int, Optional[AuditFindings]]:
+        """转换单个Sheet并写出CSV，返回写出的行数；clean_options['audit'] 为真时同时返回审核结果"""
+        chunk_size = clean_options.get('chunk_size', 0)
+        if chunk_size > 0:
+            # 分块流水线：读取→清洗→映射→追加写入，内存只与块大小有关
+            return self.convert_sheet_chunked(xls, sheet_name, output_path, clean_options, chunk_size,
+                                              on_progress, cancel_event)
+
+        metrics = self.start_metrics(sheet_name, clean_options)
+
+        # 读取为原始数据（不强制类型转换）
+        with measure(metrics, 'read_excel') as stage:
+            df = self.read_sheet(xls, sheet_name, on_progress, cancel_event)
+            stage['rows_out'] = len(df)
+        if clean_options.get('arrow_strings', False):
+            with measure(metrics, 'arrow_strings', len(df)) as stage:
+                df = to_arrow_strings(df)
+                stage['rows_out'] = len(df)
+        _check_cancelled(cancel_event)
+
+        # 清洗、类型转换和模糊映射期间按列检查取消并报告进度
+        self.cleaner.checkpoint = _sheet_checkpoint(on_progress, cancel_event, sheet_name, len(df))
+        try:
+            # 数据清洗
+            df = self.cleaner.clean_data(df, clean_options)
+
+            # 按配置文件进行类型转换（清洗完成后）
+            with measure(metrics, 'apply_data_types', len(df)) as stage:
+                df = self.cleaner.apply_data_types(df)
+                stage['rows_out'] = len(df)
+        finally:
+            self.cleaner.checkpoint = None
+
+        # 列映射与重组
+        column_mapping = self.get_column_mapping(sheet_name)
+        with measure(metrics, 'clean_and_filter_columns', len(df)) as stage:
+            df = self.cleaner.clean_and_filter_columns(df, sheet_name, column_mapping)
+            stage['rows_out'] = len(df)
+        _check_cancelled(cancel_event)
+
+        # 保存处理后的数据
+        with measure(metrics, 'to_csv', len(df)) as stage:
+            write_csv(df, output_path)
+            stage['rows_out'] = len(df)
+        findings = None
+        if clean_options.get('audit', False):
+            with measure(metrics, 'audit', len(df)):
+                findings = self.audit_output(df, output_path, clean_options.get('arrow_strings', False))
+        return len(df), findings
+
+    @staticmethod
+    def read_sheet(xls: pd.ExcelFile, sheet_name: str, on_progress: Optional[SheetProgress] = None,
+                   cancel_event=None) -> pd.DataFrame:
+        """整表读取：按块流式读取后拼接（结果与 pd.read_excel(dtype=str) 相同），每块之间检查取消并报告进度"""
+        total_rows = estimate_sheet_rows(xls.book, sheet_name)
+        rows_read = 0
+        chunks = []
+        for chunk in iter_sheet_chunks(xls.book, sheet_name, DEFAULT_CHUNK_SIZE):
+            _check_cancelled(cancel_event)
+            chunks.append(chunk)
+            rows_read += len(chunk)
+            if on_progress:
+                on_progress(rows_read, total_rows)
+        return chunks[0] if len(chunks) == 1 else pd.concat(chunks)
+
+    def start_metrics(self, sheet_name: str, clean_options: dict) -> Optional[StageMetrics]:
+        """开启性能统计时为该Sheet新建阶段统计，并交给清洗器记录清洗和模糊映射各步骤"""
+        metrics = StageMetrics(sheet_name) if clean_options.get('profile', False) else None
+        self.cleaner.metrics = self.last_metrics = metrics
+        return metrics
+
+    def convert_sheet_chunked(self, xls: pd.ExcelFile, sheet_name: str, output_path: str,
+                              clean_options: dict, chunk_size: int,
+                              on_progress: Optional[SheetProgress] = None,
+                              cancel_event=None) -> Tuple[int, Optional[AuditFindings]]:
+        """按块转换单个Sheet并逐块追加到CSV，返回写出的行数和审核结果
+
+        各块写入临时文件，全部写完后才替换输出CSV；取消或出错时删除临时文件，原有CSV保持不变。
+        以下情况从头重新转换，结果与整表转换一致：
+        - 后面的行超出表头宽度（整表读取时会多出 Unnamed: N 列）时按整表宽度重新转换；
+        - [DataType] 中的列在后面的块转换失败时（整表转换时该列整列保持原样），这些列不再做类型转换。
+        """
+        width = 0
+        failed_casts = set()
+        while True:
+            try:
+                return self.write_sheet_chunks(xls, sheet_name, output_path, clean_options, chunk_size,
+                                               on_progress, cancel_event, width, failed_casts)
+            except _SheetWidened as e:
+                self.logger.info(f"Sheet '{sheet_name}' 后面的行超出表头宽度，按 {e.width} 列重新分块转换")
+                width = e.width
+            except _CastFailed as e:
+                self.logger.info(f"Sheet '{sheet_name}' 的列 {sorted(e.columns)} 在后面的块中类型转换失败，"
+                                 f"不转换这些列重新分块转换")
+                failed_casts |= e.columns
+
+    def write_sheet_chunks(self, xls: pd.ExcelFile, sheet_name: str, output_path: str, clean_options: dict,
+                           chunk_size: int, on_progress: Optional[SheetProgress],
+                           cancel_event, width: int, failed_casts: set) -> Tuple[int, Optional[AuditFindings]]:
+        """以至少 width 列读取各块并写出，failed_casts 中的列不做类型转换
+
+        某块比第一块宽时抛出 _SheetWidened；第一块之后某块有列类型转换失败时抛出 _CastFailed。
+        """
+        metrics = self.start_metrics(sheet_name, clean_options)
+        column_mapping = self.get_column_mapping(sheet_name)
+        seen_rows = set()  # 跨块去重用的已保留行集合
+        total_rows = estimate_sheet_rows(xls.book, sheet_name)
+        rows_read = 0
+        row_count = 0
+        failed = set(failed_casts)
+        arrow_strings = clean_options.get('arrow_strings', False)
+
+        with atomic_output(output_path) as f:
+            header = True
+            chunks = iter_sheet_chunks(xls.book, sheet_name, chunk_size, width)
+            for chunk in measure_iter(metrics, 'read_excel', chunks):
+                _check_cancelled(cancel_event)
+                if header:
+                    width = chunk.shape[1]
+                elif chunk.shape[1] > width:
+                    raise _SheetWidened(chunk.shape[1])
+                rows_read += len(chunk)
+                if arrow_strings:
+                    with measure(metrics, 'arrow_strings', len(chunk)) as stage:
+                        chunk = to_arrow_strings(chunk)
+                        stage['rows_out'] = len(chunk)
+                chunk = self.cleaner.clean_data(chunk, clean_options, seen_rows)
+                with measure(metrics, 'apply_data_types', len(chunk)) as stage:
+                    chunk = self.cleaner.apply_data_types(chunk, failed)
+                    stage['rows_out'] = len(chunk)
+                if header:
+                    first_failed = set(failed)
+                elif len(failed) > len(first_failed):
+                    raise _CastFailed(failed - first_failed)
+                with measure(metrics, 'clean_and_filter_columns', len(chunk)) as stage:
+                    chunk = self.cleaner.clean_and_filter_columns(chunk, sheet_name, column_mapping)
+                    stage['rows_out'] = len(chunk)
+                with measure(metrics, 'to_csv', len(chunk)) as stage:
+                    write_frame(f, chunk, header)
+                    stage['rows_out'] = len(chunk)
+                header = False
+                row_count += len(chunk)
+                if on_progress:
+                    on_progress(rows_read, total_rows)
+
+        self.logger.info(f"Sheet '{sheet_name}' 分块转换完成，共 {row_count} 行")
+        findings = None
+        if clean_options.get('audit', False):
+            # 审核要看整张表的分组和重复：不在内存中保留各块，写完后只读回审核规则用到的列
+            with measure(metrics, 'audit', row_count):
+                findings = self.audit_file(output_path, arrow_strings, prune_columns=True)
+        return row_count, findings
+
+    def audit_output(self, df: pd.DataFrame, output_path: str,
+                     arrow_strings: bool = False) -> Optional[AuditFindings]:
+        """直接审核内存中的转换结果，不再重新读取写出的CSV；不是 ana/dig 输出时返回None
+
+        审核前按 read_csv 的规则还原空值和数据类型，结果与审核写出的CSV一致。
+        """
+        kind = audit_kind(output_path)
+        if kind is None:
+            return None
+        csv_df = as_csv_dtypes(df)
+        if arrow_strings:
+            csv_df = to_arrow_strings(csv_df)
+        findings = audit_dataframe(csv_df, kind)
+        self.logger.info(f"{findings.file_name} 审核完成，发现 {len(findings.items)} 条问题")
+        return findings
+
+    def audit_file(self, output_path: str, arrow_strings: bool = False,
+                   prune_columns: bool = False) -> Optional[AuditFindings]:
+        """审核已写出的CSV（分块转换、从转换缓存恢复时使用）；不是 ana/dig 输出时返回None"""
+        kind = audit_kind(output_path)
+        if kind is None:
+            return None
+        findings = audit_csv(output_path, kind, arrow_strings, prune_columns)
+        self.logger.info(f"{findings.file_name} 审核完成，发现 {len(findings.items)} 条问题")
+        return findings
+
+    def get_column_mapping(self, sheet_name: str) -> Optional[Dict[str, str]]:
+        """获取Sheet的列映射配置，未配置时返回None"""
+        column_section = f"{sheet_name}_ColumnMapping"
+        return dict(self.config[column_section]) if column_section in self.config else None
+
+
+# 工作进程内的转换器，每个进程只构建一次（模糊映射规则也只编译一次）
+_worker_converter: Optional[ExcelConverter] = None
+
+
+def _init_worker(config, fuzzy_engine=None):
+    global _worker_converter
+    _worker_converter = ExcelConverter(config, fuzzy_engine)
+
+
+def _convert_sheet_worker(excel_file: str, sheet_name: str, output_path: str, clean_options: dict) -> Dict:
+    """工作进程入口：独立打开工作簿转换一个Sheet，返回行数和警告信息"""
+    with WarningCollector.capture() as collector:
+        with pd.ExcelFile(excel_file, engine='openpyxl') as xls:
+            rows, findings = _worker_converter.convert_sheet(xls, sheet_name, output_path, clean_options)
+    return _sheet_result(sheet_name, output_path, rows, collector, findings, _worker_converter.last_metrics)
+
+
+def _sheet_progress(progress_callback: Optional[ProgressCallback], index: int, total: int, sheet_name: str):
+    """把Sheet内的行进度换算为整个工作簿的进度"""
+    if progress_callback is None:
+        return None
+
+    def on_progress(rows_read: int, total_rows: Optional[int], message: Optional[str] = None):
+        fraction = min(rows_read / total_rows, 0.99) if total_rows else 0.0
+        progress_callback((index + fraction) / total, message or f"Sheet '{sheet_name}' 已读取 {rows_read} 行")
+
+    progress_callback(index / total, f"正在转换 Sheet '{sheet_name}'")
+    return on_progress
+
+
+def _sheet_checkpoint(on_progress: Optional[SheetProgress], cancel_event, sheet_name: str, rows: int):
+    """整表转换时交给清洗器的检查点：checkpoint(步骤说明) 检查取消并报告当前步骤；两者都不需要时返回None"""
+    if on_progress is None and cancel_event is None:
+        return None
+
+    def checkpoint(step: str):
+        _check_cancelled(cancel_event)
+        if on_progress:
+            on_progress(rows, rows, f"Sheet '{sheet_name}' {step}")
+
+    return checkpoint
+
+
+def _sheet_result(sheet_name: str, output_path: str, rows: int, collector: WarningCollector,
+                  findings: Optional[AuditFindings] = None, metrics: Optional[StageMetrics] = None) -> Dict:
+    return {
+        'sheet': sheet_name,
+        'output': output_path,
+        'rows': rows,
+        'warnings': collector.messages,
+        'findings': findings,
+        'metrics': metrics.records() if metrics is not None else None,
+    }
@@ -0,0 +1,76 @@
+import codecs
+import os
+import threading
+
+import pandas as pd
+
+# 项目中的CSV只有这两种编码：utf-8（可能带BOM）和 gbk
+DEFAULT_ENCODING = 'utf-8'
+FALLBACK_ENCODING = 'gbk'
+
+# 试解码的字节数
+SNIFF_BYTES = 64 * 1024
+
+
+# 已检测过的文件编码：路径 → (修改时间, 大小, 编码)；文件变化后重新检测
+_encoding_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _cache_key(file_path: str) -> str:
+    return os.path.normcase(os.path.abspath(file_path))
+
+
+def sniff_encoding(file_path: str) -> str:
+    """只读取文件开头一段判断编码：有BOM或能按utf-8解码即为utf-8，否则为gbk"""
+    with open(file_path, 'rb') as f:
+        prefix = f.read(SNIFF_BYTES)
+    if prefix.startswith(codecs.BOM_UTF8):
+        return DEFAULT_ENCODING
+    try:
+        # final=False：截断在多字节字符中间时不算错误
+        codecs.getincrementaldecoder(DEFAULT_ENCODING)().decode(prefix, final=False)
+        return DEFAULT_ENCODING
+    except UnicodeDecodeError:
+        return FALLBACK_ENCODING
+
+
+def detect_encoding(file_path: str) -> str:
+    """返回文件编码，文件未变化时直接使用上次的结果"""
+    stat = os.stat(file_path)
+    key = _cache_key(file_path)
+    with _cache_lock:
+        cached = _encoding_cache.get(key)
+    if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
+    encoding = sniff_encoding(file_path)
+    remember_encoding(file_path, encoding, stat)
+    return encoding
+
+
+def remember_encoding(file_path: str, encoding: str, stat: os.stat_result = None):
+    stat = stat or os.stat(file_path)
+    with _cache_lock:
+        _encoding_cache[_cache_key(file_path)] = (stat.st_mtime_ns, stat.st_size, encoding)
+
+
+def read_csv_auto(file_path: str, **kwargs):
+    """按检测出的编码读取CSV，返回 (DataFrame, 编码)
+
+    开头一段是纯ASCII而后面出现gbk字符时，utf-8解码会失败，此时再用gbk读取一次。
+    其他读取错误也一样（例如gbk文本恰好也是合法的utf-8，按utf-8读出的列名不对，usecols 找不到列）：
+    与原来先试utf-8、出错再试gbk的做法相同，任何异常都改用另一种编码再读一次。
+    """
+    encoding = detect_encoding(file_path)
+    try:
+        return pd.read_csv(file_path, encoding=encoding, **kwargs), encoding
+    except Exception:
+        other = FALLBACK_ENCODING if encoding == DEFAULT_ENCODING else DEFAULT_ENCODING
+        df = pd.read_csv(file_path, encoding=other, **kwargs)
+        remember_encoding(file_path, other)
+        return df, other
+
+
+def read_csv(file_path: str, **kwargs) -> pd.DataFrame:
+    """read_csv_auto 的简写，只返回 DataFrame"""
+    return read_csv_auto(file_path, **kwargs)[0]
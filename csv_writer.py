@@ -0,0 +1,181 @@
+import csv
+import io
+import os
+import re
+from contextlib import contextmanager
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.compute as pc
+except ImportError:
+    pyarrow = None
+
+# 输出CSV的编码：带BOM的UTF-8，Excel可直接打开
+CSV_ENCODING = 'utf-8-sig'
+
+# 每次拼接写出的行数，限制拼接结果占用的内存
+WRITE_BATCH_ROWS = 50000
+
+def _quote_pattern() -> str:
+    """csv 模块（QUOTE_MINIMAL，换行符为 os.linesep）会给字段加引号的字符，写成正则字符类
+
+    分隔符和引号总要加引号；\r、\n 是否加引号随 Python 版本和换行符而不同，按当前解释器的实际行为确定。
+    """
+    buffer = io.StringIO(newline='')
+    writer = csv.writer(buffer, lineterminator=os.linesep)
+    pattern = ',"'
+    for char, escaped in (('\r', r'\r'), ('\n', r'\n')):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(['a' + char])
+        if buffer.getvalue().startswith('"'):
+            pattern += escaped
+    return f'[{pattern}]'
+
+
+# 需要加引号的字段（Python 正则和 Arrow 的 RE2 正则通用）
+_NEEDS_QUOTE_PATTERN = _quote_pattern()
+_NEEDS_QUOTE = re.compile(_NEEDS_QUOTE_PATTERN)
+
+
+def string_columns(df: pd.DataFrame) -> Optional[List[list]]:
+    """所有列都只含字符串（和空值）时返回各列取值（空值为''），否则返回None"""
+    columns = []
+    for position in range(df.shape[1]):
+        series = df.iloc[:, position]
+        if isinstance(series.dtype, pd.StringDtype):
+            pass
+        elif series.dtype != object or pd.api.types.infer_dtype(series, skipna=True) not in ('string', 'empty'):
+            return None
+        values = series.to_numpy(dtype=object)
+        missing = pd.isna(values)
+        if missing.any():
+            values = values.copy()
+            values[missing] = ''
+        columns.append(values.tolist())
+    return columns
+
+
+def arrow_columns(df: pd.DataFrame) -> Optional[list]:
+    """所有列都是 pyarrow 存储的字符串列时返回各列的 Arrow 数组，否则返回None"""
+    if pyarrow is None:
+        return None
+    arrays = []
+    for position in range(df.shape[1]):
+        series = df.iloc[:, position]
+        if not isinstance(series.dtype, pd.StringDtype) or series.dtype.storage not in ('pyarrow', 'pyarrow_numpy'):
+            return None
+        arrays.append(pyarrow.chunked_array(pyarrow.array(series.array)).combine_chunks())
+    return arrays
+
+
+def _quote_values(values: list) -> list:
+    """按 csv 模块的最少引号规则处理一列；整列都不需要引号时原样返回"""
+    if _NEEDS_QUOTE.search('\0'.join(values)) is None:
+        return values
+    return ['"' + value.replace('"', '""') + '"' if _NEEDS_QUOTE.search(value) else value for value in values]
+
+
+def _write_rows(f, columns: List[list]):
+    """逐批拼接行文本后写出（代替 csv.writer 逐行写出）"""
+    columns = [_quote_values(values) for values in columns]
+    if len(columns) == 1:
+        # 与 csv 模块一致：只有一个空字段的行写为 ""
+        columns = [[value or '""' for value in columns[0]]]
+    linesep = os.linesep
+    rows = len(columns[0])
+    for start in range(0, rows, WRITE_BATCH_ROWS):
+        batch = [values[start:start + WRITE_BATCH_ROWS] for values in columns]
+        f.write(linesep.join(map(','.join, zip(*batch))) + linesep)
+
+
+def _quote_array(array):
+    """Arrow 版的 _quote_values，空值替换为''"""
+    array = pc.fill_null(array, '')
+    needs_quote = pc.match_substring_regex(array, _NEEDS_QUOTE_PATTERN)
+    if not pc.any(needs_quote).as_py():
+        return array
+    quote = pyarrow.scalar('"', type=array.type)
+    empty = pyarrow.scalar('', type=array.type)
+    quoted = pc.binary_join_element_wise(quote, pc.replace_substring(array, '"', '""'), quote, empty)
+    return pc.if_else(needs_quote, quoted, array)
+
+
+def _write_arrow_rows(f, arrays: list):
+    """在 Arrow 中拼接各行（UTF-8），把结果的数据缓冲区直接写入底层二进制文件，不生成 Python 字符串"""
+    arrays = [_quote_array(array) for array in arrays]
+    if len(arrays) == 1:
+        arrays = [pc.if_else(pc.equal(arrays[0], ''), pyarrow.scalar('""', type=arrays[0].type), arrays[0])]
+    linesep = pyarrow.scalar(os.linesep, type=arrays[0].type)
+    comma = pyarrow.scalar(',', type=arrays[0].type)
+    empty = pyarrow.scalar('', type=arrays[0].type)
+    f.flush()
+    for start in range(0, len(arrays[0]), WRITE_BATCH_ROWS):
+        batch = [array.slice(start, WRITE_BATCH_ROWS) for array in arrays]
+        lines = pc.binary_join_element_wise(pc.binary_join_element_wise(*batch, comma), linesep, empty)
+        f.buffer.write(_data_buffer(lines))
+
+
+def _data_buffer(array):
+    """字符串数组全部取值首尾相连的字节（直接引用数组的数据缓冲区）"""
+    offset_type = np.int64 if pyarrow.types.is_large_string(array.type) else np.int32
+    offsets = np.frombuffer(array.buffers()[1], dtype=offset_type)[array.offset:array.offset + len(array) + 1]
+    return memoryview(array.buffers()[2])[offsets[0]:offsets[-1]]
+
+
+def _is_utf8_file(f) -> bool:
+    encoding = getattr(f, 'encoding', None)
+    return hasattr(f, 'buffer') and encoding is not None and encoding.lower().replace('_', '-') in (
+        'utf-8', 'utf8', 'utf-8-sig')
+
+
+def write_frame(f, df: pd.DataFrame, header: bool = True):
+    """把 df 写入以 newline='' 打开的文本文件，结果与 df.to_csv(f, index=False, header=header) 逐字节相同
+
+    全部为字符串列时（转换结果的常见情况）不经过 to_csv 的逐块格式化：pyarrow 字符串列在 Arrow 中
+    拼接各行后直接写出字节，其余字符串列整批拼接行文本后写出；引号规则与 csv 模块相同。
+    含数字、日期等其他类型的列时仍使用 to_csv，保证数值格式不变。
+    """
+    arrays = columns = None
+    if df.shape[1]:
+        # 直接写字节要求文件为UTF-8编码，且已经通过文本层写出过内容（utf-8-sig 的BOM由文本层在第一次写入时写出）
+        if _is_utf8_file(f) and (header or f.tell()):
+            arrays = arrow_columns(df)
+        if arrays is None:
+            columns = string_columns(df)
+    if arrays is None and columns is None:
+        df.to_csv(f, index=False, header=header)
+        return
+    if header:
+        # 表头与 to_csv 一样经过 csv 模块
+        csv.writer(f, lineterminator=os.linesep).writerow([str(col) for col in df.columns])
+    if not len(df):
+        return
+    if arrays is not None:
+        _write_arrow_rows(f, arrays)
+    else:
+        _write_rows(f, columns)
+
+
+@contextmanager
+def atomic_output(output_path: str, encoding: str = CSV_ENCODING):
+    """打开临时文件供写入，with 块正常结束后替换为 output_path；出错或取消时删除临时文件，原有文件保持不变"""
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding=encoding, newline='') as f:
+            yield f
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_csv(df: pd.DataFrame, output_path: str, encoding: str = CSV_ENCODING):
+    """整表写出CSV（原子替换），内容与 df.to_csv(output_path, index=False, encoding=encoding) 相同"""
+    with atomic_output(output_path, encoding) as f:
+        write_frame(f, df)
@@ -1,56 +1,147 @@
+import numpy as np
 import pandas as pd
 import re
 import logging
-from typing import Dict, Any, Optional, List
-
-# 配置日志格式
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('data_cleaner.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+import tracemalloc
+from collections import OrderedDict
+from typing import Callable, Dict, Any, Optional, List
+from fuzzy_matcher import FuzzyMappingEngine
+from pipeline_metrics import StageMetrics, measure
+
+
+# 列名解析结果最多缓存的条目数（表头、映射和输出列的组合），超过时淘汰最久未使用的
+MAX_COLUMN_PLANS = 64
+
+
+class PeakMemory:
+    """用 tracemalloc 统计 with 块内新分配内存的峰值（字节），numpy/pandas 的数据缓冲区也会被统计"""
+
+    def __enter__(self):
+        self._started = not tracemalloc.is_tracing()
+        if self._started:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        self._baseline = tracemalloc.get_traced_memory()[0]
+        self.peak = 0
+        return self
+
+    def __exit__(self, *exc):
+        self.peak = max(tracemalloc.get_traced_memory()[1] - self._baseline, 0)
+        if self._started:
+            tracemalloc.stop()
+        return False
+
 
 class DataCleaner:
-    def __init__(self, config: dict):  # 接收配置参数
+    def __init__(self, config: dict, fuzzy_engine: Optional[FuzzyMappingEngine] = None):  # 接收配置参数
         self.config = config
         self.logger = logging.getLogger(__name__)  # 可选：初始化日志
+        # 可传入编译缓存中已构建好的规则引擎
+        self._fuzzy_engine = fuzzy_engine
+        self._column_plans: OrderedDict = OrderedDict()
+        # 最近一次就地清洗的峰值内存增量（字节）
+        self.last_peak_memory = None
+        # 当前Sheet的阶段统计，由转换器在开启性能统计时设置
+        self.metrics: Optional[StageMetrics] = None
+        # 整表转换时由转换器设置：checkpoint(步骤说明) 检查取消并报告进度，逐列处理时调用
+        self.checkpoint: Optional[Callable[[str], None]] = None
+
+    def clean_data(self, df: pd.DataFrame, clean_options: dict, seen_rows: Optional[set] = None) -> pd.DataFrame:
+        """清洗数据；分块处理时传入 seen_rows，跨块去重
+
+        clean_options['in_place'] 为真时直接修改传入的 df（调用方之后不能再使用它），
+        不做整表复制，并在日志中报告清洗过程的峰值内存（report_memory 为假时不统计）。
+        """
+        in_place = clean_options.get('in_place', False)
+        if not in_place or not clean_options.get('report_memory', True):
+            return self.run_cleaning_steps(df, clean_options, seen_rows, in_place)
+
+        # tracemalloc 会拖慢对象分配，只在需要报告峰值内存时开启
+        with PeakMemory() as memory:
+            df = self.run_cleaning_steps(df, clean_options, seen_rows, in_place=True)
+        self.last_peak_memory = memory.peak
+        self.logger.info(f"就地清洗完成，共 {len(df)} 行，峰值内存增量 {memory.peak / 1024 / 1024:.1f} MB")
+        return df
+
+    def run_cleaning_steps(self, df: pd.DataFrame, clean_options: dict, seen_rows: Optional[set],
+                           in_place: bool) -> pd.DataFrame:
+        # 步骤1：应用模糊关键字替换（就地模式下不复制）
+        with measure(self.metrics, 'fuzzy_mapping', len(df)) as stage:
+            df = self.apply_fuzzy_mapping(df, copy=not in_place)
+            stage['rows_out'] = len(df)
 
-    def clean_data(self, df: pd.DataFrame, clean_options: dict) -> pd.DataFrame:
-        # 步骤1：应用模糊关键字替换
-        df = self.apply_fuzzy_mapping(df)
-        
         # 步骤2：执行基础清洗（去空格、去重等）
-        df = self.basic_cleaning(df, clean_options)
-        
+        with measure(self.metrics, 'basic_cleaning', len(df)) as stage:
+            df = self.basic_cleaning(df, clean_options, seen_rows, in_place=in_place)
+            stage['rows_out'] = len(df)
         return df
 
-    def basic_cleaning(self, df: pd.DataFrame, options: dict) -> pd.DataFrame:
-        if options.get("trim_spaces", True):
-            for col in df.columns:
-                # 检查列是否为字符串类型（包括经过类型转换后的列）
-                if pd.api.types.is_string_dtype(df[col]):
-                    try:
-                        df[col] = df[col].str.strip()
-                    except AttributeError:
-                        self.logger.warning(f"列 '{col}' 包含非字符串数据，跳过处理")
+    def basic_cleaning(self, df: pd.DataFrame, options: dict, seen_rows: Optional[set] = None,
+                       in_place: bool = False) -> pd.DataFrame:
+        fill_na = options.get("fill_na", False)
+        fill_value = options.get("fill_na_value", "NA")
+        # 就地模式下没有行过滤时，空值填充与去空格在同一次逐列处理中完成（行过滤会受填充影响，只能放在最后）
+        fuse_fill = (in_place and fill_na and df.columns.is_unique
+                     and not options.get("remove_empty_rows", False) and not options.get("remove_duplicates", False))
+        self.clean_columns(df, options.get("trim_spaces", True), fuse_fill, fill_value)
         
         # 其他清洗选项
         if options.get("remove_empty_rows", False):
             df = self.remove_empty_rows(df)
         if options.get("remove_duplicates", False):
-            df = self.remove_duplicates(df)
-        if options.get("fill_na", False):
-            fill_value = options.get("fill_na_value", "NA")
+            if self.checkpoint is not None:
+                self.checkpoint("删除重复行")
+            if seen_rows is None:
+                df = self.remove_duplicates(df)
+            else:
+                df = self.remove_duplicates_across_chunks(df, seen_rows)
+        if fill_na and not fuse_fill:
             df = df.fillna(fill_value)
         
         return df
 
+    def clean_columns(self, df: pd.DataFrame, trim: bool, fill_na: bool = False, fill_value: Any = None):
+        """逐列就地去除首尾空格（并填充空值），每列只替换一次"""
+        for col in df.columns:
+            if self.checkpoint is not None:
+                self.checkpoint(f"清洗列 '{col}'")
+            series = df[col]
+            cleaned = series
+            # 检查列是否为字符串类型（包括经过类型转换后的列）；
+            # 判断时忽略空值，否则含空单元格的列不会去空格，分块处理时结果也会随分块位置变化
+            if trim and (pd.api.types.is_string_dtype(series) or pd.api.types.infer_dtype(series, skipna=True) == 'string'):
+                try:
+                    cleaned = series.str.strip()
+                except AttributeError:
+                    self.logger.warning(f"列 '{col}' 包含非字符串数据，跳过处理")
+            if fill_na and cleaned.isna().any():
+                cleaned = cleaned.fillna(fill_value)
+            if cleaned is not series:
+                df[col] = cleaned
+
+    def apply_data_types(self, df: pd.DataFrame, failed: Optional[set] = None) -> pd.DataFrame:
+        """按 [DataType] 配置进行类型转换（清洗完成后）
+
+        分块转换时传入 failed：其中的列不再转换，本次转换失败的列加入其中，使各块的转换结果一致。
+        """
+        if 'DataType' in self.config:
+            for col, dtype in self.config['DataType'].items():
+                if col in df.columns and not (failed and col in failed):
+                    if self.checkpoint is not None:
+                        self.checkpoint(f"转换列 '{col}' 的类型")
+                    try:
+                        df[col] = df[col].astype(dtype.lower())
+                    except Exception as e:
+                        self.logger.warning(f"列 '{col}' 类型转换失败: {str(e)}")
+                        if failed is not None:
+                            failed.add(col)
+        return df
+
     def set_config(self, config: dict):
         """允许后期更新配置"""
         self.config = config
+        self._fuzzy_engine = None
+        self._column_plans.clear()
         self.logger.info("配置已更新")
 
     def clean_and_filter_columns(self, df: pd.DataFrame, sheet_name: str, column_mapping: Dict[str, str] = None) -> pd.DataFrame:
@@ -61,86 +152,63 @@ class DataCleaner:
         else:
             output_columns = [...]  # 默认列
         
-        # 创建空DataFrame时直接使用配置的列顺序
-        output_df = pd.DataFrame(columns=output_columns)
-        
-        # 修正：对所有列名做str和空值判断，防止None或NaN导致strip报错
-        df_columns_clean = [str(col).strip().lower() for col in df.columns if pd.notna(col)]
-        
-        # 处理列映射
-        if column_mapping:
-            for src_col, dest_col in column_mapping.items():
-                src_col_clean = src_col.strip().lower()
-                if src_col_clean in df_columns_clean:
-                    actual_src_col = df.columns[df_columns_clean.index(src_col_clean)]
-                    output_df[dest_col] = df[actual_src_col]
-                else:
-                    # 如果原始数据有目标列，直接保留
-                    if dest_col in df.columns:
-                        output_df[dest_col] = df[dest_col]
-                    else:
-                        output_df[dest_col] = ""
-                    self.logger.warning(f"映射失败：Sheet '{sheet_name}' 中不存在列 '{src_col}'，已保留原始数据（如有）")
+        # 列名解析结果按 表头+映射+输出列 缓存，分块转换时每块表头相同，只解析一次
+        key = (sheet_name, tuple(df.columns), tuple(column_mapping.items()) if column_mapping else None,
+               tuple(output_columns))
+        plan = self._column_plans.get(key)
+        if plan is None:
+            plan = self._column_plans[key] = self.resolve_columns(df.columns, column_mapping, output_columns)
+            if len(self._column_plans) > MAX_COLUMN_PLANS:
+                self._column_plans.popitem(last=False)
+        else:
+            self._column_plans.move_to_end(key)
+        missing_sources, data_columns = plan
+
+        for src_col in missing_sources:
+            self.logger.warning(f"映射失败：Sheet '{sheet_name}' 中不存在列 '{src_col}'，已保留原始数据（如有）")
         self.logger.info(f"输出列顺序: {output_columns}")
-        self.logger.info(f"处理后的数据列: {output_df.columns.tolist()}")
-        
-        # 按最终列顺序重建DataFrame
-        output_df = df.reindex(columns=output_columns)
+        self.logger.info(f"处理后的数据列: {data_columns}")
         
-        return output_df
+        # 按最终列顺序重建DataFrame（列已是该顺序时直接返回，不复制数据）
+        if df.columns.is_unique and list(df.columns) == output_columns:
+            return df
+        return df.reindex(columns=output_columns)
 
-    def apply_fuzzy_mapping(self, df: pd.DataFrame) -> pd.DataFrame:
+    @staticmethod
+    def resolve_columns(columns, column_mapping: Optional[Dict[str, str]], output_columns: list):
+        """按规范化列名（去空格、小写）查表解析列映射，返回 (找不到的源列, 映射后的数据列)"""
+        # 修正：对所有列名做str和空值判断，防止None或NaN导致strip报错
+        clean_columns = {str(col).strip().lower() for col in columns if pd.notna(col)}
+        missing_sources = []
+        data_columns = list(output_columns)
+        known = set(data_columns)
+        for src_col, dest_col in (column_mapping or {}).items():
+            if src_col.strip().lower() not in clean_columns:
+                missing_sources.append(src_col)
+            # 映射的目标列不在输出列中时追加在后面
+            if dest_col not in known:
+                known.add(dest_col)
+                data_columns.append(dest_col)
+        return missing_sources, data_columns
+
+    def apply_fuzzy_mapping(self, df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
         if 'KeywordFuzzyMapping' not in self.config:
             return df
 
-        df = df.copy()  # 不再强制转换为字符串
-
-        for full_key, replacements in self.config['KeywordFuzzyMapping'].items():
-            try:
-                if '_' not in full_key:
-                    self.logger.error(f"无效的模糊映射键格式: {full_key}")
-                    continue
-
-                # 解析列名和匹配模式
-                src_col, pattern = full_key.split('_', 1)
-                pattern = pattern.replace('*', '.*')  # 转换通配符
-
-                if src_col not in df.columns:
-                    self.logger.error(f"源列不存在: {src_col}")
-                    continue
-
-                # 仅将源列转换为字符串进行匹配
-                src_series = df[src_col].astype(str)
-                mask = src_series.str.contains(pattern, case=False, regex=True, na=False)
-                match_count = mask.sum()
-
-                for replacement in replacements.split(','):
-                    if ':' not in replacement:
-                        self.logger.error(f"无效替换规则: {replacement}")
-                        continue
+        if copy:
+            df = df.copy()  # 不再强制转换为字符串
 
-                    dest_col, replace_value = replacement.split(':', 1)
-                    dest_col = dest_col.strip()
-                    replace_value = replace_value.strip()
+        # 规则引擎按配置内容缓存，配置不变时只编译一次
+        return self.get_fuzzy_engine().apply(df, self.logger, self.metrics, checkpoint=self.checkpoint)
 
-                    # 初始化目标列为字符串类型（如果不存在）
-                    if dest_col not in df.columns:
-                        df[dest_col] = ""  # 默认空字符串
-                    else:
-                        df[dest_col] = df[dest_col].astype(str)  # 确保目标列为字符串
-
-                    # 应用替换
-                    df.loc[mask, dest_col] = replace_value
-
-                self.logger.info(f"✅ [{src_col}] 替换完成，命中 {match_count} 行")
-
-            except Exception as e:
-                self.logger.error(f"处理键 {full_key} 时出错: {str(e)}")
-
-        return df
+    def get_fuzzy_engine(self) -> FuzzyMappingEngine:
+        """获取（必要时重新编译）KeywordFuzzyMapping 规则引擎"""
+        items = tuple(self.config['KeywordFuzzyMapping'].items())
+        if self._fuzzy_engine is None or self._fuzzy_engine.mapping_items != items:
+            self._fuzzy_engine = FuzzyMappingEngine(items)
+        return self._fuzzy_engine
 
     
-    
     @staticmethod
     def trim_whitespace(df: pd.DataFrame) -> pd.DataFrame:
         """去除字符串首尾空格（兼容pandas 2.1+）"""
@@ -154,6 +222,34 @@ class DataCleaner:
     def remove_duplicates(df: pd.DataFrame) -> pd.DataFrame:
         return df.drop_duplicates()
     
+    @staticmethod
+    def remove_duplicates_across_chunks(df: pd.DataFrame, seen_rows: set) -> pd.DataFrame:
+        """跨块去重：seen_rows 记录之前各块保留的行（元组），结果与整表 drop_duplicates 一致
+
+        按行的实际取值比较（集合查找时哈希相同的行还会逐值比较），不会因哈希冲突误删不同的行；
+        代价是 seen_rows 持有所有保留行的取值。
+        """
+        if not df.shape[1]:
+            return df  # 与 drop_duplicates 一致：没有列时不去重
+        # 空值的判等与 drop_duplicates 一致：多列时所有空值（None、NaN、pd.NA）都相等，统一为None；
+        # 只有一列时按 Series.duplicated，NaN 之间相等但与 None、pd.NA 不相等，只把各个 NaN 统一为同一个
+        # np.nan 对象（元组比较先比较是否同一对象）
+        single = df.shape[1] == 1
+        columns = []
+        for position in range(df.shape[1]):
+            values = df.iloc[:, position].to_numpy(dtype=object)
+            missing = np.flatnonzero(pd.isna(values))
+            if len(missing):
+                values = values.copy()
+                if single:
+                    values[missing] = [np.nan if isinstance(value, float) else value for value in values[missing]]
+                else:
+                    values[missing] = None
+            columns.append(values.tolist())
+        keep = np.fromiter((row not in seen_rows and not seen_rows.add(row) for row in zip(*columns)),
+                           dtype=bool, count=len(df))
+        return df.take(np.flatnonzero(keep))
+    
     @staticmethod
     def fill_missing_values(df: pd.DataFrame, fill_value: Any) -> pd.DataFrame:
         return df.fillna(fill_value)
\ No newline at end of file
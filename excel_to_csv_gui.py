@@ -4,23 +4,58 @@ import configparser
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QLabel,
     QLineEdit, QPushButton, QFileDialog, QMessageBox, 
-    QWidget, QCheckBox, QHBoxLayout, QTextEdit
+    QWidget, QCheckBox, QHBoxLayout, QTextEdit, QProgressBar
 )
-from PyQt5.QtCore import Qt
-import pandas as pd
-from data_cleaner import DataCleaner
+from PyQt5.QtCore import QObject, QThread, pyqtSignal
+import multiprocessing
+import threading
+from config_cache import load_compiled_config
+from conversion_cache import CACHE_DIR_NAME, ConversionCache
+from converter import ConversionCancelled, ExcelConverter, get_config_path
+from pipeline_metrics import format_stage, metrics_records, slowest_rules, write_metrics
+from sheet_reader import DEFAULT_CHUNK_SIZE
 import logging
 import traceback
 
-def get_config_path(config_name="config.ini"):
-    """动态获取配置文件路径（兼容打包环境）"""
-    if getattr(sys, 'frozen', False):
-        # 打包后：配置文件在EXE同级目录
-        base_dir = os.path.dirname(sys.executable)
-    else:
-        # 开发环境：配置文件在脚本所在目录
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-    return os.path.join(base_dir, config_name)
+# 性能统计文件名（写入输出目录）
+METRICS_FILE_NAME = '转换性能.jsonl'
+
+
+class ConversionWorker(QObject):
+    """在后台线程中执行转换，通过信号报告进度和结果"""
+
+    progress = pyqtSignal(int, str)
+    finished = pyqtSignal(object)  # 每个Sheet的转换结果列表
+    failed = pyqtSignal(object, str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, converter: ExcelConverter, excel_file: str, output_dir: str, clean_options: dict):
+        super().__init__()
+        self.converter = converter
+        self.excel_file = excel_file
+        self.output_dir = output_dir
+        self.clean_options = clean_options
+        self.cancel_event = threading.Event()
+
+    def run(self):
+        try:
+            results = self.converter.convert_workbook(
+                self.excel_file, self.output_dir, self.clean_options,
+                progress_callback=self.report_progress, cancel_event=self.cancel_event
+            )
+        except ConversionCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(e, traceback.format_exc())
+        else:
+            self.finished.emit(results)
+
+    def report_progress(self, fraction: float, message: str):
+        self.progress.emit(int(fraction * 100), message)
+
+    def cancel(self):
+        """请求取消（线程安全，在下一个Sheet或数据块边界生效）"""
+        self.cancel_event.set()
 
 
 class ExcelToCSVApp(QMainWindow):
@@ -35,11 +70,16 @@ class ExcelToCSVApp(QMainWindow):
         
         # 3. 配置系统初始化
         self.config = configparser.ConfigParser(strict=False)
+        self.fuzzy_engine = None
         self.config_file = get_config_path("config.ini")  # 使用动态路径
         self.load_config()
         
         # 4. 业务类初始化
-        self.cleaner = DataCleaner(self.config)
+        self.converter = ExcelConverter(self.config, self.fuzzy_engine)
+        self.cleaner = self.converter.cleaner
+        self.conversion_thread = None
+        self.conversion_worker = None
+        self.close_pending = False  # 转换中关闭窗口时置位，后台线程结束后再真正关闭
         
         # 5. UI初始化
         self.setup_ui()
@@ -122,9 +162,79 @@ class ExcelToCSVApp(QMainWindow):
         fill_na_layout.addStretch()
         main_layout.addLayout(fill_na_layout)
         
-        # 转换按钮
+        self.in_place_check = QCheckBox("就地清洗（减少整表复制，日志中报告清洗峰值内存）")
+        self.in_place_check.setChecked(False)
+        main_layout.addWidget(self.in_place_check)
+        
+        self.arrow_strings_check = QCheckBox("使用pyarrow字符串列（需安装pyarrow，减少内存占用）")
+        self.arrow_strings_check.setChecked(False)
+        main_layout.addWidget(self.arrow_strings_check)
+        
+        # 流式读取选项（大表格降低内存占用）
+        chunk_layout = QHBoxLayout()
+        self.streaming_read_check = QCheckBox("分块流式转换，每块行数:")
+        self.streaming_read_check.setChecked(False)
+        self.chunk_size_entry = QLineEdit(str(DEFAULT_CHUNK_SIZE))
+        self.chunk_size_entry.setMaximumWidth(100)
+        chunk_layout.addWidget(self.streaming_read_check)
+        chunk_layout.addWidget(self.chunk_size_entry)
+        chunk_layout.addStretch()
+        main_layout.addLayout(chunk_layout)
+        
+        # 多进程并行转换多个Sheet
+        workers_layout = QHBoxLayout()
+        self.parallel_check = QCheckBox("并行转换Sheet，进程数:")
+        self.parallel_check.setChecked(False)
+        self.workers_entry = QLineEdit(str(os.cpu_count() or 1))
+        self.workers_entry.setMaximumWidth(100)
+        workers_layout.addWidget(self.parallel_check)
+        workers_layout.addWidget(self.workers_entry)
+        workers_layout.addStretch()
+        main_layout.addLayout(workers_layout)
+        
+        # 转换后直接审核（整表转换时不重新读取CSV）
+        self.audit_check = QCheckBox("转换后直接审核 ana.csv / dig.csv")
+        self.audit_check.setChecked(False)
+        main_layout.addWidget(self.audit_check)
+        
+        # 性能统计：各阶段耗时、行数、内存写入输出目录，并显示在日志中
+        self.profile_check = QCheckBox(f"记录各阶段耗时和内存（写入输出目录下的 {METRICS_FILE_NAME}）")
+        self.profile_check.setChecked(False)
+        main_layout.addWidget(self.profile_check)
+        
+        # 增量转换：只转换有变化的Sheet（按输出目录中的转换清单判断）
+        self.incremental_check = QCheckBox("增量转换（只转换有变化的Sheet，其余保留现有CSV）")
+        self.incremental_check.setChecked(False)
+        main_layout.addWidget(self.incremental_check)
+        
+        # 转换缓存：工作簿、配置和清洗选项都未变化时直接复用上次的CSV
+        cache_layout = QHBoxLayout()
+        self.cache_check = QCheckBox("使用转换缓存（工作簿和配置未变化时直接复用上次转换出的CSV）")
+        self.cache_check.setChecked(False)
+        self.clear_cache_button = QPushButton("清空转换缓存")
+        cache_layout.addWidget(self.cache_check)
+        cache_layout.addWidget(self.clear_cache_button)
+        cache_layout.addStretch()
+        main_layout.addLayout(cache_layout)
+        
+        # 转换与取消按钮
+        button_layout = QHBoxLayout()
         self.convert_button = QPushButton("开始转换")
-        main_layout.addWidget(self.convert_button, alignment=Qt.AlignCenter)
+        self.cancel_button = QPushButton("取消转换")
+        self.cancel_button.setEnabled(False)
+        button_layout.addStretch()
+        button_layout.addWidget(self.convert_button)
+        button_layout.addWidget(self.cancel_button)
+        button_layout.addStretch()
+        main_layout.addLayout(button_layout)
+        
+        # 转换进度
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setValue(0)
+        main_layout.addWidget(self.progress_bar)
+        self.progress_label = QLabel("")
+        main_layout.addWidget(self.progress_label)
         
         # 设置主窗口中心组件
         container = QWidget()
@@ -139,6 +249,8 @@ class ExcelToCSVApp(QMainWindow):
         self.excel_button.clicked.connect(self.select_excel_file)
         self.output_button.clicked.connect(self.select_output_dir)
         self.convert_button.clicked.connect(self.convert_to_csv)
+        self.cancel_button.clicked.connect(self.cancel_conversion)
+        self.clear_cache_button.clicked.connect(self.clear_conversion_cache)
     
     def select_excel_file(self):
         """选择Excel文件"""
@@ -157,9 +269,10 @@ class ExcelToCSVApp(QMainWindow):
     
     def load_config(self):
         try:
-            # 使用动态路径
-            with open(self.config_file, 'r', encoding='utf-8') as f:
-                self.config.read_file(f)
+            # 使用动态路径；配置文件未变化时直接加载编译缓存
+            compiled = load_compiled_config(self.config_file)
+            self.config = compiled.config
+            self.fuzzy_engine = compiled.fuzzy_engine
             
             # 新增：打印所有加载的配置段
             self.logger.info("已加载配置段: %s", self.config.sections())
@@ -229,11 +342,51 @@ class ExcelToCSVApp(QMainWindow):
         'remove_empty_rows': self.remove_empty_rows_check.isChecked(),
         'remove_duplicates': self.remove_duplicates_check.isChecked(),
         'fill_na': self.fill_na_check.isChecked(),
-        'fill_na_value': self.fill_na_entry.text()
+        'fill_na_value': self.fill_na_entry.text(),
+        'in_place': self.in_place_check.isChecked(),
+        'arrow_strings': self.arrow_strings_check.isChecked(),
+        'chunk_size': self.get_chunk_size() if self.streaming_read_check.isChecked() else 0,
+        'max_workers': self.get_max_workers() if self.parallel_check.isChecked() else 0,
+        'audit': self.audit_check.isChecked(),
+        'profile': self.profile_check.isChecked(),
+        'incremental': self.incremental_check.isChecked(),
+        'cache_dir': get_config_path(CACHE_DIR_NAME) if self.cache_check.isChecked() else None
          }
     
+    def clear_conversion_cache(self):
+        """使全部转换缓存失效"""
+        try:
+            removed = ConversionCache(get_config_path(CACHE_DIR_NAME)).clear()
+            QMessageBox.information(self, "完成", f"已清空转换缓存，共删除 {removed} 个条目。")
+        except Exception as e:
+            self.logger.error(f"清空转换缓存失败: {str(e)}")
+            QMessageBox.critical(self, "错误", f"清空转换缓存失败：{str(e)}")
+    
+    def get_chunk_size(self) -> int:
+        """读取分块行数，输入无效时使用默认值"""
+        try:
+            chunk_size = int(self.chunk_size_entry.text())
+            if chunk_size > 0:
+                return chunk_size
+        except ValueError:
+            pass
+        self.logger.warning(f"无效的分块行数: {self.chunk_size_entry.text()}，使用默认值 {DEFAULT_CHUNK_SIZE}")
+        return DEFAULT_CHUNK_SIZE
+    
+    def get_max_workers(self) -> int:
+        """读取并行进程数，输入无效时使用CPU核数"""
+        try:
+            max_workers = int(self.workers_entry.text())
+            if max_workers > 0:
+                return max_workers
+        except ValueError:
+            pass
+        default_workers = os.cpu_count() or 1
+        self.logger.warning(f"无效的进程数: {self.workers_entry.text()}，使用默认值 {default_workers}")
+        return default_workers
+    
     def convert_to_csv(self):
-        """执行转换操作"""
+        """在后台线程中执行转换操作，界面保持响应"""
         excel_file = self.excel_entry.text()
         if not excel_file:
             QMessageBox.critical(self, "错误", "请先选择 Excel 文件！")
@@ -242,66 +395,142 @@ class ExcelToCSVApp(QMainWindow):
         output_dir = self.output_entry.text() or os.path.dirname(excel_file)
         clean_options = self.get_clean_options()
         
-        try:
-            success_count = self.process_excel_file(excel_file, output_dir, clean_options)
-            self.show_conversion_result(success_count, output_dir)
-        except Exception as e:
-            self.handle_conversion_error(e)
+        self.conversion_thread = QThread(self)
+        self.conversion_worker = ConversionWorker(self.converter, excel_file, output_dir, clean_options)
+        self.conversion_worker.moveToThread(self.conversion_thread)
+        
+        self.conversion_thread.started.connect(self.conversion_worker.run)
+        self.conversion_worker.progress.connect(self.update_progress)
+        self.conversion_worker.finished.connect(
+            lambda results: self.show_conversion_result(results, output_dir, excel_file))
+        self.conversion_worker.failed.connect(self.handle_conversion_error)
+        self.conversion_worker.cancelled.connect(self.show_conversion_cancelled)
+        for signal in (self.conversion_worker.finished, self.conversion_worker.failed,
+                       self.conversion_worker.cancelled):
+            signal.connect(self.conversion_thread.quit)
+        self.conversion_thread.finished.connect(self.on_conversion_thread_finished)
+        
+        self.set_converting(True)
+        self.conversion_thread.start()
     
-    def process_excel_file(self, excel_file: str, output_dir: str, clean_options: dict = None) -> int:
-        if clean_options is None:
-            clean_options = {}
-
-        success_count = 0
-
-        with pd.ExcelFile(excel_file, engine='openpyxl') as xls:
-            for sheet_name, output_name in self.config['SheetMapping'].items():
-                if sheet_name in xls.sheet_names:
-                    # 读取为原始数据（不强制类型转换）
-                    df = pd.read_excel(xls, sheet_name=sheet_name, dtype=str)  # 保持为字符串类型
-
-                    # 数据清洗
-                    df = self.cleaner.clean_data(df, clean_options)
-
-                    # 按配置文件进行类型转换（清洗完成后）
-                    if 'DataType' in self.config:
-                        for col, dtype in self.config['DataType'].items():
-                            if col in df.columns:
-                                try:
-                                    df[col] = df[col].astype(dtype.lower())
-                                except Exception as e:
-                                    self.logger.warning(f"列 '{col}' 类型转换失败: {str(e)}")
-
-                    # 列映射与重组
-                    column_section = f"{sheet_name}_ColumnMapping"
-                    column_mapping = dict(self.config[column_section]) if column_section in self.config else None
-                    df = self.cleaner.clean_and_filter_columns(df, sheet_name, column_mapping)
-
-                    # 保存处理后的数据
-                    output_path = os.path.join(output_dir, output_name)
-                    df.to_csv(output_path, index=False, encoding='utf-8-sig')
-                    success_count += 1
-
-        return success_count
+    def cancel_conversion(self):
+        """请求取消正在进行的转换"""
+        if self.conversion_worker is not None:
+            self.conversion_worker.cancel()
+            self.cancel_button.setEnabled(False)
+            self.progress_label.setText("正在取消...")
     
-    def show_conversion_result(self, success_count: int, output_dir: str):
+    def update_progress(self, percent: int, message: str):
+        self.progress_bar.setValue(percent)
+        self.progress_label.setText(message)
+    
+    def set_converting(self, converting: bool):
+        """转换期间禁用开始按钮，启用取消按钮"""
+        self.convert_button.setEnabled(not converting)
+        self.cancel_button.setEnabled(converting)
+        if converting:
+            self.progress_bar.setValue(0)
+            self.progress_label.setText("正在转换...")
+    
+    def on_conversion_thread_finished(self):
+        self.conversion_worker.deleteLater()
+        self.conversion_thread.deleteLater()
+        self.conversion_worker = None
+        self.conversion_thread = None
+        self.set_converting(False)
+        if self.close_pending:
+            self.close()
+    
+    def closeEvent(self, event):
+        """关闭窗口时取消后台转换；转换未结束时先隐藏窗口，线程结束后再关闭，避免界面卡住或留下未写完的CSV"""
+        if self.conversion_thread is not None:
+            # 类型转换、写出CSV等步骤中途无法响应取消，不在界面线程中等待
+            self.logger.info("窗口已关闭，等待后台转换取消后退出")
+            self.conversion_worker.cancel()
+            self.close_pending = True
+            self.hide()
+            event.ignore()
+            return
+        super().closeEvent(event)
+    
+    def process_excel_file(self, excel_file: str, output_dir: str, clean_options: dict = None,
+                           progress_callback=None, cancel_event=None) -> int:
+        return self.converter.process_excel_file(excel_file, output_dir, clean_options,
+                                                 progress_callback, cancel_event)
+    
+    def show_conversion_result(self, results: list, output_dir: str, excel_file: str = None):
         """显示转换结果"""
+        success_count = len(results)
+        self.progress_bar.setValue(100)
+        cached = "（使用转换缓存）" if results and all(result.get('cached', False) for result in results) else ""
+        unchanged = sum(1 for result in results if result.get('unchanged', False))
+        if unchanged:
+            cached += f"（{unchanged} 个Sheet未变化）"
+        self.progress_label.setText(f"转换完成，成功转换 {success_count} 个Sheet{cached}")
         if success_count > 0:
+            summary = self.log_audit_findings(results) + self.log_metrics(results, output_dir, excel_file)
+            if self.close_pending:
+                return
             QMessageBox.information(
                 self, "成功", 
                 f"转换完成！成功转换 {success_count} 个Sheet。\n"
-                f"输出目录: {output_dir}"
+                f"输出目录: {output_dir}" + summary
             )
-        else:
+        elif not self.close_pending:
             QMessageBox.warning(
                 self, "警告",
                 "没有找到匹配的Sheet名称，请检查配置文件！"
             )
     
-    def handle_conversion_error(self, error: Exception):
+    def log_audit_findings(self, results: list) -> str:
+        """把直接审核的结果写入日志，返回附加到结果提示中的汇总文字"""
+        summary = ""
+        for result in results:
+            findings = result.get('findings')
+            if findings is None:
+                continue
+            for level, message in findings.messages():
+                self.logger.log(logging.ERROR if level == "ERROR" else logging.INFO, message)
+            if findings.has_error:
+                summary += f"\n{findings.file_name} 审核发现 {len(findings.items)} 条问题，详见日志。"
+            else:
+                summary += f"\n{findings.file_name} 审核通过，无错误。"
+        return summary
+    
+    def log_metrics(self, results: list, output_dir: str, excel_file: str = None) -> str:
+        """把各阶段统计写入输出目录的 JSON lines 文件并显示在日志中，返回附加到结果提示中的文字"""
+        records = metrics_records(excel_file or '', results)
+        if not records:
+            return ""
+        for record in records:
+            if record['type'] == 'stage':
+                self.logger.info(format_stage(record))
+        for record in slowest_rules(records, 5):
+            self.logger.info(f"Sheet '{record['sheet']}' 正则规则 {record['rule']} 匹配耗时 {record['seconds']:.3f} 秒，"
+                             f"命中 {record['hits']} 行")
+        metrics_path = os.path.join(output_dir, METRICS_FILE_NAME)
+        try:
+            write_metrics(metrics_path, records)
+        except OSError as e:
+            self.logger.warning(f"性能统计写入失败: {str(e)}")
+            return ""
+        return f"\n各阶段耗时和内存已写入: {metrics_path}"
+    
+    def show_conversion_cancelled(self):
+        """转换被取消"""
+        self.progress_label.setText("转换已取消")
+        self.logger.info("转换已取消")
+        if self.close_pending:
+            return
+        QMessageBox.information(self, "已取消", "转换已取消，未完成的CSV文件已删除。")
+    
+    def handle_conversion_error(self, error: Exception, details: str = None):
         """处理转换错误"""
-        # 输出详细traceback到日志
-        self.logger.error("转换失败详细信息：\n" + traceback.format_exc())
+        # 输出详细traceback到日志（后台线程中的异常由工作线程提供traceback）
+        self.logger.error("转换失败详细信息：\n" + (details or traceback.format_exc()))
+        self.progress_label.setText("转换失败")
+        if self.close_pending:
+            return
         QMessageBox.critical(
             self, "错误", 
             f"转换失败：{str(error)}\n"
@@ -309,6 +538,7 @@ class ExcelToCSVApp(QMainWindow):
         )
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # 打包后多进程转换需要
     app = QApplication(sys.argv)
     app.setStyle('Fusion')
     window = ExcelToCSVApp()
@@ -0,0 +1,409 @@
+import re
+import string
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# 正则元字符：模式中出现任意一个即不能按字面量处理
+REGEX_META = set('.^$*+?{}[]\\|()')
+
+# re.IGNORECASE 的大小写折叠：ASCII 大写字母转小写，另有4个非ASCII字符与ASCII字母等价
+_FOLD_TABLE = {ord(c): c.lower() for c in string.ascii_uppercase}
+_FOLD_TABLE.update({0x130: 'i', 0x131: 'i', 0x17F: 's', 0x212A: 'k'})
+
+
+def fold_case(text: str) -> str:
+    """按 re.IGNORECASE 的等价关系折叠文本（仅用于字面量模式匹配）"""
+    return text.translate(_FOLD_TABLE)
+
+
+def is_plain_literal(pattern: str) -> bool:
+    """判断模式能否走字面量自动机：不含正则元字符，且只含ASCII或无大小写之分的字符"""
+    for ch in pattern:
+        if ch in REGEX_META:
+            return False
+        if not ch.isascii() and (ch.lower() != ch or ch.upper() != ch):
+            return False
+    return True
+
+
+class AhoCorasick:
+    """多模式子串匹配自动机，一次扫描文本即可得到所有命中的模式"""
+
+    def __init__(self):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[Tuple[int, ...]] = [()]
+
+    def add(self, word: str, pattern_id: int):
+        state = 0
+        for ch in word:
+            nxt = self.goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(())
+            state = nxt
+        self.output[state] = self.output[state] + (pattern_id,)
+
+    def build(self):
+        """构建失败指针，并把失败链上的输出合并到各状态"""
+        queue = list(self.goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(ch, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                if self.output[self.fail[nxt]]:
+                    self.output[nxt] = self.output[nxt] + self.output[self.fail[nxt]]
+
+    def search(self, text: str) -> set:
+        """返回文本中出现过的全部模式编号"""
+        goto, fail, output = self.goto, self.fail, self.output
+        found = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+
+class FuzzyRule:
+    """一条 KeywordFuzzyMapping 规则的预解析结果"""
+
+    def __init__(self, index: int, full_key: str, replacements: str):
+        self.index = index
+        self.full_key = full_key
+        self.src_col: Optional[str] = None
+        self.pattern: Optional[str] = None
+        self.literal: Optional[str] = None
+        self.regex = None
+        self.regex_error: Optional[str] = None
+        self.invalid_replacements: List[str] = []
+        # 目标列 -> 替换值（同一规则内重复的目标列以最后一个为准），保持首次出现顺序
+        self.assignments: Dict[str, str] = {}
+
+        if '_' not in full_key:
+            return
+        self.src_col, pattern = full_key.split('_', 1)
+        self.pattern = pattern.replace('*', '.*')  # 转换通配符
+        if is_plain_literal(pattern):
+            self.literal = fold_case(pattern)
+        else:
+            try:
+                self.regex = re.compile(self.pattern, re.IGNORECASE)
+            except re.error as e:
+                self.regex_error = str(e)
+
+        for replacement in replacements.split(','):
+            if ':' not in replacement:
+                self.invalid_replacements.append(replacement)
+                continue
+            dest_col, replace_value = replacement.split(':', 1)
+            dest_col = dest_col.strip()
+            self.assignments[dest_col] = replace_value.strip()
+
+    def __getstate__(self):
+        # 编译好的正则不随对象传给子进程，使用时再编译（见 FuzzyMappingEngine.match_values）
+        state = self.__dict__.copy()
+        state['regex'] = None
+        return state
+
+    def to_row(self) -> list:
+        """规则的预解析结果（纯数据，可写入 JSON），用 from_row 还原时不必重新解析和编译"""
+        return [self.full_key, self.src_col, self.pattern, self.literal, self.regex_error,
+                self.invalid_replacements, [[dest_col, value] for dest_col, value in self.assignments.items()]]
+
+    @classmethod
+    def from_row(cls, index: int, row: list) -> 'FuzzyRule':
+        rule = cls.__new__(cls)
+        rule.index = index
+        (rule.full_key, rule.src_col, rule.pattern, rule.literal, rule.regex_error,
+         rule.invalid_replacements, assignments) = row
+        rule.regex = None  # 首次匹配该源列时编译
+        rule.assignments = dict(assignments)
+        return rule
+
+    def is_active(self, columns) -> bool:
+        """规则在当前列集合上是否会真正执行替换"""
+        return self.src_col is not None and self.src_col in columns and self.regex_error is None
+
+
+class FuzzyMappingEngine:
+    """编译后的 KeywordFuzzyMapping 规则引擎
+
+    规则按源列分组：字面量模式并入一个 Aho-Corasick 自动机，其余通配符/正则模式
+    合并成一个交替正则做预筛选，每个源列只对去重后的取值扫描一遍。
+    命中结果按规则顺序落盘，保持“后面的规则覆盖前面的规则”的语义。
+    """
+
+    def __init__(self, mapping_items, rules: Optional[List[FuzzyRule]] = None):
+        self.mapping_items = tuple(mapping_items)
+        if rules is None:
+            rules = [FuzzyRule(i, key, value) for i, (key, value) in enumerate(self.mapping_items)]
+        self.rules = rules
+        # 源列 -> 匹配器，首次匹配该源列时才按源列分组规则、构建自动机并编译正则
+        self._rules_by_src: Optional[Dict[str, List[FuzzyRule]]] = None
+        self._matchers: Dict[str, dict] = {}
+
+    def __getstate__(self):
+        # 匹配器不随引擎传给子进程，在子进程中按源列重新构建，启动时不必编译全部规则
+        state = self.__dict__.copy()
+        state['_matchers'] = {}
+        return state
+
+    def _matcher(self, src_col: str) -> dict:
+        """获取（必要时构建）一个源列的匹配器"""
+        matcher = self._matchers.get(src_col)
+        if matcher is not None:
+            return matcher
+        if self._rules_by_src is None:
+            self._rules_by_src = {}
+            for rule in self.rules:
+                if rule.src_col is not None and rule.regex_error is None:
+                    self._rules_by_src.setdefault(rule.src_col, []).append(rule)
+        matcher = {'automaton': AhoCorasick(), 'empty': [], 'regex': [], 'combined_parts': []}
+        for rule in self._rules_by_src.get(src_col, []):
+            if rule.literal is not None:
+                if rule.literal:
+                    matcher['automaton'].add(rule.literal, rule.index)
+                else:
+                    matcher['empty'].append(rule.index)
+            else:
+                matcher['regex'].append(rule)
+                # 含反向引用或内联标志的模式合并后语义会变，只做逐条匹配
+                if not re.search(r'\\\d|\(\?', rule.pattern):
+                    matcher['combined_parts'].append(f'(?:{rule.pattern})')
+        matcher['automaton'].build()
+        self._compile(matcher)
+        self._matchers[src_col] = matcher
+        return matcher
+
+    @staticmethod
+    def _compile(matcher: dict):
+        """编译一个源列下的正则规则，以及用于预筛选的合并正则"""
+        for rule in matcher['regex']:
+            if rule.regex is None:
+                rule.regex = re.compile(rule.pattern, re.IGNORECASE)
+        matcher['combined'] = None
+        if matcher['combined_parts'] and len(matcher['combined_parts']) == len(matcher['regex']):
+            try:
+                matcher['combined'] = re.compile('|'.join(matcher['combined_parts']), re.IGNORECASE)
+            except re.error:
+                matcher['combined'] = None
+
+    @classmethod
+    def from_config(cls, config) -> 'FuzzyMappingEngine':
+        return cls(list(config['KeywordFuzzyMapping'].items()))
+
+    def to_table(self) -> List[list]:
+        """全部规则的替换值和预解析结果（纯数据），供编译缓存保存"""
+        return [[value] + rule.to_row() for rule, (_, value) in zip(self.rules, self.mapping_items)]
+
+    @classmethod
+    def from_table(cls, table: List[list]) -> 'FuzzyMappingEngine':
+        """由 to_table 的结果还原引擎，不重新解析规则，正则在首次匹配对应源列时编译"""
+        rules = [FuzzyRule.from_row(i, row[1:]) for i, row in enumerate(table)]
+        return cls([(rule.full_key, row[0]) for rule, row in zip(rules, table)], rules)
+
+    def match_values(self, src_col: str, values, rule_seconds: Optional[Dict[int, float]] = None) -> Dict[int, List[int]]:
+        """对一组去重后的取值做单遍匹配，返回 规则序号 -> 命中取值下标列表
+
+        传入 rule_seconds 时逐条累计正则规则的匹配耗时（规则序号 -> 秒）；字面量规则共用自动机，不单独计时。
+        """
+        matcher = self._matcher(src_col)
+        automaton = matcher['automaton']
+        regex_rules = matcher['regex']
+        combined = matcher['combined']
+        hits: Dict[int, List[int]] = {}
+
+        for j, value in enumerate(values):
+            for rule_index in automaton.search(fold_case(value)):
+                hits.setdefault(rule_index, []).append(j)
+            for rule_index in matcher['empty']:
+                hits.setdefault(rule_index, []).append(j)
+            if not regex_rules:
+                continue
+            if combined is not None and combined.search(value) is None:
+                continue
+            for rule in regex_rules:
+                if rule_seconds is None:
+                    matched = rule.regex.search(value)
+                else:
+                    start = time.perf_counter()
+                    matched = rule.regex.search(value)
+                    rule_seconds[rule.index] = rule_seconds.get(rule.index, 0.0) + time.perf_counter() - start
+                if matched:
+                    hits.setdefault(rule.index, []).append(j)
+        return hits
+
+    def apply(self, df: pd.DataFrame, logger, metrics=None, checkpoint=None) -> pd.DataFrame:
+        """就地对 df 应用全部规则（调用方负责复制）
+
+        传入 metrics（StageMetrics）时记录各源列和各规则的命中与耗时，以及各规则写入的单元格中
+        有多少被后面的规则覆盖；传入 checkpoint(步骤说明) 时在匹配每个源列之前调用（检查取消、报告进度）。
+        """
+        usage = RuleUsage(len(df), len(self.rules)) if metrics is not None else None
+        pos = 0
+        while pos < len(self.rules):
+            # 切分执行段：段内没有规则读取本段前面规则写入的列，因此段内所有匹配都可基于段首数据一次完成
+            columns = set(df.columns)
+            written = set()
+            segment = []
+            while pos < len(self.rules):
+                rule = self.rules[pos]
+                if rule.src_col is not None and rule.src_col in written:
+                    break
+                segment.append(rule)
+                pos += 1
+                if rule.is_active(columns):
+                    written.update(rule.assignments)
+            self._apply_segment(df, segment, logger, metrics, usage, checkpoint)
+        if usage is not None:
+            usage.report(metrics)
+        return df
+
+    def _apply_segment(self, df: pd.DataFrame, segment: List[FuzzyRule], logger, metrics=None,
+                       usage: Optional['RuleUsage'] = None, checkpoint=None):
+        columns = set(df.columns)
+        active = [rule for rule in segment if rule.is_active(columns)]
+        match_counts: Dict[int, int] = {}
+        group_errors: Dict[str, str] = {}
+        # 目标列 -> (命中规则序号, 替换值)，逐行取序号最大的规则
+        winners: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+        by_src: Dict[str, List[FuzzyRule]] = {}
+        for rule in active:
+            by_src.setdefault(rule.src_col, []).append(rule)
+
+        for src_col, rules in by_src.items():
+            if checkpoint is not None:
+                checkpoint(f"模糊映射源列 '{src_col}'")
+            rule_seconds = {} if metrics is not None else None
+            start = time.perf_counter()
+            try:
+                src_series = df[src_col].astype(str)
+                codes, uniques = pd.factorize(src_series)
+                counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+                hits = self.match_values(src_col, list(uniques), rule_seconds)
+            except Exception as e:
+                group_errors[src_col] = str(e)
+                continue
+            if metrics is not None:
+                metrics.add_rule_group(src_col, len(rules), len(uniques), time.perf_counter() - start)
+
+            # 在去重取值上确定每个目标列的获胜规则，末尾多留一格给空值(-1)
+            unique_winners: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+            for rule in rules:
+                matched = np.asarray(hits.get(rule.index, []), dtype=np.intp)
+                match_counts[rule.index] = int(counts[matched].sum())
+                if usage is not None:
+                    usage.add_hits(rule, src_col, match_counts[rule.index],
+                                   rule_seconds.get(rule.index, 0.0) if rule.literal is None else None)
+                if not len(matched):
+                    continue
+                for dest_col, replace_value in rule.assignments.items():
+                    if dest_col not in unique_winners:
+                        unique_winners[dest_col] = (
+                            np.full(len(uniques) + 1, -1, dtype=np.int64),
+                            np.empty(len(uniques) + 1, dtype=object),
+                        )
+                    rule_idx, values = unique_winners[dest_col]
+                    rule_idx[matched] = rule.index
+                    values[matched] = replace_value
+
+            for dest_col, (rule_idx, values) in unique_winners.items():
+                row_rule = rule_idx[codes]
+                row_value = values[codes]
+                if dest_col not in winners:
+                    winners[dest_col] = (row_rule, row_value)
+                    continue
+                best_rule, best_value = winners[dest_col]
+                newer = row_rule > best_rule
+                best_rule[newer] = row_rule[newer]
+                best_value[newer] = row_value[newer]
+
+        # 按规则顺序准备目标列并输出日志，与逐条执行时一致
+        prepared = set()
+        for rule in segment:
+            if rule.src_col is None:
+                logger.error(f"无效的模糊映射键格式: {rule.full_key}")
+                continue
+            if rule.src_col not in columns:
+                logger.error(f"源列不存在: {rule.src_col}")
+                continue
+            if rule.regex_error is not None:
+                logger.error(f"处理键 {rule.full_key} 时出错: {rule.regex_error}")
+                continue
+            if rule.src_col in group_errors:
+                logger.error(f"处理键 {rule.full_key} 时出错: {group_errors[rule.src_col]}")
+                continue
+            for replacement in rule.invalid_replacements:
+                logger.error(f"无效替换规则: {replacement}")
+            for dest_col in rule.assignments:
+                if dest_col in prepared:
+                    continue
+                prepared.add(dest_col)
+                # 初始化目标列为字符串类型（如果不存在）
+                if dest_col not in df.columns:
+                    df[dest_col] = ""
+                else:
+                    df[dest_col] = df[dest_col].astype(str)
+            logger.info(f"✅ [{rule.src_col}] 替换完成，命中 {match_counts.get(rule.index, 0)} 行")
+
+        for dest_col, (row_rule, row_value) in winners.items():
+            if usage is not None:
+                usage.add_writes(dest_col, row_rule)
+            mask = row_rule >= 0
+            if mask.any():
+                df.loc[mask, dest_col] = row_value[mask]
+
+
+class RuleUsage:
+    """一次 apply 中各规则的命中行数、匹配耗时，以及写入的单元格有多少被后面的规则覆盖
+
+    每条命中都按规则顺序写入全部目标列；记下每个目标单元格最后由哪条规则写入，
+    规则写入的单元格数减去最终保留的数量即为被覆盖的数量。
+    """
+
+    def __init__(self, rows: int, rule_count: int):
+        self.rows = rows
+        self.rule_count = rule_count
+        self._rules: Dict[int, dict] = {}
+        # 目标列 -> 每行最后写入该列的规则序号（-1 表示没有规则写入）
+        self._writers: Dict[str, np.ndarray] = {}
+
+    def add_hits(self, rule: FuzzyRule, src_col: str, hits: int, seconds: Optional[float]):
+        self._rules[rule.index] = {
+            'key': rule.full_key, 'src_col': src_col, 'kind': 'literal' if rule.literal is not None else 'regex',
+            'hits': hits, 'seconds': seconds, 'written': hits * len(rule.assignments),
+        }
+
+    def add_writes(self, dest_col: str, row_rule: np.ndarray):
+        writers = self._writers.get(dest_col)
+        if writers is None:
+            writers = self._writers[dest_col] = np.full(self.rows, -1, dtype=np.int64)
+        mask = row_rule >= 0
+        writers[mask] = row_rule[mask]
+
+    def report(self, metrics):
+        """把各规则的统计写入 metrics（StageMetrics）"""
+        kept = np.zeros(self.rule_count, dtype=np.int64)
+        for writers in self._writers.values():
+            kept += np.bincount(writers[writers >= 0], minlength=self.rule_count)
+        for index, rule in self._rules.items():
+            metrics.add_rule(rule['key'], rule['src_col'], rule['kind'], rule['hits'], rule['seconds'],
+                             written=rule['written'], overwritten=rule['written'] - int(kept[index]))
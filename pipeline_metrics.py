@@ -0,0 +1,196 @@
+import contextlib
+import ctypes
+import json
+import sys
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+MB = 1024 * 1024
+
+
+def process_memory() -> Tuple[Optional[int], Optional[int]]:
+    """当前进程的 (RSS, 峰值RSS)，单位字节；无法获取的项为 None"""
+    if sys.platform.startswith('linux'):
+        try:
+            values = {}
+            with open('/proc/self/status', encoding='ascii') as f:
+                for line in f:
+                    if line.startswith(('VmRSS:', 'VmHWM:')):
+                        name, value = line.split(':', 1)
+                        values[name] = int(value.split()[0]) * 1024
+            return values.get('VmRSS'), values.get('VmHWM')
+        except (OSError, ValueError):
+            pass
+    elif sys.platform == 'win32':
+        try:
+            return _windows_memory()
+        except Exception:
+            pass
+    try:
+        import resource
+    except ImportError:
+        return None, None
+    # ru_maxrss 在 macOS 上为字节，其他系统为KB
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return None, peak if sys.platform == 'darwin' else peak * 1024
+
+
+class _ProcessMemoryCounters(ctypes.Structure):
+    _fields_ = [
+        ('cb', ctypes.c_ulong),
+        ('PageFaultCount', ctypes.c_ulong),
+        ('PeakWorkingSetSize', ctypes.c_size_t),
+        ('WorkingSetSize', ctypes.c_size_t),
+        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+        ('QuotaPagedPoolUsage', ctypes.c_size_t),
+        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+        ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+        ('PagefileUsage', ctypes.c_size_t),
+        ('PeakPagefileUsage', ctypes.c_size_t),
+    ]
+
+
+def _windows_memory() -> Tuple[int, int]:
+    counters = _ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    process = ctypes.windll.kernel32.GetCurrentProcess()
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+        raise OSError("GetProcessMemoryInfo 调用失败")
+    return counters.WorkingSetSize, counters.PeakWorkingSetSize
+
+
+def _mb(value: Optional[int]) -> Optional[float]:
+    return round(value / MB, 1) if value is not None else None
+
+
+class StageMetrics:
+    """一个Sheet转换过程中各阶段的耗时、输入/输出行数和内存，以及模糊映射各规则的命中与耗时
+
+    同一阶段执行多次时（分块转换）累加耗时和行数；峰值RSS为阶段结束时进程的历史峰值，
+    peak_rss_growth_mb 为该阶段把历史峰值抬高了多少，可据此找出占用内存最多的阶段。
+    """
+
+    def __init__(self, sheet: str):
+        self.sheet = sheet
+        self._stages: Dict[str, dict] = {}
+        self._rule_groups: Dict[str, dict] = {}
+        self._rules: Dict[str, dict] = {}
+
+    @contextlib.contextmanager
+    def stage(self, name: str, rows_in: Optional[int] = None):
+        """计时一个阶段；在 with 块内把输出行数写入 yield 出的 record['rows_out']"""
+        _, peak_before = process_memory()
+        record = {'rows_out': None}
+        start = time.perf_counter()
+        yield record
+        seconds = time.perf_counter() - start
+        rss, peak = process_memory()
+        growth = peak - peak_before if peak is not None and peak_before is not None else None
+        self._add_stage(name, seconds, rows_in, record['rows_out'], rss, peak, growth)
+
+    def _add_stage(self, name: str, seconds: float, rows_in: Optional[int], rows_out: Optional[int],
+                   rss: Optional[int], peak: Optional[int], growth: Optional[int]):
+        stage = self._stages.setdefault(name, {
+            'calls': 0, 'seconds': 0.0, 'rows_in': None, 'rows_out': None, 'rss': None, 'peak': None, 'growth': None,
+        })
+        stage['calls'] += 1
+        stage['seconds'] += seconds
+        for key, value in (('rows_in', rows_in), ('rows_out', rows_out), ('growth', growth)):
+            if value is not None:
+                stage[key] = (stage[key] or 0) + value
+        stage['rss'] = rss
+        stage['peak'] = peak
+
+    def add_rule_group(self, src_col: str, rules: int, unique_values: int, seconds: float):
+        """一个源列上全部规则的一次匹配（字面量规则共用自动机，只能按源列计时）"""
+        group = self._rule_groups.setdefault(src_col, {'rules': rules, 'calls': 0, 'unique_values': 0, 'seconds': 0.0})
+        group['calls'] += 1
+        group['unique_values'] += unique_values
+        group['seconds'] += seconds
+
+    def add_rule(self, rule_key: str, src_col: str, kind: str, hits: int, seconds: Optional[float],
+                 written: int = 0, overwritten: int = 0):
+        """一条规则的命中行数、写入的单元格数及其中被后面规则覆盖的数量；正则规则另有逐条匹配耗时"""
+        rule = self._rules.setdefault(rule_key, {
+            'src_col': src_col, 'kind': kind, 'hits': 0, 'written': 0, 'overwritten': 0, 'seconds': None,
+        })
+        rule['hits'] += hits
+        rule['written'] += written
+        rule['overwritten'] += overwritten
+        if seconds is not None:
+            rule['seconds'] = (rule['seconds'] or 0.0) + seconds
+
+    def records(self) -> List[dict]:
+        """可直接写成JSON的记录：先各阶段（按首次执行顺序），再各源列和各规则"""
+        records = []
+        for name, stage in self._stages.items():
+            records.append({
+                'type': 'stage', 'sheet': self.sheet, 'stage': name, 'calls': stage['calls'],
+                'seconds': round(stage['seconds'], 6), 'rows_in': stage['rows_in'], 'rows_out': stage['rows_out'],
+                'rss_mb': _mb(stage['rss']), 'peak_rss_mb': _mb(stage['peak']),
+                'peak_rss_growth_mb': _mb(stage['growth']),
+            })
+        for src_col, group in self._rule_groups.items():
+            records.append({'type': 'rule_group', 'sheet': self.sheet, 'src_col': src_col, **group,
+                            'seconds': round(group['seconds'], 6)})
+        for rule_key, rule in self._rules.items():
+            records.append({'type': 'rule', 'sheet': self.sheet, 'rule': rule_key, **rule,
+                            'seconds': round(rule['seconds'], 6) if rule['seconds'] is not None else None})
+        return records
+
+
+def measure(metrics: Optional[StageMetrics], name: str, rows_in: Optional[int] = None):
+    """metrics 为 None 时不计时，with 块的写法不变"""
+    if metrics is None:
+        return contextlib.nullcontext({'rows_out': None})
+    return metrics.stage(name, rows_in)
+
+
+def measure_iter(metrics: Optional[StageMetrics], name: str, items: Iterable) -> Iterator:
+    """逐项计时一个迭代器（如分块读取），每取一项记为该阶段的一次执行（最后确认读完的一次也计入），
+    输出行数为各项的行数"""
+    if metrics is None:
+        yield from items
+        return
+    iterator = iter(items)
+    while True:
+        with metrics.stage(name) as record:
+            item = next(iterator, None)
+            if item is not None:
+                record['rows_out'] = len(item)
+        if item is None:
+            return
+        yield item
+
+
+def metrics_records(workbook: str, results: List[Dict]) -> List[dict]:
+    """汇总转换结果（每个Sheet一项）中的统计记录，每条记录带上工作簿路径"""
+    return [{'workbook': workbook, **record} for result in results for record in result.get('metrics') or []]
+
+
+def write_metrics(path: str, records: List[dict], append: bool = False):
+    """把统计记录写成 JSON lines（每行一条记录）"""
+    with open(path, 'a' if append else 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def format_stage(record: dict) -> str:
+    """一条阶段记录的单行摘要（用于日志显示）"""
+    rows = ''
+    if record['rows_in'] is not None or record['rows_out'] is not None:
+        rows = f"，行数 {record['rows_in'] if record['rows_in'] is not None else '-'}"
+        rows += f" → {record['rows_out'] if record['rows_out'] is not None else '-'}"
+    memory = ''
+    if record['peak_rss_mb'] is not None:
+        memory = f"，峰值内存 {record['peak_rss_mb']} MB"
+        if record['peak_rss_growth_mb']:
+            memory += f"（本阶段增加 {record['peak_rss_growth_mb']} MB）"
+    calls = f"（{record['calls']} 次）" if record['calls'] > 1 else ''
+    return f"Sheet '{record['sheet']}' {record['stage']}{calls}: {record['seconds']:.3f} 秒{rows}{memory}"
+
+
+def slowest_rules(records: List[dict], limit: int = 10) -> List[dict]:
+    """耗时最多的正则规则"""
+    timed = [record for record in records if record['type'] == 'rule' and record['seconds'] is not None]
+    return sorted(timed, key=lambda record: record['seconds'], reverse=True)[:limit]
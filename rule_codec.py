@@ -0,0 +1,103 @@
+from typing import Iterable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+# 配置表格的列（与 KeywordFuzzyMapping 互相转换）
+RULE_TABLE_COLUMNS = ['原列名称', '原列描述', '描述', '量测类型', '系数', '告警优先级', '命名规则']
+
+# 从规则字符串中按名称取值的列
+RULE_FIELDS = ['描述', '量测类型', '系数', '告警优先级']
+
+# 写回规则字符串的列，以及是否按整数写出
+RULE_ENCODING = [('描述', False), ('量测类型', False), ('系数', True), ('告警优先级', True), ('命名规则', False)]
+
+# factorize 会把 1、1.0、True 视为同一个值，只有单一类型的列才能按唯一值编码
+_UNIFORM_TYPES = {'string', 'integer', 'floating', 'boolean', 'empty'}
+
+
+def rules_to_table(items: Iterable[Tuple[str, str]], default_coef: str = '') -> pd.DataFrame:
+    """把 KeywordFuzzyMapping 的 (键, 规则字符串) 转换为配置表格，所有行一起用字符串方法解析
+
+    键为“列名_关键字”，不含'_'的键跳过；规则中同名的项以最后一个为准；
+    命名规则取规则字符串最后一项冒号后的值。
+    """
+    items = [(key, value) for key, value in items if '_' in key]
+    if not items:
+        return pd.DataFrame()
+    keys = pd.Series([key for key, _ in items], dtype=object)
+    values = pd.Series([value for _, value in items], dtype=object)
+    row_count = len(items)
+
+    split_keys = keys.str.split('_', n=1)
+    table = {
+        '原列名称': split_keys.str[0],
+        '原列描述': split_keys.str[1],
+    }
+
+    # 每条规则拆成 名称:值 的长表，index 为规则所在行
+    parts = values.str.split(',').explode()
+    parts = parts[parts.str.contains(':', regex=False)]
+    name_value = parts.str.split(':', n=1)
+    pairs = pd.DataFrame({
+        'row': parts.index,
+        'name': name_value.str[0].str.strip().to_numpy(),
+        'value': name_value.str[1].str.strip().to_numpy(),
+    }).drop_duplicates(['row', 'name'], keep='last')
+    for field in RULE_FIELDS:
+        default = default_coef if field == '系数' else ''
+        matched = pairs[pairs['name'] == field]
+        table[field] = (pd.Series(matched['value'].to_numpy(), index=matched['row'].to_numpy())
+                        .reindex(range(row_count), fill_value=default))
+
+    last_rule = values.str.rsplit(',', n=1).str[-1]
+    table['命名规则'] = last_rule.str.rsplit(':', n=1).str[-1].where(
+        last_rule.str.contains(':', regex=False), '')
+
+    # 与逐行构造 dict 列表时的类型推断一致
+    return pd.DataFrame({col: table[col].tolist() for col in RULE_TABLE_COLUMNS})
+
+
+def _text_token(name: str, value) -> str:
+    if value and not pd.isna(value):
+        return f",{name}:{value}"
+    return ''
+
+
+def _int_token(name: str, value) -> str:
+    if value and not pd.isna(value):
+        try:
+            return f",{name}:{int(float(value))}"
+        except Exception:
+            pass
+    return ''
+
+
+def _encode_column(values: np.ndarray, encode) -> np.ndarray:
+    """逐个唯一值编码后按编码取回；空值编码为 encode(nan)"""
+    if pd.api.types.infer_dtype(values, skipna=True) not in _UNIFORM_TYPES:
+        return np.array([encode(value) for value in values], dtype=object)
+    codes, uniques = pd.factorize(values)
+    encoded = np.array([encode(value) for value in uniques] + [encode(np.nan)], dtype=object)
+    return encoded[codes]
+
+
+def table_to_rules(df: pd.DataFrame) -> Tuple[List[str], List[str]]:
+    """把配置表格转换为 KeywordFuzzyMapping 的键和规则字符串
+
+    空值、空字符串和0的项不写出；系数和告警优先级按 int(float(值)) 写出，无法转换时不写出。
+    """
+    if df.empty:
+        return [], []
+    # 与 iterrows 取到的值相同（同样的类型提升）
+    data = df.to_numpy()
+
+    def column(name):
+        return data[:, df.columns.get_loc(name)]
+
+    rules = np.full(len(df), '', dtype=object)
+    for name, as_int in RULE_ENCODING:
+        token = _int_token if as_int else _text_token
+        rules = rules + _encode_column(column(name), lambda value: token(name, value))
+    keys = _encode_column(column('原列名称'), str) + '_' + _encode_column(column('原列描述'), str)
+    return keys.tolist(), [rule[1:] for rule in rules]
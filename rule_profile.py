@@ -0,0 +1,92 @@
+import json
+from typing import Dict, Iterable, List, Tuple
+
+import pandas as pd
+
+from fuzzy_matcher import FuzzyRule
+
+# 规则状态
+STATUS_INVALID = '规则无效'
+STATUS_DEAD = '未命中'
+STATUS_SHADOWED = '被覆盖'
+STATUS_PARTLY_SHADOWED = '部分被覆盖'
+STATUS_OK = '有效'
+
+REPORT_COLUMNS = ['规则', '源列', '类型', '状态', '命中行数', '写入单元格', '被覆盖单元格', '覆盖比例',
+                  '匹配耗时(秒)', '统计Sheet数', '说明']
+
+
+def load_rule_records(paths: Iterable[str]) -> List[dict]:
+    """从性能统计文件（转换性能.jsonl 或 batch_convert --profile 的输出）中读取规则记录"""
+    records = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                if record.get('type') == 'rule':
+                    records.append(record)
+    return records
+
+
+def aggregate_rule_records(records: Iterable[dict]) -> Dict[str, dict]:
+    """按规则键汇总多个工作簿、多个Sheet的规则记录"""
+    totals: Dict[str, dict] = {}
+    for record in records:
+        total = totals.setdefault(record['rule'], {
+            'hits': 0, 'written': 0, 'overwritten': 0, 'seconds': None, 'sheets': set(),
+        })
+        total['hits'] += record.get('hits') or 0
+        total['written'] += record.get('written') or 0
+        total['overwritten'] += record.get('overwritten') or 0
+        if record.get('seconds') is not None:
+            total['seconds'] = (total['seconds'] or 0.0) + record['seconds']
+        total['sheets'].add((record.get('workbook'), record.get('sheet')))
+    return totals
+
+
+def _rule_status(rule: FuzzyRule, total: dict) -> Tuple[str, str]:
+    if rule.src_col is None:
+        return STATUS_INVALID, "键中没有“源列_关键字”格式的下划线"
+    if rule.regex_error is not None:
+        return STATUS_INVALID, f"正则错误: {rule.regex_error}"
+    if total is None:
+        return STATUS_DEAD, "统计中没有这条规则（源列不存在或未执行）"
+    if total['hits'] == 0:
+        return STATUS_DEAD, ''
+    if total['written'] and total['overwritten'] >= total['written']:
+        return STATUS_SHADOWED, "写入的值全部被后面的规则覆盖"
+    if total['overwritten']:
+        return STATUS_PARTLY_SHADOWED, ''
+    return STATUS_OK, ''
+
+
+def rule_report(mapping_items, records: Iterable[dict]) -> pd.DataFrame:
+    """按配置中的规则顺序生成命中报告，每条 KeywordFuzzyMapping 规则一行
+
+    未命中（一行都没匹配）和被覆盖（写入的值全部被后面的规则覆盖）的规则在所统计的数据上不起作用，可考虑清理。
+    """
+    totals = aggregate_rule_records(records)
+    rows = []
+    for index, (key, value) in enumerate(mapping_items):
+        rule = FuzzyRule(index, key, value)
+        total = totals.get(key)
+        status, note = _rule_status(rule, total)
+        written = total['written'] if total else 0
+        overwritten = total['overwritten'] if total else 0
+        rows.append({
+            '规则': key,
+            '源列': rule.src_col or '',
+            '类型': '' if rule.src_col is None else ('字面量' if rule.literal is not None else '正则'),
+            '状态': status,
+            '命中行数': total['hits'] if total else 0,
+            '写入单元格': written,
+            '被覆盖单元格': overwritten,
+            '覆盖比例': round(overwritten / written, 4) if written else None,
+            '匹配耗时(秒)': round(total['seconds'], 6) if total and total['seconds'] is not None else None,
+            '统计Sheet数': len(total['sheets']) if total else 0,
+            '说明': note,
+        })
+    return pd.DataFrame(rows, columns=REPORT_COLUMNS)
@@ -0,0 +1,114 @@
+import json
+import logging
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from csv_loader import read_csv_auto
+
+# 扫描文件夹时从CSV中提取的列（描述以外）
+SCAN_VALUE_COLUMNS = ['量测类型', '系数', '告警优先级', '命名规则']
+SCAN_COLUMNS = ['描述'] + SCAN_VALUE_COLUMNS
+
+INDEX_VERSION = 2
+
+logger = logging.getLogger(__name__)
+
+
+def _json_value(value):
+    """转换为可写入JSON的值；空值记为''（与扫描时 safe_get 的处理一致）"""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return ''
+    return value
+
+
+def extract_description_rows(file_df: pd.DataFrame) -> List[list]:
+    """一次遍历取出每个描述第一次出现的行，返回 [[描述, {列: 值}]]，按描述首次出现的顺序
+
+    空描述跳过；文件中没有的列取值为''。
+    """
+    if '描述' not in file_df.columns:
+        return []
+    descs = file_df['描述']
+    positions = np.flatnonzero((~descs.duplicated() & descs.notna()).to_numpy())
+    # 逐列取值，保留各列自身的类型：整行取值会按行内各列的公共类型提升（只读取部分列时整数可能变成浮点数）
+    value_columns = {col: file_df[col].to_numpy()[positions] for col in SCAN_VALUE_COLUMNS if col in file_df.columns}
+    rows = []
+    for i, desc in enumerate(descs.iloc[positions]):
+        values = {col: _json_value(value_columns[col][i]) if col in value_columns else ''
+                  for col in SCAN_VALUE_COLUMNS}
+        rows.append([_json_value(desc), values])
+    return rows
+
+
+def scan_csv(file_path: str, prune_columns: bool = False):
+    """读取一个CSV并提取描述行，返回 (描述行, 编码)；prune_columns 时只读取扫描需要的列
+
+    不写界面日志，可以在线程池中调用。
+    """
+    usecols = (lambda col: col in SCAN_COLUMNS) if prune_columns else None
+    file_df, encoding = read_csv_auto(file_path, usecols=usecols)
+    return extract_description_rows(file_df), encoding
+
+
+def first_rows(df: pd.DataFrame, col: str) -> Dict:
+    """列值 → 该值第一次出现的整行（dict），代替逐个值过滤整表"""
+    firsts = df.dropna(subset=[col]).drop_duplicates(subset=[col])
+    return dict(zip(firsts[col], firsts.to_dict('records')))
+
+
+class ScanIndex:
+    """扫描索引：按 路径+修改时间+大小 缓存每个CSV提取出的描述行，文件未变化时不再重新读取"""
+
+    def __init__(self, index_path: str):
+        self.index_path = index_path
+        self.entries: Dict[str, dict] = {}
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == INDEX_VERSION:
+                self.entries = data.get('files', {})
+        except Exception as e:
+            logger.warning(f"扫描索引读取失败，将重新扫描全部文件: {str(e)}")
+            self.entries = {}
+
+    @staticmethod
+    def key(file_path: str) -> str:
+        return os.path.normcase(os.path.abspath(file_path))
+
+    def lookup(self, file_path: str, stat: os.stat_result) -> Optional[List[list]]:
+        """文件未变化时返回缓存的描述行，否则返回None"""
+        entry = self.entries.get(self.key(file_path))
+        if entry and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+            return entry['rows']
+        return None
+
+    def update(self, file_path: str, stat: os.stat_result, rows: List[list]):
+        self.entries[self.key(file_path)] = {
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'rows': rows,
+        }
+
+    def prune(self, folder_path: str, seen_paths):
+        """删除该文件夹下已不存在（本次未扫描到）的文件记录"""
+        prefix = self.key(folder_path).rstrip(os.sep) + os.sep
+        seen = {self.key(path) for path in seen_paths}
+        for key in [key for key in self.entries if key.startswith(prefix) and key not in seen]:
+            del self.entries[key]
+
+    def save(self):
+        """先写临时文件再替换，避免中途退出留下损坏的索引"""
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': INDEX_VERSION, 'files': self.entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
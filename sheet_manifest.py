@@ -0,0 +1,198 @@
+import hashlib
+import json
+import logging
+import os
+import posixpath
+import re
+import zipfile
+from typing import Dict, List, Optional, Tuple
+from xml.etree import ElementTree
+
+import pandas as pd
+
+from conversion_cache import options_fingerprint
+
+# 清单格式版本：指纹算法或清单结构变化时加1，旧清单中的Sheet全部重新转换
+MANIFEST_VERSION = 1
+MANIFEST_NAME = '转换清单.json'
+
+_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+# 共享字符串单元格 <c ... t="s"><v>序号</v></c>，以及用于核对数量的 t="s"
+_SHARED_CELL = re.compile(rb'<(?:\w+:)?c\b[^>]*?\bt=["\']s["\'][^>]*>\s*<(?:\w+:)?v>\s*(\d+)\s*</')
+_SHARED_TYPE = re.compile(rb'<(?:\w+:)?c\b[^>]*?\bt=["\']s["\']')
+_DATE1904 = re.compile(rb'\bdate1904=["\'](?:1|true)["\']')
+
+logger = logging.getLogger(__name__)
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+def _sheet_parts(zf: zipfile.ZipFile) -> Dict[str, str]:
+    """Sheet名 → 工作表XML在压缩包中的路径（只解析 workbook.xml 和它的关系文件）"""
+    targets = {}
+    rels = ElementTree.fromstring(zf.read('xl/_rels/workbook.xml.rels'))
+    for rel in rels:
+        target = rel.get('Target', '')
+        targets[rel.get('Id')] = target.lstrip('/') if target.startswith('/') else posixpath.normpath(
+            posixpath.join('xl', target))
+    parts = {}
+    workbook = ElementTree.fromstring(zf.read('xl/workbook.xml'))
+    for element in workbook.iter():
+        if _local(element.tag) == 'sheet':
+            part = targets.get(element.get(f'{_REL_NS}id'))
+            if part is not None:
+                parts[element.get('name')] = part
+    return parts
+
+
+def _shared_strings(zf: zipfile.ZipFile) -> List[str]:
+    """共享字符串表中每一项的文本（只取文本，格式不影响转换结果）"""
+    try:
+        f = zf.open('xl/sharedStrings.xml')
+    except KeyError:
+        return []
+    strings = []
+    with f:
+        for _, element in ElementTree.iterparse(f):
+            if _local(element.tag) == 'si':
+                strings.append(''.join(element.itertext()))
+                element.clear()
+    return strings
+
+
+def sheet_fingerprints(excel_file: str, sheet_names: List[str]) -> Dict[str, str]:
+    """各Sheet原始XML的指纹，不解析单元格；不是xlsx压缩包或找不到Sheet时不返回该项
+
+    指纹包含工作表XML本身、其中共享字符串单元格引用的字符串、样式表（决定哪些数字按日期读取）
+    和 1904 日期系统标记，只有这些都未变化时Sheet的读取结果才不变。
+    """
+    try:
+        zf = zipfile.ZipFile(excel_file)
+    except (zipfile.BadZipFile, OSError):
+        return {}
+    fingerprints = {}
+    with zf:
+        try:
+            parts = _sheet_parts(zf)
+            names = set(zf.namelist())
+            common = hashlib.sha256()
+            common.update(b'date1904' if _DATE1904.search(zf.read('xl/workbook.xml')) else b'')
+            if 'xl/styles.xml' in names:
+                common.update(hashlib.sha256(zf.read('xl/styles.xml')).digest())
+            strings = None
+            for sheet_name in sheet_names:
+                part = parts.get(sheet_name)
+                if part is None or part not in names:
+                    continue
+                data = zf.read(part)
+                h = common.copy()
+                h.update(hashlib.sha256(data).digest())
+                indices = _SHARED_CELL.findall(data)
+                if indices:
+                    if strings is None:
+                        strings = _shared_strings(zf)
+                    if len(indices) != len(_SHARED_TYPE.findall(data)):
+                        # 有无法识别的共享字符串单元格，退回使用整个共享字符串表
+                        indices = range(len(strings))
+                    for index in sorted(set(int(i) for i in indices)):
+                        value = strings[index] if index < len(strings) else ''
+                        h.update(f"{index}\0{value}\0".encode('utf-8'))
+                fingerprints[sheet_name] = h.hexdigest()
+        except (KeyError, ElementTree.ParseError, zipfile.BadZipFile) as e:
+            logger.warning(f"无法计算Sheet指纹，全部Sheet重新转换: {str(e)}")
+            return {}
+    return fingerprints
+
+
+def sheet_config_fingerprint(config, sheet_name: str, output_name: str) -> list:
+    """影响一个Sheet转换结果的配置：输出文件名、该Sheet的列映射和输出列、DataType 和 KeywordFuzzyMapping"""
+    sections = [f'{sheet_name}_ColumnMapping', f'{sheet_name}_OutputColumns', 'DataType', 'KeywordFuzzyMapping']
+    return [output_name] + [[section, list(config[section].items())] for section in sections if section in config]
+
+
+def sheet_keys(excel_file: str, config, tasks: List[Tuple[str, str]], clean_options: dict) -> Dict[str, str]:
+    """各Sheet的增量转换键：Sheet指纹、相关配置段、清洗选项和 pandas 版本都不变时键不变"""
+    fingerprints = sheet_fingerprints(excel_file, [sheet_name for sheet_name, _ in tasks])
+    options = options_fingerprint(clean_options)
+    keys = {}
+    for sheet_name, output_name in tasks:
+        if sheet_name not in fingerprints:
+            continue
+        data = json.dumps({
+            'version': MANIFEST_VERSION,
+            'pandas': pd.__version__,
+            'sheet': fingerprints[sheet_name],
+            'config': sheet_config_fingerprint(config, sheet_name, output_name),
+            'options': options,
+        }, ensure_ascii=False, sort_keys=True, default=str)
+        keys[sheet_name] = hashlib.sha256(data.encode('utf-8')).hexdigest()
+    return keys
+
+
+class SheetManifest:
+    """输出目录中的转换清单：记录每个Sheet上次转换时的键和输出CSV的大小、修改时间
+
+    键相同且输出CSV未被改动时该Sheet不再转换，保留现有CSV。
+    """
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self.sheets: Dict[str, dict] = {}
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == MANIFEST_VERSION:
+                self.sheets = data.get('sheets', {})
+        except Exception as e:
+            logger.warning(f"转换清单读取失败，全部Sheet重新转换: {str(e)}")
+            self.sheets = {}
+
+    def lookup(self, sheet_name: str, key: Optional[str], output_path: str) -> Optional[dict]:
+        """Sheet未变化且输出CSV未被改动时返回清单记录，否则返回None"""
+        entry = self.sheets.get(sheet_name)
+        if key is None or entry is None or entry['key'] != key:
+            return None
+        try:
+            stat = os.stat(output_path)
+        except OSError:
+            return None
+        if entry['output'] != os.path.relpath(output_path, self.output_dir) or \
+                stat.st_size != entry['size'] or stat.st_mtime_ns != entry['mtime_ns']:
+            return None
+        return entry
+
+    def update(self, key: Optional[str], result: Dict):
+        """记录一个Sheet的转换结果；没有键（无法计算指纹）时删除原有记录"""
+        if key is None:
+            self.sheets.pop(result['sheet'], None)
+            return
+        stat = os.stat(result['output'])
+        self.sheets[result['sheet']] = {
+            'key': key,
+            'output': os.path.relpath(result['output'], self.output_dir),
+            'rows': result['rows'],
+            'warnings': list(result['warnings']),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+        }
+
+    def save(self, sheet_names):
+        """只保留本次转换涉及的Sheet；先写临时文件再替换"""
+        self.sheets = {name: entry for name, entry in self.sheets.items() if name in set(sheet_names)}
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': MANIFEST_VERSION, 'sheets': self.sheets}, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"转换清单写入失败: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
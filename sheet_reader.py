@@ -0,0 +1,127 @@
+import logging
+from typing import Iterator, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+from pandas.io.parsers import TextParser
+
+DEFAULT_CHUNK_SIZE = 50000
+
+logger = logging.getLogger(__name__)
+
+
+def _convert_cell(cell):
+    """单元格取值转换，与 pandas openpyxl 读取器保持一致"""
+    if cell.value is None:
+        return ""
+    elif cell.data_type == TYPE_ERROR:
+        return np.nan
+    elif cell.data_type == TYPE_NUMERIC:
+        val = int(cell.value)
+        if val == cell.value:
+            return val
+        return float(cell.value)
+    return cell.value
+
+
+def _convert_row(row) -> list:
+    converted = [_convert_cell(cell) for cell in row]
+    while converted and converted[-1] == "":
+        # 去掉行尾空单元格
+        converted.pop()
+    return converted
+
+
+def _parse_rows(header: list, rows: List[list], start: int) -> pd.DataFrame:
+    """用 pandas 的解析器把一批行转换为字符串 DataFrame（列名、空值处理与 read_excel 相同）"""
+    width = len(header)
+    rows = [row + [""] * (width - len(row)) if len(row) < width else row for row in rows]
+    parser = TextParser([header] + rows, header=0, dtype=str, skip_blank_lines=False)
+    chunk = parser.read()
+    parser.close()
+    chunk.index = pd.RangeIndex(start, start + len(chunk))
+    return chunk
+
+
+def iter_sheet_chunks(excel_file: Union[str, Workbook], sheet_name: str,
+                      chunk_size: int = DEFAULT_CHUNK_SIZE, min_width: int = 0) -> Iterator[pd.DataFrame]:
+    """以只读模式逐行读取工作表，按 chunk_size 行一块产出字符串 DataFrame
+
+    第一行作为表头，各块的索引连续编号（与整表读取时的行号一致）。
+    超出表头宽度的单元格与 read_excel 一样保留为 Unnamed: N 列，从出现这类单元格的块开始增加这些列
+    （之前已产出的块没有这些列，整表读取时这些行在这些列上为空值）；已知整表宽度时用 min_width 让每块都包含这些列。
+    峰值内存只与块大小有关，与工作表总行数无关。
+    """
+    if chunk_size <= 0:
+        raise ValueError(f"chunk_size 必须为正整数: {chunk_size}")
+
+    own_workbook = not isinstance(excel_file, Workbook)
+    workbook = load_workbook(excel_file, read_only=True, data_only=True, keep_links=False) if own_workbook else excel_file
+    try:
+        sheet = workbook[sheet_name]
+        if getattr(workbook, 'read_only', False):
+            sheet.reset_dimensions()
+
+        rows_iter = sheet.rows
+        header = None
+        for row in rows_iter:
+            header = _convert_row(row)
+            break
+        if header is None:
+            yield pd.DataFrame()
+            return
+
+        header = header + [""] * (min_width - len(header))
+        width = len(header)
+        start = 0
+        pending_empty = 0  # 暂存的空行，后面出现有数据的行时才输出（与 read_excel 去掉末尾空行一致）
+        rows: List[list] = []
+        for row in rows_iter:
+            converted = _convert_row(row)
+            if not converted:
+                pending_empty += 1
+                continue
+            if len(converted) > width:
+                # 表头补空列名，解析时命名为 Unnamed: N；本块中较短的行在解析时补齐
+                logger.info(f"Sheet '{sheet_name}' 第 {start + len(rows) + pending_empty + 2} 行超出表头宽度，"
+                            f"增加 {len(converted) - width} 列")
+                header = header + [""] * (len(converted) - width)
+                width = len(converted)
+            while pending_empty:
+                rows.append([])
+                pending_empty -= 1
+                if len(rows) >= chunk_size:
+                    yield _parse_rows(header, rows, start)
+                    start += len(rows)
+                    rows = []
+            rows.append(converted)
+            if len(rows) >= chunk_size:
+                yield _parse_rows(header, rows, start)
+                start += len(rows)
+                rows = []
+
+        if rows or start == 0:
+            yield _parse_rows(header, rows, start)
+    finally:
+        if own_workbook:
+            workbook.close()
+
+
+def estimate_sheet_rows(workbook: Workbook, sheet_name: str) -> Optional[int]:
+    """根据工作表声明的尺寸估算数据行数（不含表头），仅用于显示进度，未知时返回None"""
+    try:
+        max_row = workbook[sheet_name].max_row
+    except Exception:
+        return None
+    return max_row - 1 if max_row else None
+
+
+def read_sheet(excel_file: Union[str, Workbook], sheet_name: str,
+               chunk_size: int = DEFAULT_CHUNK_SIZE) -> pd.DataFrame:
+    """流式读取整张工作表并拼接为一个 DataFrame"""
+    chunks = list(iter_sheet_chunks(excel_file, sheet_name, chunk_size))
+    if len(chunks) == 1:
+        return chunks[0]
+    return pd.concat(chunks)
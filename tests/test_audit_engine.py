@@ -0,0 +1,313 @@
+"""审核规则引擎与原逐行审核（excel_audit_tool.py 中的 audit_ana_csv / audit_dig_csv）的一致性测试"""
+import random
+import re
+
+import pandas as pd
+import pytest
+
+import audit_engine
+from audit_engine import (AUDIT_RULES, SCOPE_GROUP, AuditRule, audit_columns, audit_csv, audit_dataframe,
+                          encode_key_columns, not_empty_rule, read_audit_csv, register_rule)
+
+
+def baseline_audit_ana(file_path, log_message):
+    """原 ExcelAuditTool.audit_ana_csv，self.log_message 改为参数"""
+    try:
+        df = pd.read_csv(file_path, encoding='utf-8')
+    except Exception:
+        df = pd.read_csv(file_path, encoding='gbk')
+    has_error = False
+    group_cols = ['设备类型', '同类型设备号']
+    for col in group_cols:
+        df[col] = df[col].fillna('').astype(str).str.strip()
+    for group_keys, group in df.groupby(group_cols, dropna=False):
+        dev_type = group_keys[0] if group_keys[0] else '(空)'
+        dev_num = group_keys[1] if group_keys[1] else '(空)'
+        dup = group.duplicated(subset=['量测类型'], keep=False)
+        if dup.any():
+            has_error = True
+            empty_type = (group['量测类型'].astype(str).str.strip() == '') | (group['量测类型'].astype(str).str.strip() == 'nan')
+            dup_empty = dup & empty_type
+            if dup_empty.any():
+                idxs = group[dup_empty].index + 2
+                idxs_str = ','.join(map(str, sorted(set(idxs))))
+                log_message(f"ana.csv: 设备类型={dev_type}, 同类型设备号={dev_num} 组内量测类型为空，行号: {idxs_str}", "ERROR")
+            for t in group.loc[dup & ~empty_type, '量测类型'].unique():
+                idxs = group[(group['量测类型'] == t) & dup].index + 2
+                idxs_str = ','.join(map(str, sorted(set(idxs))))
+                log_message(f"ana.csv: 设备类型={dev_type}, 同类型设备号={dev_num} 组内量测类型“{t}”重复，行号: {idxs_str}", "ERROR")
+        dup_desc = group['描述'][group.duplicated(subset=['描述'], keep=False)]
+        if not dup_desc.empty:
+            has_error = True
+            for d in dup_desc.unique():
+                idxs = group[group['描述'] == d].index + 2
+                idxs_str = ','.join(map(str, sorted(set(idxs))))
+                log_message(f"ana.csv: 设备类型={dev_type}, 同类型设备号={dev_num} 组内描述“{d}”重复，行号: {idxs_str}", "ERROR")
+    if '点号' in df.columns:
+        dup = df.duplicated(subset=['点号'], keep=False)
+        if dup.any():
+            has_error = True
+            idxs = df[dup].index + 2
+            idxs_str = ','.join(map(str, sorted(set(idxs))))
+            log_message(f"ana.csv: 点号重复，行号: {idxs_str}", "ERROR")
+    if '是否控制' in df.columns:
+        invalid = ~df['是否控制'].astype(str).str.strip().isin(['0', '1'])
+        if invalid.any():
+            has_error = True
+            idxs = df[invalid].index + 2
+            idxs_str = ','.join(map(str, sorted(set(idxs))))
+            log_message(f"dig.csv: 是否控制只能为0或1，行号: {idxs_str}", "ERROR")
+    if '命名规则' in df.columns:
+        def is_not_zero(val):
+            if pd.isna(val):
+                return True
+            try:
+                return float(val) != 0
+            except Exception:
+                return str(val).strip() != '0'
+        wrong = df['命名规则'].apply(is_not_zero)
+        if wrong.any():
+            has_error = True
+            for idx in df[wrong].index:
+                log_message(f"ana.csv: 命名规则不为0，行号: {idx+2}", "ERROR")
+    if '系数' in df.columns:
+        empty = df['系数'].isna() | (df['系数'].astype(str).str.strip() == '')
+        if empty.any():
+            has_error = True
+            for idx in df[empty].index:
+                log_message(f"ana.csv: 系数为空，行号: {idx+2}", "ERROR")
+    for idx, row in df.iterrows():
+        dev, num = str(row.get('设备类型', '')).strip(), str(row.get('同类型设备号', '')).strip()
+        if (dev and not num) or (not dev and num):
+            has_error = True
+            log_message(f"ana.csv: 设备类型、同类型设备号必须同时有值或同时为空，行号: {idx+2}", "ERROR")
+    if not has_error:
+        log_message("ana.csv: 审核通过，无错误。", "INFO")
+
+
+def baseline_audit_dig(file_path, log_message):
+    """原 ExcelAuditTool.audit_dig_csv，self.log_message 改为参数"""
+    try:
+        df = pd.read_csv(file_path, encoding='utf-8')
+    except Exception:
+        df = pd.read_csv(file_path, encoding='gbk')
+    has_error = False
+    group_cols = ['设备类型', '同类型设备号']
+    for col in group_cols:
+        df[col] = df[col].fillna('').astype(str).str.strip()
+    for group_keys, group in df.groupby(group_cols, dropna=False):
+        if '分量ID' in group.columns:
+            sub = group[group['分量ID'].astype(str).str.strip() == '1']
+        else:
+            sub = group
+        dup_types = sub['量测类型'][sub.duplicated(subset=['量测类型'], keep=False)]
+        if not dup_types.empty:
+            has_error = True
+            for t in dup_types.unique():
+                idxs = sub[sub['量测类型'] == t].index + 2
+                idxs_str = ','.join(map(str, sorted(set(idxs))))
+                log_message(f"dig.csv: 设备类型={group_keys[0]}, 同类型设备号={group_keys[1]} 组内量测类型“{t}”重复，行号: {idxs_str}", "ERROR")
+        dup_desc = sub['描述'][sub.duplicated(subset=['描述'], keep=False)]
+        if not dup_desc.empty:
+            has_error = True
+            dev_type = group_keys[0] if group_keys[0] else '(空)'
+            dev_num = group_keys[1] if group_keys[1] else '(空)'
+            for d in dup_desc.unique():
+                idxs = sub[sub['描述'] == d].index + 2
+                idxs_str = ','.join(map(str, idxs))
+                log_message(f"dig.csv: 设备类型={dev_type}, 同类型设备号={dev_num} 分量ID=1 组内 描述“{d}”重复，行号: {idxs_str}", "ERROR")
+
+    if '遥信点号' in df.columns:
+        dup = df.duplicated(subset=['遥信点号'], keep=False)
+        if dup.any():
+            has_error = True
+            dup_vals = df.loc[dup, '遥信点号']
+            for val in dup_vals.unique():
+                idxs = df[df['遥信点号'] == val].index + 2
+                idxs_str = ','.join(map(str, sorted(set(idxs))))
+                log_message(f"dig.csv: 遥信点号“{val}”重复，行号: {idxs_str}", "ERROR")
+    if '命名规则' in df.columns:
+        def is_not_zero(val):
+            if pd.isna(val):
+                return True
+            try:
+                return float(val) != 0
+            except Exception:
+                return str(val).strip() != '0'
+        wrong = df['命名规则'].apply(is_not_zero)
+        if wrong.any():
+            has_error = True
+            for idx in df[wrong].index:
+                log_message(f"dig.csv: 命名规则不为0，行号: {idx+2}", "ERROR")
+    if '告警优先级' in df.columns:
+        empty = df['告警优先级'].isna() | (df['告警优先级'].astype(str).str.strip() == '')
+        if empty.any():
+            has_error = True
+            for idx in df[empty].index:
+                log_message(f"dig.csv: 告警优先级为空，行号: {idx+2}", "ERROR")
+    for idx, row in df.iterrows():
+        dev, num = str(row.get('设备类型', '')).strip(), str(row.get('同类型设备号', '')).strip()
+        if (dev and not num) or (not dev and num):
+            has_error = True
+            log_message(f"dig.csv: 设备类型、同类型设备号必须同时有值或同时为空，行号: {idx+2}", "ERROR")
+    if '是否控制' in df.columns:
+        invalid = ~df['是否控制'].astype(str).str.strip().isin(['0', '1'])
+        if invalid.any():
+            has_error = True
+            for idx in df[invalid].index:
+                log_message(f"dig.csv: 是否控制只能为0或1，行号: {idx+2}", "ERROR")
+    if '分量ID' in df.columns:
+        for group_keys, group in df.groupby(group_cols, dropna=False):
+            group = group.sort_index()
+            id1_row = group[group['分量ID'] == 1]
+            id2_row = group[group['分量ID'] == 2]
+            if not id1_row.empty and not id2_row.empty:
+                id1 = id1_row.iloc[0]
+                id2 = id2_row.iloc[0]
+                for col in ['量测类型', '是否控制', '控制点号']:
+                    if col in id1 and col in id2:
+                        if str(id1[col]).strip() != str(id2[col]).strip():
+                            has_error = True
+                            row_id1 = id1.name + 2
+                            row_id2 = id2.name + 2
+                            log_message(
+                                f"dig.csv: 设备类型={group_keys[0]}, 同类型设备号={group_keys[1]} 分量ID=2的{col}与分量ID=1不一致，行号: {row_id1},{row_id2}",
+                                "ERROR"
+                            )
+    if '分量ID' in df.columns and '是否控制' in df.columns and '控制点号' in df.columns:
+        sub = df[(df['分量ID'] == 1) & (df['是否控制'].astype(str).str.strip() == '1')]
+        dup = sub.duplicated(subset=['控制点号'], keep=False)
+        if dup.any():
+            has_error = True
+            for idx in sub[dup].index:
+                log_message(f"dig.csv: 分量ID=1且是否控制为1的控制点号重复，行号: {idx+2}", "ERROR")
+    if not has_error:
+        log_message("dig.csv: 审核通过，无错误。", "INFO")
+
+
+BASELINES = {'ana': baseline_audit_ana, 'dig': baseline_audit_dig}
+
+# 原实现逐行输出的规则；新实现每条规则只输出一条，行号合并
+PER_ROW = re.compile(r'^(.*(?:命名规则不为0|系数为空|告警优先级为空|必须同时有值或同时为空|只能为0或1|控制点号重复))，行号: (\d+)$')
+
+
+def baseline_messages(kind, file_path):
+    """原实现的日志，按新实现的格式合并逐行日志（ana.csv 中是否控制的提示原来误写为 dig.csv）"""
+    merged = []
+    prefix = None
+
+    def log_message(message, level="INFO"):
+        nonlocal prefix
+        per_row = PER_ROW.match(message)
+        if per_row and per_row.group(1) == prefix:
+            merged[-1] = (level, f"{merged[-1][1]},{per_row.group(2)}")
+            return
+        prefix = per_row.group(1) if per_row else None
+        merged.append((level, message))
+
+    BASELINES[kind](file_path, log_message)
+    if kind == 'ana':
+        merged = [(level, message.replace('dig.csv: 是否控制', 'ana.csv: 是否控制')) for level, message in merged]
+    return merged
+
+
+def random_audit_csv(path, kind, seed):
+    """随机生成待审核CSV：取值包含空值、前后空格、数字与字符串混用，分组和重复都很密集"""
+    rng = random.Random(seed)
+    choice = rng.choice
+    rows = []
+    for i in range(choice([0, 1, 5, 30, 200])):
+        row = {
+            '描述': choice(['a', 'b', 'c', '', None, f'd{i % 7}']),
+            '量测类型': choice(['1', '2', '', None, 'x', 3]),
+            '设备类型': choice(['T1', 'T2', '', None, ' T1 ']),
+            '同类型设备号': choice(['1', '2', '', None]),
+            '命名规则': choice(['0', 0, '0.0', 'abc', ' 0 ', None, '1', '', True]),
+            '是否控制': choice(['0', '1', 1, '2', None]),
+            '控制点号': choice(['1', '2', None]),
+            '备注': choice(['x', None, ' 1 ']),  # 审核不读取的列
+        }
+        if kind == 'ana':
+            row.update({'点号': choice([1, 2, 3, None, i]), '系数': choice(['1', '', None, ' '])})
+        else:
+            row.update({'遥信点号': choice([1, 2, i, None]), '告警优先级': choice(['1', '', None]),
+                        '分量ID': choice([1, 2, '1', None])})
+        rows.append(row)
+    df = pd.DataFrame(rows, columns=None if rows else ['描述', '量测类型', '设备类型', '同类型设备号'])
+    # 可选列随机缺失
+    optional = [col for col in df.columns if col not in ('描述', '量测类型', '设备类型', '同类型设备号', '备注')]
+    df = df.drop(columns=[col for col in optional if rng.random() < 0.15])
+    df.to_csv(path, index=False, encoding=choice(['utf-8', 'gbk']))
+
+
+@pytest.mark.parametrize('kind', ['ana', 'dig'])
+@pytest.mark.parametrize('seed', range(40))
+def test_engine_matches_row_wise_audit(tmp_path, kind, seed):
+    path = str(tmp_path / f'{kind}.csv')
+    random_audit_csv(path, kind, seed)
+    assert list(audit_csv(path).messages()) == baseline_messages(kind, path)
+
+
+@pytest.mark.parametrize('kind', ['ana', 'dig'])
+@pytest.mark.parametrize('seed', range(10))
+def test_arrow_strings_audit_matches(tmp_path, kind, seed):
+    pytest.importorskip('pyarrow')
+    path = str(tmp_path / f'{kind}.csv')
+    random_audit_csv(path, kind, seed)
+    assert list(audit_csv(path, arrow_strings=True).messages()) == list(audit_csv(path).messages())
+
+
+@pytest.mark.parametrize('kind', ['ana', 'dig'])
+@pytest.mark.parametrize('seed', range(20))
+def test_pruned_audit_matches(tmp_path, kind, seed):
+    path = str(tmp_path / f'{kind}.csv')
+    random_audit_csv(path, kind, seed)
+    assert '备注' not in audit_columns(kind)
+    assert audit_csv(path, prune_columns=True).items == audit_csv(path).items
+
+
+@pytest.mark.parametrize('kind', ['ana', 'dig'])
+@pytest.mark.parametrize('seed', range(20))
+def test_categorical_key_columns_match(tmp_path, kind, seed, monkeypatch):
+    path = str(tmp_path / f'{kind}.csv')
+    random_audit_csv(path, kind, seed)
+    expected = audit_csv(path).items
+    monkeypatch.setattr(audit_engine, 'CATEGORY_COLS', [])
+    assert audit_csv(path).items == expected
+
+
+def test_only_uniform_key_columns_become_categorical():
+    df = pd.DataFrame({'量测类型': ['1', None, '2'], '是否控制': ['1', 1, None]}, dtype=object)
+    encode_key_columns(df)
+    assert isinstance(df['量测类型'].dtype, pd.CategoricalDtype)
+    # 1 和 '1' 混用时不转换，否则会被视为同一个值
+    assert df['是否控制'].dtype == object
+
+
+def test_registered_rules_run_in_order(tmp_path, monkeypatch):
+    monkeypatch.setitem(AUDIT_RULES, 'ana', list(AUDIT_RULES['ana']))
+    scans = []
+    real_group_duplicates = audit_engine.group_duplicates
+
+    def group_duplicates(*args):
+        scans.append(args)
+        return real_group_duplicates(*args)
+
+    def check_desc_rows(ctx):
+        for gid, first, run in ctx.duplicates('描述', SCOPE_GROUP):
+            yield gid, first, f"{ctx.file_name}: 描述重复的行", ctx.value_rows('描述', first, run)
+
+    monkeypatch.setattr(audit_engine, 'group_duplicates', group_duplicates)
+    register_rule('ana', not_empty_rule('ana_remark_empty', '备注'))
+    register_rule('ana', AuditRule('ana_desc_rows', ['描述'], check_desc_rows, SCOPE_GROUP,
+                                   duplicates=('描述',)), position=0)
+    path = str(tmp_path / 'ana.csv')
+    pd.DataFrame({'描述': ['a', 'a', 'b'], '量测类型': ['1', '2', '3'], '设备类型': ['T', 'T', 'T'],
+                  '同类型设备号': ['1', '1', '1'], '备注': ['x', None, 'y']}).to_csv(path, index=False)
+    findings = audit_csv(path)
+    assert [(item['rule'], item['rows']) for item in findings.items] == [
+        ('ana_desc_rows', [2, 3]), ('ana_desc_duplicate', [2, 3]), ('ana_remark_empty', [3])]
+    # 两条规则共用同一次 描述 重复扫描
+    assert len(scans) == 2  # 量测类型、描述 各一次
+    assert 'ana_remark_empty' not in [item['rule'] for item in
+                                      audit_dataframe(read_audit_csv(path).drop(columns=['备注']), 'ana').items]
@@ -0,0 +1,68 @@
+"""批量转换命令行：工作簿查找、输出目录和退出码"""
+import csv
+import os
+
+from openpyxl import Workbook
+
+from batch_convert import find_workbooks, get_output_dir, main, output_conflicts
+
+CONFIG_TEXT = """[SheetMapping]
+data = out.csv
+
+[data_OutputColumns]
+columns = a,b
+"""
+
+
+def write_workbook(path, rows):
+    workbook = Workbook()
+    workbook.active.title = 'data'
+    for row in rows:
+        workbook.active.append(row)
+    workbook.save(path)
+
+
+def write_config(tmp_path):
+    path = tmp_path / 'config.ini'
+    path.write_text(CONFIG_TEXT, encoding='utf-8')
+    return str(path)
+
+
+def test_same_name_in_subfolders_gets_separate_outputs(tmp_path):
+    for folder in ('x', 'y'):
+        (tmp_path / 'in' / folder).mkdir(parents=True)
+        write_workbook(tmp_path / 'in' / folder / '报表.xlsx', [['a']])
+    (tmp_path / 'in' / 'x' / '~$报表.xlsx').write_bytes(b'')
+    workbooks = find_workbooks([str(tmp_path / 'in')], recursive=True)
+    assert [os.path.relpath(path, tmp_path) for path, _ in workbooks] == \
+        [os.path.join('in', 'x', '报表.xlsx'), os.path.join('in', 'y', '报表.xlsx')]
+    tasks = [(path, get_output_dir(path, str(tmp_path / 'out'), root)) for path, root in workbooks]
+    assert [os.path.relpath(output_dir, tmp_path) for _, output_dir in tasks] == \
+        [os.path.join('out', 'x', '报表'), os.path.join('out', 'y', '报表')]
+    assert output_conflicts(tasks) == {}
+
+
+def test_output_conflicts():
+    tasks = [('d/报表.xlsx', 'd/报表'), ('d/报表.xlsm', 'd/报表'), ('d/其他.xlsx', 'd/其他')]
+    assert output_conflicts(tasks) == {os.path.normcase(os.path.abspath('d/报表')): ['d/报表.xlsx', 'd/报表.xlsm']}
+
+
+def test_conflicting_outputs_exit_with_2(tmp_path):
+    write_workbook(tmp_path / '报表.xlsx', [['a', 'b'], ['1', '2']])
+    write_workbook(tmp_path / '报表.xlsm', [['a', 'b'], ['3', '4']])
+    assert main([str(tmp_path), '-c', write_config(tmp_path), '-j', '1']) == 2
+    assert not os.path.exists(tmp_path / '报表')
+
+
+def test_batch_conversion_writes_outputs_and_summary(tmp_path):
+    (tmp_path / 'in').mkdir()
+    write_workbook(tmp_path / 'in' / 'w1.xlsx', [['a', 'b'], [' 1 ', None]])
+    write_workbook(tmp_path / 'in' / 'w2.xlsx', [['b', 'a'], ['2', '3']])
+    (tmp_path / 'in' / 'bad.xlsx').write_bytes(b'not a workbook')
+    output_root = tmp_path / 'out'
+    assert main([str(tmp_path / 'in'), '-c', write_config(tmp_path), '-o', str(output_root), '-j', '2']) == 1
+    assert (output_root / 'w1' / 'out.csv').read_text(encoding='utf-8-sig') == 'a,b\n1,NA\n'
+    assert (output_root / 'w2' / 'out.csv').read_text(encoding='utf-8-sig') == 'a,b\n3,2\n'
+    with open(output_root / 'batch_summary.csv', encoding='utf-8-sig') as f:
+        statuses = {os.path.basename(row['file']): row['status'] for row in csv.DictReader(f)}
+    assert statuses == {'bad.xlsx': 'failed', 'w1.xlsx': 'ok', 'w2.xlsx': 'ok'}
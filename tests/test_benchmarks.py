@@ -0,0 +1,38 @@
+"""基准测试：合成数据可复现，全部场景能在小数据上跑通"""
+import json
+import os
+import sys
+
+import pandas as pd
+
+BENCH_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks')
+sys.path.insert(0, BENCH_DIR)
+
+import run_benchmarks  # noqa: E402
+import synthetic  # noqa: E402
+
+
+def test_synthetic_data_is_deterministic(tmp_path):
+    for name, seed in (('a', 1), ('b', 1), ('c', 2)):
+        synthetic.generate_workbook(str(tmp_path / f'{name}.xlsx'), 40, seed)
+        synthetic.generate_config(str(tmp_path / f'{name}.ini'), 30, seed)
+        synthetic.generate_audit_csv(str(tmp_path / f'{name}.csv'), 'dig', 40, seed)
+    a, b, c = (pd.read_excel(tmp_path / f'{name}.xlsx', sheet_name=None, dtype=str) for name in 'abc')
+    assert a.keys() == b.keys()
+    for sheet in a:
+        pd.testing.assert_frame_equal(a[sheet], b[sheet])
+    assert any(not a[sheet].equals(c[sheet]) for sheet in a)
+    for suffix in ('ini', 'csv'):
+        assert (tmp_path / f'a.{suffix}').read_bytes() == (tmp_path / f'b.{suffix}').read_bytes()
+        assert (tmp_path / f'a.{suffix}').read_bytes() != (tmp_path / f'c.{suffix}').read_bytes()
+
+
+def test_all_scenarios_run_and_compare(tmp_path):
+    output = str(tmp_path / 'result.json')
+    argv = ['--rows', '60', '--rules', '20', '--repeat', '1', '--workdir', str(tmp_path / 'data'), '-o', output]
+    assert run_benchmarks.main(argv) == 0
+    with open(output, encoding='utf-8') as f:
+        results = json.load(f)
+    assert list(results['scenarios']) == [scenario.name for scenario in run_benchmarks.SCENARIOS]
+    assert all(result['rows'] > 0 for result in results['scenarios'].values())
+    assert run_benchmarks.main(['--compare', output, output]) == 0
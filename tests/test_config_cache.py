@@ -0,0 +1,104 @@
+import configparser
+import json
+import logging
+
+import pandas as pd
+import pytest
+
+import config_cache
+from config_cache import get_cache_path, load_compiled_config
+from fuzzy_matcher import FuzzyMappingEngine
+
+CONFIG_TEXT = """[DEFAULT]
+shared = 默认值
+
+[SheetMapping]
+Sheet1 = 输出1
+
+[KeywordFuzzyMapping]
+名称_*苹果* = 类别:水果, 备注:含苹果
+名称_a.b = 类别:正则
+名称_a(b = 类别:无效正则
+名称_梨 = 类别:水果, 缺少冒号
+无下划线 = 类别:无效键
+shared = 覆盖默认值
+
+[DataType]
+数量 = int
+路径 = %%(shared)s
+"""
+
+
+def parse(text):
+    config = configparser.ConfigParser(strict=False)
+    config.read_string(text)
+    return config
+
+
+def apply_engine(engine, caplog):
+    df = pd.DataFrame({'名称': ['大苹果', 'axb', 'A.B', '梨', None]})
+    caplog.clear()
+    with caplog.at_level(logging.INFO):
+        result = engine.apply(df, logging.getLogger(__name__))
+    return result, [record.getMessage() for record in caplog.records]
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    path = tmp_path / 'config.ini'
+    path.write_text(CONFIG_TEXT, encoding='utf-8')
+    return str(path)
+
+
+def test_config_matches_configparser(config_file):
+    actual, expected = load_compiled_config(config_file).config, parse(CONFIG_TEXT)
+    assert actual.sections() == expected.sections()
+    assert dict(actual.defaults()) == dict(expected.defaults())
+    for section in expected.sections():
+        assert list(actual.items(section)) == list(expected.items(section))
+
+
+def test_engine_from_cache_matches_parsed(config_file, caplog):
+    parsed = load_compiled_config(config_file).fuzzy_engine
+    with open(get_cache_path(config_file), encoding='utf-8') as f:
+        assert json.load(f)['key'] == config_cache.cache_key(load_compiled_config(config_file).digest)
+
+    cached = load_compiled_config(config_file).fuzzy_engine
+    assert cached.mapping_items == parsed.mapping_items
+    assert all(rule.regex is None for rule in cached.rules)  # 正则在首次匹配时才编译
+    assert cached.to_table() == parsed.to_table()
+    expected, expected_log = apply_engine(parsed, caplog)
+    actual, actual_log = apply_engine(cached, caplog)
+    pd.testing.assert_frame_equal(actual, expected)
+    assert actual_log == expected_log
+    assert FuzzyMappingEngine.from_config(parse(CONFIG_TEXT)).to_table() == parsed.to_table()
+
+
+def test_engine_is_built_on_first_access(config_file, monkeypatch):
+    def fail(*args):
+        raise AssertionError("只读取配置时不应构建规则引擎")
+
+    monkeypatch.setattr(FuzzyMappingEngine, 'from_config', classmethod(fail))
+    monkeypatch.setattr(FuzzyMappingEngine, 'from_table', classmethod(fail))
+    assert load_compiled_config(config_file).config['SheetMapping']['Sheet1'] == '输出1'
+
+
+@pytest.mark.parametrize('field, value', [('version', 0), ('python', 'other'), ('pandas', '0.0'), ('digest', 'x')])
+def test_cache_with_other_key_is_rebuilt(config_file, field, value):
+    expected = load_compiled_config(config_file).fuzzy_engine.to_table()
+    cache_path = get_cache_path(config_file)
+    with open(cache_path, encoding='utf-8') as f:
+        cached = json.load(f)
+    cached['key'][field] = value
+    cached['rules'] = []
+    with open(cache_path, 'w', encoding='utf-8') as f:
+        json.dump(cached, f)
+    assert load_compiled_config(config_file).fuzzy_engine.to_table() == expected
+    with open(cache_path, encoding='utf-8') as f:
+        assert json.load(f)['rules'] == expected
+
+
+def test_unreadable_cache_is_ignored(config_file):
+    with open(get_cache_path(config_file), 'wb') as f:
+        f.write(b'\x80\x04not json')
+    assert len(load_compiled_config(config_file).fuzzy_engine.rules) == 6
@@ -0,0 +1,81 @@
+"""转换缓存：缓存键、命中恢复和按最近使用时间淘汰"""
+import configparser
+import os
+
+from conversion_cache import RUNTIME_OPTIONS, ConversionCache
+
+OPTIONS = {'trim_spaces': True, 'fill_na': True, 'fill_na_value': 'NA'}
+
+
+def make_config(**sections):
+    config = configparser.ConfigParser()
+    config.read_dict(dict({'SheetMapping': {'s': 'out.csv'}}, **sections))
+    return config
+
+
+def write_file(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+    return str(path)
+
+
+def convert_result(output_dir, data, name='out.csv'):
+    """模拟一次转换：写出CSV并返回转换结果"""
+    path = write_file(os.path.join(output_dir, name), data)
+    return [{'sheet': 's', 'output': path, 'rows': 1, 'warnings': ['w'], 'findings': None, 'metrics': None}]
+
+
+def test_key_depends_on_workbook_config_and_options(tmp_path):
+    cache = ConversionCache(str(tmp_path / 'cache'))
+    workbook = write_file(tmp_path / 'w.xlsx', b'workbook')
+    key = cache.make_key(workbook, make_config(), OPTIONS)
+    assert cache.make_key(workbook, make_config(), dict(OPTIONS)) == key
+    # 不影响输出内容的选项不参与缓存键
+    runtime = {option: True for option in RUNTIME_OPTIONS}
+    assert cache.make_key(workbook, make_config(), dict(OPTIONS, **runtime)) == key
+    # 与转换无关的配置段不参与缓存键
+    assert cache.make_key(workbook, make_config(Other={'a': '1'}), OPTIONS) == key
+
+    assert cache.make_key(workbook, make_config(), dict(OPTIONS, fill_na_value='')) != key
+    assert cache.make_key(workbook, make_config(DataType={'a': 'int'}), OPTIONS) != key
+    assert cache.make_key(workbook, make_config(s_OutputColumns={'columns': 'a'}), OPTIONS) != key
+    write_file(tmp_path / 'w.xlsx', b'changed')
+    assert cache.make_key(workbook, make_config(), OPTIONS) != key
+
+
+def test_store_and_restore(tmp_path):
+    cache = ConversionCache(str(tmp_path / 'cache'))
+    (tmp_path / 'a').mkdir()
+    (tmp_path / 'b').mkdir()
+    assert cache.restore('k', str(tmp_path / 'b')) is None
+    cache.store('k', convert_result(str(tmp_path / 'a'), b'a,b\n1,2\n'), str(tmp_path / 'a'))
+
+    [result] = cache.restore('k', str(tmp_path / 'b'))
+    assert (result['sheet'], result['rows'], result['warnings'], result['cached']) == ('s', 1, ['w'], True)
+    assert (tmp_path / 'b' / 'out.csv').read_bytes() == b'a,b\n1,2\n'
+
+
+def test_damaged_entry_is_removed(tmp_path):
+    cache = ConversionCache(str(tmp_path / 'cache'))
+    cache.store('k', convert_result(str(tmp_path), b'a\n1\n'), str(tmp_path))
+    [entry] = cache.entries()
+    write_file(os.path.join(entry['path'], 'sheet0.csv'), b'a\n')
+    assert cache.restore('k', str(tmp_path)) is None
+    assert cache.entries() == []
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ConversionCache(str(tmp_path / 'cache'), max_bytes=25)
+    for index, key in enumerate(['k1', 'k2']):
+        cache.store(key, convert_result(str(tmp_path), b'x' * 10), str(tmp_path))
+        os.utime(os.path.join(cache.cache_dir, key, 'entry.json'), (1000 + index, 1000 + index))
+    # 恢复 k1 后 k1 成为最近使用的条目
+    assert cache.restore('k1', str(tmp_path)) is not None
+    cache.store('k3', convert_result(str(tmp_path), b'x' * 10), str(tmp_path))
+    assert sorted(os.path.basename(entry['path']) for entry in cache.entries()) == ['k1', 'k3']
+
+    # 超过容量上限的结果不缓存
+    cache.store('k4', convert_result(str(tmp_path), b'x' * 30), str(tmp_path))
+    assert cache.restore('k4', str(tmp_path)) is None
+    assert cache.clear() == 2
+    assert cache.entries() == []
@@ -0,0 +1,176 @@
+"""ExcelConverter 各转换方式（整表、分块、并行、取消、审核）结果的一致性测试"""
+import configparser
+import os
+import random
+import threading
+
+import pytest
+from openpyxl import Workbook
+
+from audit_engine import audit_csv
+from converter import ConversionCancelled, ExcelConverter
+from test_sheet_reader import random_workbook
+
+OPTIONS = {'remove_duplicates': True, 'fill_na': True, 'fill_na_value': 'NA'}
+
+
+def make_config(sections):
+    config = configparser.ConfigParser()
+    config.optionxform = str  # 保留Sheet名和列名大小写
+    config.read_dict(sections)
+    return config
+
+
+def write_workbook(path, sheets):
+    """sheets: Sheet名 → 行列表（第一行为表头）"""
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    for name, rows in sheets.items():
+        sheet = workbook.create_sheet(name)
+        for row in rows:
+            sheet.append(row)
+    workbook.save(path)
+
+
+def convert(config, excel_file, output_dir, **options):
+    """转换到新建的 output_dir，返回 输出文件名 → CSV内容"""
+    os.makedirs(output_dir)
+    ExcelConverter(config).process_excel_file(str(excel_file), str(output_dir), dict(OPTIONS, **options))
+    return {name: open(os.path.join(output_dir, name), 'rb').read() for name in sorted(os.listdir(output_dir))}
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_chunked_conversion_matches_whole_sheet(tmp_path, seed):
+    path = tmp_path / 'w.xlsx'
+    random_workbook(path, random.Random(seed))
+    config = make_config({
+        'SheetMapping': {'S': 'out.csv'},
+        # 包含超出表头宽度时才有的列
+        'S_OutputColumns': {'columns': '列0,列1,Unnamed: 1,Unnamed: 4,Unnamed: 6'},
+    })
+    whole = convert(config, path, tmp_path / 'whole', chunk_size=0)
+    assert convert(config, path, tmp_path / 'chunked', chunk_size=2) == whole
+
+
+@pytest.mark.parametrize('bad_row', [0, 3, 6])
+def test_chunked_casts_match_whole_sheet(tmp_path, bad_row):
+    # 整表转换时列中任一值无法转换则整列保持原样，分块转换不能只在出错的块中保持原样
+    rows = [[str(i), str(i * 10), f'n{i}'] for i in range(8)]
+    rows[bad_row][0] = 'x'
+    path = tmp_path / 'w.xlsx'
+    write_workbook(path, {'S': [['数量', '金额', '名称']] + rows})
+    config = make_config({
+        'SheetMapping': {'S': 'out.csv'},
+        'S_OutputColumns': {'columns': '数量,金额,名称'},
+        'DataType': {'数量': 'float', '金额': 'float'},
+    })
+    whole = convert(config, path, tmp_path / 'whole', chunk_size=0)
+    assert b'\n1,10.0,n1\n' in whole['out.csv']
+    assert convert(config, path, tmp_path / 'chunked', chunk_size=2) == whole
+
+
+def test_parallel_conversion_matches_serial(tmp_path):
+    rng = random.Random(0)
+    sheets = {name: [['描述', '数量', '名称']] + [[rng.choice(['a', ' b ', None, '中文']), str(rng.randint(0, 5)),
+                                                  rng.choice(['苹果', '梨', None])] for _ in range(30)]
+              for name in ('S1', 'S2', 'S3')}
+    path = tmp_path / 'w.xlsx'
+    write_workbook(path, sheets)
+    config = make_config({
+        'SheetMapping': {'S1': 'out1.csv', 'S2': 'out2.csv', 'S3': 'out3.csv'},
+        'S1_OutputColumns': {'columns': '描述,数量,名称,类别'},
+        'S2_OutputColumns': {'columns': '名称,描述'},
+        'KeywordFuzzyMapping': {'名称_*苹果*': '类别:水果'},
+        'DataType': {'数量': 'int'},
+    })
+    serial = convert(config, path, tmp_path / 'serial')
+    assert len(serial) == 3
+    assert convert(config, path, tmp_path / 'parallel', max_workers=2) == serial
+
+
+def test_cancel_during_whole_sheet_cleaning(tmp_path):
+    path = tmp_path / 'w.xlsx'
+    write_workbook(path, {'S': [['a', 'b', 'c']] + [[str(i), ' x ', None] for i in range(5)]})
+    config = make_config({'SheetMapping': {'S': 'out.csv'}, 'S_OutputColumns': {'columns': 'a,b,c'}})
+    cancel_event = threading.Event()
+    messages = []
+
+    def on_progress(fraction, message):
+        messages.append(message)
+        # 读取完成后、清洗第二列时取消
+        if "清洗列 'b'" in message:
+            cancel_event.set()
+
+    with pytest.raises(ConversionCancelled):
+        ExcelConverter(config).process_excel_file(str(path), str(tmp_path), dict(OPTIONS), on_progress, cancel_event)
+    assert "Sheet 'S' 已读取 5 行" in messages
+    assert "Sheet 'S' 清洗列 'a'" in messages
+    assert not any("清洗列 'c'" in message for message in messages)
+    assert not os.path.exists(tmp_path / 'out.csv')
+
+
+@pytest.mark.parametrize('kind', ['ana', 'dig'])
+def test_chunked_audit_matches_whole_sheet(tmp_path, kind):
+    rng = random.Random(kind)
+    columns = ['描述', '量测类型', '设备类型', '同类型设备号', '命名规则', '是否控制', '控制点号', '分量ID', '点号']
+    rows = [[rng.choice(['a', 'b', None]), rng.choice(['1', '2', None]), rng.choice(['T1', 'T2', None]),
+             rng.choice(['1', '2', None]), rng.choice(['0', '1']), rng.choice(['0', '1', '2']),
+             rng.choice(['1', '2']), rng.choice(['1', '2']), str(rng.randint(0, 9))] for _ in range(40)]
+    path = tmp_path / 'w.xlsx'
+    write_workbook(path, {'S': [columns] + rows})
+    config = make_config({'SheetMapping': {'S': f'{kind}.csv'},
+                          'S_OutputColumns': {'columns': ','.join(columns)}})
+    results = {}
+    for chunk_size in (0, 7):
+        output_dir = tmp_path / str(chunk_size)
+        output_dir.mkdir()
+        [result] = ExcelConverter(config).convert_workbook(str(path), str(output_dir),
+                                                           dict(OPTIONS, chunk_size=chunk_size, audit=True))
+        results[chunk_size] = result['findings'].items
+        assert results[chunk_size] == audit_csv(result['output']).items
+    assert results[0] and results[7] == results[0]
+
+
+def test_arrow_strings_output_matches(tmp_path):
+    pytest.importorskip('pyarrow')
+    path = tmp_path / 'w.xlsx'
+    random_workbook(path, random.Random(3))
+    config = make_config({'SheetMapping': {'S': 'out.csv'}, 'S_OutputColumns': {'columns': '列0,列1,a'}})
+    for chunk_size in (0, 3):
+        expected = convert(config, path, tmp_path / f'object{chunk_size}', chunk_size=chunk_size)
+        assert convert(config, path, tmp_path / f'arrow{chunk_size}', chunk_size=chunk_size,
+                       arrow_strings=True) == expected
+
+
+@pytest.mark.parametrize('chunk_size', [0, 2])
+def test_profile_records_stages(tmp_path, chunk_size):
+    path = tmp_path / 'w.xlsx'
+    write_workbook(path, {'S': [['名称', '数量']] + [['苹果', '1'], ['梨', '2'], ['苹果', '1']]})
+    config = make_config({
+        'SheetMapping': {'S': 'out.csv'},
+        'S_OutputColumns': {'columns': '名称,数量,类别'},
+        'KeywordFuzzyMapping': {'名称_苹果': '类别:水果'},
+    })
+    [result] = ExcelConverter(config).convert_workbook(str(path), str(tmp_path),
+                                                       dict(OPTIONS, chunk_size=chunk_size, profile=True))
+    stages = {record['stage']: record for record in result['metrics'] if record['type'] == 'stage'}
+    assert {'read_excel', 'fuzzy_mapping', 'basic_cleaning', 'apply_data_types', 'to_csv'} <= set(stages)
+    assert stages['read_excel']['rows_out'] == 3
+    assert stages['to_csv']['rows_out'] == 2
+
+
+def test_incremental_conversion_skips_unchanged_sheets(tmp_path):
+    path = tmp_path / 'w.xlsx'
+    sheets = {'S1': [['a'], ['1']], 'S2': [['a'], ['2']]}
+    write_workbook(path, sheets)
+    config = make_config({'SheetMapping': {'S1': 'out1.csv', 'S2': 'out2.csv'},
+                          'S1_OutputColumns': {'columns': 'a'}, 'S2_OutputColumns': {'columns': 'a'}})
+    options = dict(OPTIONS, incremental=True)
+    first = ExcelConverter(config).convert_workbook(str(path), str(tmp_path), options)
+    assert not any(result.get('unchanged') for result in first)
+
+    write_workbook(path, dict(sheets, S2=[['a'], ['3']]))
+    second = ExcelConverter(config).convert_workbook(str(path), str(tmp_path), options)
+    assert [result.get('unchanged', False) for result in second] == [True, False]
+    assert second[0]['rows'] == 1
+    assert (tmp_path / 'out2.csv').read_text(encoding='utf-8-sig').splitlines()[1] == '3'
@@ -0,0 +1,58 @@
+"""CSV 编码检测与读取：与原先试 utf-8、出错再试 gbk 的读取结果一致"""
+import os
+
+import pandas as pd
+import pytest
+
+import csv_loader
+from csv_loader import detect_encoding, read_csv, read_csv_auto
+
+
+def baseline_read_csv(path, **kwargs):
+    try:
+        return pd.read_csv(path, encoding='utf-8', **kwargs)
+    except Exception:
+        return pd.read_csv(path, encoding='gbk', **kwargs)
+
+
+CASES = {
+    'utf8': ('描述,值\n中文,1\n'.encode('utf-8'), 'utf-8'),
+    'bom': ('描述,值\n中文,1\n'.encode('utf-8-sig'), 'utf-8'),
+    'gbk': ('描述,值\n中文,1\n'.encode('gbk'), 'gbk'),
+    # 开头是纯ASCII，gbk字符在试解码的范围之后
+    'gbk_late': (('a,b\n' + 'x,1\n' * 20 + '中文,2\n').encode('gbk'), 'gbk'),
+}
+
+
+@pytest.mark.parametrize('name', sorted(CASES))
+def test_read_matches_baseline(tmp_path, monkeypatch, name):
+    monkeypatch.setattr(csv_loader, 'SNIFF_BYTES', 16)
+    data, encoding = CASES[name]
+    path = tmp_path / f'{name}.csv'
+    path.write_bytes(data)
+    df, detected = read_csv_auto(str(path))
+    assert detected == encoding
+    pd.testing.assert_frame_equal(df, baseline_read_csv(path))
+    # 回退后记住实际编码
+    assert detect_encoding(str(path)) == encoding
+
+
+def test_gbk_text_valid_as_utf8_falls_back(tmp_path):
+    # '楼' 的gbk字节恰好也是合法的utf-8（'¥'），按utf-8读取时列名不对，usecols 报 ValueError
+    path = tmp_path / 'x.csv'
+    path.write_bytes('楼,v\n1,2\n'.encode('gbk'))
+    assert detect_encoding(str(path)) == 'utf-8'
+    df, encoding = read_csv_auto(str(path), usecols=['楼'])
+    assert encoding == 'gbk'
+    pd.testing.assert_frame_equal(df, baseline_read_csv(path, usecols=['楼']))
+
+
+def test_encoding_cache_follows_file_changes(tmp_path):
+    path = tmp_path / 'x.csv'
+    path.write_bytes('a\n中文\n'.encode('utf-8'))
+    assert detect_encoding(str(path)) == 'utf-8'
+    stat = os.stat(path)
+    path.write_bytes('a\n中文\n'.encode('gbk'))
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+    assert detect_encoding(str(path)) == 'gbk'
+    assert read_csv(str(path))['a'].tolist() == ['中文']
@@ -0,0 +1,90 @@
+"""CSV 写出（write_frame / write_csv）与 DataFrame.to_csv 的逐字节一致性测试"""
+import io
+import os
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import csv_writer
+from arrow_strings import arrow_string_dtype, to_arrow_strings
+from csv_writer import atomic_output, write_csv, write_frame
+
+# 需要加引号、转义或容易写错的取值
+VALUES = ['', 'a', 'a,b', 'q"x', ' sp ', 'line\nbreak', 'cr\r', 'crlf\r\n', None, np.nan, '中文', '""',
+          'x;y', '\t', "'", 'é ']
+
+
+def random_frame(rng):
+    """随机表：以字符串列为主，夹杂数字列和混合类型列；可能没有列或没有行，也可能转为 pyarrow 字符串列"""
+    rows = rng.randint(0, 7)
+    data = {}
+    for position in range(rng.randint(0, 4)):
+        kind = rng.random()
+        if kind < 0.8:
+            values = [rng.choice(VALUES) for _ in range(rows)]
+        elif kind < 0.9:
+            values = [rng.random() for _ in range(rows)]
+        else:
+            values = [rng.choice(['a', 1, None]) for _ in range(rows)]
+        data[rng.choice(['c', 'a,b', 'x"', '名称']) + str(position)] = values
+    # pandas 3 默认把字符串列推断为 str 类型，这里也覆盖 object 字符串列
+    df = pd.DataFrame(data, index=range(rows), dtype=object if rng.random() < 0.5 else None)
+    if rng.random() < 0.5 and arrow_string_dtype() is not None:
+        df = to_arrow_strings(df)
+    if rng.random() < 0.2 and data:
+        df = df.astype(str)
+    return df
+
+
+def read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+@pytest.fixture(params=[1, 2, 3, 50000], ids=lambda rows: f'batch{rows}')
+def batch_rows(request, monkeypatch):
+    monkeypatch.setattr(csv_writer, 'WRITE_BATCH_ROWS', request.param)
+    return request.param
+
+
+@pytest.mark.parametrize('seed', range(100))
+def test_write_csv_matches_to_csv(tmp_path, batch_rows, seed):
+    df = random_frame(random.Random(seed))
+    expected, actual = str(tmp_path / 'expected.csv'), str(tmp_path / 'actual.csv')
+    df.to_csv(expected, index=False, encoding='utf-8-sig')
+    write_csv(df, actual)
+    assert read_bytes(actual) == read_bytes(expected)
+
+    buffer = io.StringIO(newline='')
+    write_frame(buffer, df)
+    assert buffer.getvalue() == df.to_csv(index=False)
+
+
+@pytest.mark.parametrize('seed', range(100))
+def test_chunked_write_matches_to_csv(tmp_path, batch_rows, seed):
+    rng = random.Random(seed)
+    df = random_frame(rng)
+    bounds = sorted(rng.randint(0, len(df)) for _ in range(rng.randint(0, 3)))
+    chunks = [df.iloc[start:stop] for start, stop in zip([0] + bounds, bounds + [len(df)])]
+    expected, actual = str(tmp_path / 'expected.csv'), str(tmp_path / 'actual.csv')
+    with open(expected, 'w', encoding='utf-8-sig', newline='') as f:
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(f, index=False, header=i == 0)
+    with atomic_output(actual) as f:
+        for i, chunk in enumerate(chunks):
+            write_frame(f, chunk, header=i == 0)
+    assert read_bytes(actual) == read_bytes(expected)
+
+
+def test_atomic_output_keeps_old_file_on_error(tmp_path):
+    path = str(tmp_path / 'out.csv')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('old')
+    with pytest.raises(KeyboardInterrupt):
+        with atomic_output(path) as f:
+            f.write('new')
+            raise KeyboardInterrupt
+    assert read_bytes(path) == b'old'
+    assert os.listdir(str(tmp_path)) == ['out.csv']
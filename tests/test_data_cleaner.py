@@ -0,0 +1,89 @@
+"""数据清洗：分块去重与整表 drop_duplicates 一致，类型转换、列解析缓存和就地清洗"""
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_cleaner import MAX_COLUMN_PLANS, DataCleaner
+
+VALUES = [None, np.nan, float('nan'), pd.NA, '', 'a', 'A', ' a', '1', 1, 1.5, '中文']
+
+
+def kept_rows(df, chunk_size):
+    """分块去重后保留的行号（比较行号即可，保留的行本身取自原表）"""
+    seen_rows = set()
+    kept = []
+    for start in range(0, len(df), chunk_size):
+        kept.extend(DataCleaner.remove_duplicates_across_chunks(df.iloc[start:start + chunk_size], seen_rows).index)
+    return kept
+
+
+@pytest.mark.parametrize('seed', range(60))
+def test_chunked_dedupe_matches_drop_duplicates(seed):
+    rng = random.Random(seed)
+    width = rng.randint(1, 4)
+    values = rng.sample(VALUES, rng.randint(1, 4))
+    df = pd.DataFrame([[rng.choice(values) for _ in range(width)] for _ in range(rng.randint(0, 60))],
+                      columns=[f'c{i}' for i in range(width)], dtype=object)
+    expected = list(df.drop_duplicates().index)
+    for chunk_size in (1, 3, 1000):
+        assert kept_rows(df, chunk_size) == expected
+
+
+def test_rows_with_equal_hashes_are_compared_by_value():
+    # hash_pandas_object 按字符串形式哈希对象列，1 与 '1' 的行哈希相同，但 drop_duplicates 认为两行不同
+    df = pd.DataFrame({'c': ['1', 1, '1']}, dtype=object)
+    hashes = pd.util.hash_pandas_object(df, index=False)
+    assert hashes[0] == hashes[1]
+    assert kept_rows(df, 1) == list(df.drop_duplicates().index) == [0, 1]
+
+
+def test_dedupe_does_not_modify_input():
+    nan = float('nan')
+    df = pd.DataFrame({'c': ['a', nan, 'a']}, dtype=object)
+    DataCleaner.remove_duplicates_across_chunks(df, set())
+    assert df['c'][1] is nan
+
+
+def test_failed_casts_are_skipped_and_recorded():
+    cleaner = DataCleaner({'DataType': {'a': 'int', 'b': 'float'}})
+    failed = set()
+    df = cleaner.apply_data_types(pd.DataFrame({'a': ['1', 'x'], 'b': ['1', '2']}, dtype=object), failed)
+    assert failed == {'a'}
+    assert df['a'].tolist() == ['1', 'x'] and df['b'].tolist() == [1.0, 2.0]
+    # 已失败的列在后面的块中不再转换
+    df = cleaner.apply_data_types(pd.DataFrame({'a': ['2'], 'b': ['3']}, dtype=object), failed)
+    assert df['a'].tolist() == ['2'] and df['b'].tolist() == [3.0]
+
+
+def test_column_plans_are_bounded():
+    cleaner = DataCleaner({'S_OutputColumns': {'columns': 'a,b'}})
+    for i in range(MAX_COLUMN_PLANS + 10):
+        df = pd.DataFrame({'a': [1], f'c{i}': [2]})
+        assert cleaner.clean_and_filter_columns(df, 'S').columns.tolist() == ['a', 'b']
+    assert len(cleaner._column_plans) == MAX_COLUMN_PLANS
+    # 最近使用的表头保留，最早的被淘汰
+    assert ('S', ('a', f'c{MAX_COLUMN_PLANS + 9}'), None, ('a', 'b')) in cleaner._column_plans
+    assert ('S', ('a', 'c0'), None, ('a', 'b')) not in cleaner._column_plans
+
+
+def random_frame(rng):
+    width = rng.randint(1, 4)
+    values = VALUES + ['  x  ', '苹果']
+    rows = [[rng.choice(values) for _ in range(width)] for _ in range(rng.randint(0, 20))]
+    return pd.DataFrame(rows, columns=[f'c{i}' for i in range(width)], dtype=object)
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_in_place_cleaning_matches_copy(seed):
+    rng = random.Random(seed)
+    df = random_frame(rng)
+    options = {'trim_spaces': rng.random() < 0.8, 'fill_na': rng.random() < 0.7, 'fill_na_value': 'NA',
+               'remove_empty_rows': rng.random() < 0.3, 'remove_duplicates': rng.random() < 0.3}
+    cleaner = DataCleaner({'KeywordFuzzyMapping': {'c0_*苹果*': 'c1:水果'}})
+    expected = cleaner.clean_data(df.copy(), options)
+    for report_memory in (True, False):
+        actual = cleaner.clean_data(df.copy(), dict(options, in_place=True, report_memory=report_memory))
+        pd.testing.assert_frame_equal(actual, expected)
+    assert cleaner.last_peak_memory is not None
@@ -0,0 +1,143 @@
+"""FuzzyMappingEngine 与原逐条正则替换循环的等价性测试"""
+import logging
+import random
+import re
+import warnings
+
+import pandas as pd
+import pytest
+
+from data_cleaner import DataCleaner
+from fuzzy_matcher import FuzzyMappingEngine, fold_case, is_plain_literal
+
+# 含 re.IGNORECASE 下与ASCII字母等价的非ASCII字符（İ ı ſ 开尔文符号）和正则元字符
+ALPHABET = list('abcAB中文主变电压KkSs12 -_.\u0130\u0131\u017f\u212a')
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append((record.levelname, record.getMessage()))
+
+
+def capture_logger(name):
+    logger = logging.getLogger(name)
+    logger.handlers = [ListHandler()]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+def baseline_fuzzy_mapping(df, mapping_items, logger):
+    """改写前 DataCleaner.apply_fuzzy_mapping 的逐条执行循环"""
+    df = df.copy()
+    for full_key, replacements in mapping_items:
+        try:
+            if '_' not in full_key:
+                logger.error(f"无效的模糊映射键格式: {full_key}")
+                continue
+            src_col, pattern = full_key.split('_', 1)
+            pattern = pattern.replace('*', '.*')
+            if src_col not in df.columns:
+                logger.error(f"源列不存在: {src_col}")
+                continue
+            # 原实现面向 object 字符串列，按 Python re 匹配；pandas 3 装有 pyarrow 时 astype(str) 得到
+            # Arrow 字符串列，str.contains 改用 RE2，转回 object 保持原来的匹配语义
+            src_series = df[src_col].astype(str).astype(object)
+            mask = src_series.str.contains(pattern, case=False, regex=True, na=False)
+            match_count = mask.sum()
+            for replacement in replacements.split(','):
+                if ':' not in replacement:
+                    logger.error(f"无效替换规则: {replacement}")
+                    continue
+                dest_col, replace_value = replacement.split(':', 1)
+                dest_col = dest_col.strip()
+                replace_value = replace_value.strip()
+                if dest_col not in df.columns:
+                    df[dest_col] = ""
+                else:
+                    df[dest_col] = df[dest_col].astype(str)
+                df.loc[mask, dest_col] = replace_value
+            logger.info(f"✅ [{src_col}] 替换完成，命中 {match_count} 行")
+        except Exception as e:
+            logger.error(f"处理键 {full_key} 时出错: {str(e)}")
+    return df
+
+
+def random_word(rng, n):
+    return ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(0, n)))
+
+
+def random_pattern(rng):
+    r = rng.random()
+    if r < 0.45:
+        return random_word(rng, 3)
+    if r < 0.65:
+        return random_word(rng, 2) + '*' + random_word(rng, 2)
+    if r < 0.75:
+        return '[ab]' + random_word(rng, 1)
+    if r < 0.8:
+        return '(a'  # 错误的正则
+    if r < 0.85:
+        return '(a)\\1'  # 反向引用，不能并入合并正则
+    if r < 0.9:
+        return '(?i)' + random_word(rng, 2)
+    return '^' + random_word(rng, 2) + rng.choice(['', '$', '+', '?', '|b'])
+
+
+def random_case(rng):
+    rows = rng.randint(0, 40)
+    df = pd.DataFrame({
+        '名称': [rng.choice([None, random_word(rng, 6)]) for _ in range(rows)],
+        '描述': [rng.choice([None, random_word(rng, 3)]) for _ in range(rows)],
+        'x': [random_word(rng, 4) for _ in range(rows)],
+    }, dtype=object)
+    items = []
+    for _ in range(rng.randint(0, 12)):
+        src = rng.choice(['名称', '描述', 'x', 'missing', '新列'])
+        key = f'{src}_{random_pattern(rng)}' if rng.random() > 0.05 else 'nokey'
+        replacements = ','.join(
+            f"{rng.choice(['描述', '新列', 'y', '名称'])}:{random_word(rng, 2)}" if rng.random() > 0.1 else 'bad'
+            for _ in range(rng.randint(1, 3)))
+        items.append((key, replacements))
+    # ConfigParser 中键唯一
+    return df, list(dict(items).items())
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_engine_matches_baseline_loop(seed):
+    rng = random.Random(seed)
+    for _ in range(15):
+        df, items = random_case(rng)
+        expected_logger = capture_logger('test_fuzzy_expected')
+        actual_logger = capture_logger('test_fuzzy_actual')
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            expected = baseline_fuzzy_mapping(df, items, expected_logger)
+            cleaner = DataCleaner({'KeywordFuzzyMapping': dict(items)})
+            cleaner.logger = actual_logger
+            actual = cleaner.apply_fuzzy_mapping(df)
+        pd.testing.assert_frame_equal(actual, expected)
+        assert actual_logger.handlers[0].records == expected_logger.handlers[0].records
+
+
+@pytest.mark.parametrize('pattern, value', [
+    ('k', '\u212a'),    # KELVIN SIGN
+    ('K', '\u212a'),
+    ('s', '\u017f'),    # LATIN SMALL LETTER LONG S
+    ('i', '\u0130'),    # LATIN CAPITAL LETTER I WITH DOT ABOVE
+    ('i', '\u0131'),    # LATIN SMALL LETTER DOTLESS I
+    ('I', '\u0131'),
+    ('ab', 'xABy'),
+    ('a.b', 'a.b'),
+])
+def test_literal_case_fold_matches_re_ignorecase(pattern, value):
+    assert is_plain_literal(pattern) == ('.' not in pattern)
+    expected = re.search(pattern, value, re.IGNORECASE) is not None
+    engine = FuzzyMappingEngine([(f'col_{pattern}', 'out:1')])
+    assert bool(engine.match_values('col', [value])) == expected
+    if is_plain_literal(pattern):
+        assert (fold_case(pattern) in fold_case(value)) == expected
@@ -0,0 +1,136 @@
+"""规则表格编解码与原逐行实现（config_maintainer.py 中的 export_config_table / update_config）的一致性测试"""
+import configparser
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from rule_codec import RULE_TABLE_COLUMNS, rules_to_table, table_to_rules
+
+
+def baseline_rules_to_table(items):
+    """原 export_config_table 中逐条规则构造表格行（不排序）"""
+    data = []
+    for key, value in items:
+        if '_' in key:
+            col, pattern = key.split('_', 1)
+            rule_dict = {}
+            for rule in value.split(','):
+                if ':' in rule:
+                    rule_col, rule_val = rule.split(':', 1)
+                    rule_dict[rule_col.strip()] = rule_val.strip()
+            rules = value.split(',')
+            naming_rule = ''
+            if rules:
+                last_rule = rules[-1]
+                if ':' in last_rule:
+                    naming_rule = last_rule.split(':')[-1]
+            data.append({
+                '原列名称': col,
+                '原列描述': pattern,
+                '描述': rule_dict.get('描述', ''),
+                '量测类型': rule_dict.get('量测类型', ''),
+                '系数': rule_dict.get('系数', ''),
+                '告警优先级': rule_dict.get('告警优先级', ''),
+                '命名规则': naming_rule,
+            })
+    return pd.DataFrame(data)
+
+
+def baseline_table_to_rules(df):
+    """原 update_config 中逐行构造键和规则字符串"""
+    keys, values = [], []
+    for _, row in df.iterrows():
+        rules = []
+        if row['描述'] and not pd.isna(row['描述']):
+            rules.append(f"描述:{row['描述']}")
+        if row['量测类型'] and not pd.isna(row['量测类型']):
+            rules.append(f"量测类型:{row['量测类型']}")
+        if row['系数'] and not pd.isna(row['系数']):
+            try:
+                rules.append(f"系数:{int(float(row['系数']))}")
+            except Exception:
+                pass
+        if row['告警优先级'] and not pd.isna(row['告警优先级']):
+            try:
+                rules.append(f"告警优先级:{int(float(row['告警优先级']))}")
+            except Exception:
+                pass
+        if row['命名规则'] and not pd.isna(row['命名规则']):
+            rules.append(f"命名规则:{row['命名规则']}")
+        keys.append(f"{row['原列名称']}_{row['原列描述']}")
+        values.append(','.join(rules))
+    return keys, values
+
+
+def random_items(rng):
+    """随机规则：同名项重复（以最后一个为准）、缺少冒号、值中含冒号、多余空格，键可能重复或不含'_'"""
+    names = ['描述', '量测类型', '系数', '告警优先级', '命名规则', '其他']
+    values = ['', 'a', ' b ', '1', '2.0', 'x:y', '遥测']
+    items = []
+    for i in range(rng.randint(0, 12)):
+        parts = []
+        for _ in range(rng.randint(0, 6)):
+            if rng.random() < 0.1:
+                parts.append('缺少冒号')
+            else:
+                parts.append(f"{rng.choice(names)}:{rng.choice(values)}")
+        key = rng.choice(['名称_*苹果*', '名称_梨', '无下划线', f'列{i % 3}_a_b'])
+        items.append((key, ','.join(parts)))
+    return items
+
+
+@pytest.mark.parametrize('seed', range(100))
+def test_rules_to_table_matches_row_wise(seed):
+    items = random_items(random.Random(seed))
+    expected = baseline_rules_to_table(items)
+    actual = rules_to_table(items)
+    if expected.empty:
+        assert actual.empty
+    else:
+        pd.testing.assert_frame_equal(actual, expected)
+
+
+@pytest.mark.parametrize('seed', range(100))
+def test_table_round_trip_matches_row_wise(seed):
+    rng = random.Random(seed)
+    table = rules_to_table(random_items(rng))
+    if not table.empty and rng.random() < 0.5:
+        # 读回的CSV表格：数字列、空值和混合类型
+        table['系数'] = [rng.choice([np.nan, 1.0, 2.5, '3', 'x', 0]) for _ in range(len(table))]
+        table['告警优先级'] = [rng.choice([np.nan, 1, 0]) for _ in range(len(table))]
+        table['描述'] = table['描述'].where(table['描述'] != '', np.nan)
+    assert table_to_rules(table) == baseline_table_to_rules(table)
+
+    keys, values = table_to_rules(table)
+    again = rules_to_table(list(zip(keys, values)))
+    expected = baseline_rules_to_table(list(zip(keys, values)))
+    if expected.empty:
+        assert again.empty
+    else:
+        pd.testing.assert_frame_equal(again, expected)
+
+
+def test_duplicate_names_keep_last():
+    items = [('名称_苹果', '描述:旧,量测类型:1,描述:新,系数:2,命名规则:0'), ('名称_苹果', '描述:另一条')]
+    table = rules_to_table(items)
+    assert list(table.columns) == RULE_TABLE_COLUMNS
+    assert table['描述'].tolist() == ['新', '另一条']
+    assert table_to_rules(table) == (['名称_苹果', '名称_苹果'],
+                                     ['描述:新,量测类型:1,系数:2,命名规则:0', '描述:另一条,命名规则:另一条'])
+
+
+def test_duplicate_keys_keep_last_in_config():
+    # 更新配置时整段替换：重复的键保留第一次出现的位置、最后一次的规则，与原逐行赋值相同
+    items = [('名称_苹果', '描述:旧'), ('名称_梨', '描述:梨'), ('名称_苹果', '描述:新')]
+    keys, rules = table_to_rules(rules_to_table(items))
+    assert keys == ['名称_苹果', '名称_梨', '名称_苹果']
+    config = configparser.ConfigParser()
+    config['KeywordFuzzyMapping'] = dict(zip(keys, rules))
+    expected = configparser.ConfigParser()
+    expected['KeywordFuzzyMapping'] = {}
+    for key, value in zip(*baseline_table_to_rules(baseline_rules_to_table(items))):
+        expected['KeywordFuzzyMapping'][key] = value
+    assert list(config['KeywordFuzzyMapping'].items()) == list(expected['KeywordFuzzyMapping'].items()) == \
+        [('名称_苹果', '描述:新,命名规则:新'), ('名称_梨', '描述:梨,命名规则:梨')]
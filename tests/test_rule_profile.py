@@ -0,0 +1,56 @@
+"""规则命中报告：按实际转换统计把规则分为有效、未命中、被覆盖和无效"""
+import json
+import logging
+
+import pandas as pd
+
+from fuzzy_matcher import FuzzyMappingEngine
+from pipeline_metrics import StageMetrics
+from rule_profile import (STATUS_DEAD, STATUS_INVALID, STATUS_OK, STATUS_PARTLY_SHADOWED, STATUS_SHADOWED,
+                          load_rule_records, rule_report)
+
+ITEMS = [
+    ('名称_*苹果*', '类别:水果'),       # 写入的值全部被下一条覆盖
+    ('名称_*果*', '类别:果类'),
+    ('名称_大*', '备注:大'),            # 只有“大苹果”被下一条覆盖
+    ('名称_大苹果', '备注:特大'),
+    ('名称_梨', '类别:梨'),
+    ('名称_香蕉', '类别:香蕉'),         # 数据中没有
+    ('缺失列_x', '类别:无'),            # 源列不存在
+    ('名称_a(b', '类别:无效'),
+    ('无下划线', '类别:无效'),
+]
+
+EXPECTED = [STATUS_SHADOWED, STATUS_OK, STATUS_PARTLY_SHADOWED, STATUS_OK, STATUS_OK, STATUS_DEAD, STATUS_DEAD,
+            STATUS_INVALID, STATUS_INVALID]
+
+
+def profile_records(names):
+    metrics = StageMetrics('S')
+    FuzzyMappingEngine(ITEMS).apply(pd.DataFrame({'名称': names}), logging.getLogger(__name__), metrics)
+    return [record for record in metrics.records() if record['type'] == 'rule']
+
+
+def test_rule_status():
+    report = rule_report(ITEMS, profile_records(['大苹果', '苹果', '梨', '大梨', '其他']))
+    assert report['规则'].tolist() == [key for key, _ in ITEMS]
+    assert report['状态'].tolist() == EXPECTED
+    by_rule = report.set_index('规则')
+    assert by_rule.loc['名称_*苹果*', ['命中行数', '写入单元格', '被覆盖单元格']].tolist() == [2, 2, 2]
+    assert by_rule.loc['名称_大*', ['命中行数', '写入单元格', '被覆盖单元格']].tolist() == [2, 2, 1]
+    assert by_rule.loc['名称_大*', '覆盖比例'] == 0.5
+    assert by_rule.loc['名称_梨', '类型'] == '字面量'
+
+
+def test_records_are_summed_across_sheets(tmp_path):
+    # 第一个Sheet中只有“苹果”（被覆盖），第二个Sheet中“梨”命中；合并两个Sheet的统计
+    path = tmp_path / '转换性能.jsonl'
+    with open(path, 'w', encoding='utf-8') as f:
+        for sheet, names in (('S1', ['苹果']), ('S2', ['梨', '梨'])):
+            for record in profile_records(names):
+                f.write(json.dumps(dict(record, sheet=sheet), ensure_ascii=False) + '\n')
+            f.write(json.dumps({'type': 'stage', 'sheet': sheet, 'stage': 'read_excel'}) + '\n')
+    report = rule_report(ITEMS, load_rule_records([str(path)])).set_index('规则')
+    assert report.loc['名称_梨', ['状态', '命中行数', '统计Sheet数']].tolist() == [STATUS_OK, 2, 2]
+    assert report.loc['名称_*苹果*', '状态'] == STATUS_SHADOWED
+    assert report.loc['名称_大*', '状态'] == STATUS_DEAD
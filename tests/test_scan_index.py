@@ -0,0 +1,100 @@
+"""扫描索引：描述行提取、按修改时间和大小失效、只读取部分列"""
+import json
+import os
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scan_index import SCAN_VALUE_COLUMNS, ScanIndex, extract_description_rows, scan_csv
+
+
+def reference_rows(df):
+    """逐个描述取第一次出现的行中各列的值"""
+    rows = []
+    for desc in df['描述'].dropna().unique():
+        first = df.index[df['描述'] == desc][0]
+        values = {}
+        for col in SCAN_VALUE_COLUMNS:
+            value = df.at[first, col] if col in df.columns else ''
+            if isinstance(value, np.generic):
+                value = value.item()
+            values[col] = '' if isinstance(value, float) and np.isnan(value) else value
+        rows.append([desc, values])
+    return rows
+
+
+def random_csv(path, rng):
+    # 描述可能全为数字：只读取扫描用到的列时各列都是数值类型
+    numeric = rng.random() < 0.3
+    descs = [1, 2, 3.5, None] if numeric else ['a', 'b', '中文', None, 'd']
+    priorities = [1, None] if numeric else ['1', None, 'x']
+    rows = []
+    for i in range(rng.randint(0, 40)):
+        rows.append({
+            '描述': rng.choice(descs),
+            '点号': i,
+            '量测类型': rng.choice([1, 2, 3]),
+            '系数': rng.choice([1, 2, None]),
+            '告警优先级': rng.choice(priorities),
+            '备注': rng.choice(['说明', None]),
+        })
+    df = pd.DataFrame(rows, columns=['描述', '点号', '量测类型', '系数', '告警优先级', '备注'])
+    df = df.drop(columns=[col for col in ('系数', '告警优先级') if rng.random() < 0.2])
+    df.to_csv(path, index=False, encoding=rng.choice(['utf-8', 'gbk']))
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_pruned_scan_matches_full_read(tmp_path, seed):
+    path = str(tmp_path / 'x.csv')
+    random_csv(path, random.Random(seed))
+    rows, encoding = scan_csv(path)
+    # 按JSON比较，区分 1 和 1.0
+    assert json.dumps(rows) == json.dumps(reference_rows(pd.read_csv(path, encoding=encoding)))
+    # 只读取部分列时整数列仍按整数取值
+    pruned_rows, pruned_encoding = scan_csv(path, prune_columns=True)
+    assert (json.dumps(pruned_rows), pruned_encoding) == (json.dumps(rows), encoding)
+
+
+def test_rows_without_description_column():
+    assert extract_description_rows(pd.DataFrame({'a': [1]})) == []
+
+
+def test_index_entry_invalidated_when_file_changes(tmp_path):
+    csv_path = tmp_path / 'x.csv'
+    csv_path.write_text('描述,量测类型\na,1\n', encoding='utf-8')
+    index_path = str(tmp_path / 'index.json')
+    index = ScanIndex(index_path)
+    stat = os.stat(csv_path)
+    rows = scan_csv(str(csv_path))[0]
+    index.update(str(csv_path), stat, rows)
+    index.save()
+
+    index = ScanIndex(index_path)
+    assert index.lookup(str(csv_path), os.stat(csv_path)) == rows
+    # 只改修改时间
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+    assert index.lookup(str(csv_path), os.stat(csv_path)) is None
+    # 只改大小
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert index.lookup(str(csv_path), os.stat(csv_path)) == rows
+    csv_path.write_text('描述,量测类型\na,12\n', encoding='utf-8')
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert index.lookup(str(csv_path), os.stat(csv_path)) is None
+
+
+def test_prune_drops_missing_files_in_folder(tmp_path):
+    index = ScanIndex(str(tmp_path / 'index.json'))
+    stat = os.stat(tmp_path)
+    for name in ('a.csv', 'b.csv', os.path.join('sub', 'c.csv')):
+        index.update(str(tmp_path / name), stat, [])
+    index.update(str(tmp_path.parent / 'other.csv'), stat, [])
+    index.prune(str(tmp_path), [str(tmp_path / 'a.csv')])
+    assert sorted(os.path.basename(key) for key in index.entries) == ['a.csv', 'other.csv']
+
+
+def test_unreadable_index_is_ignored(tmp_path):
+    index_path = tmp_path / 'index.json'
+    index_path.write_text('{not json', encoding='utf-8')
+    assert ScanIndex(str(index_path)).entries == {}
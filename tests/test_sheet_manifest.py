@@ -0,0 +1,137 @@
+"""Sheet指纹与转换清单：只有影响读取结果的部分变化时指纹才变化"""
+import os
+import zipfile
+
+import pandas as pd
+
+from sheet_manifest import SheetManifest, sheet_fingerprints
+
+SHEETS = ['S1', 'S2']
+
+
+PARTS = {
+    '[Content_Types].xml': (
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet2.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/sharedStrings.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'),
+    '_rels/.rels': (
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'),
+    'xl/workbook.xml': (
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><workbookPr/>'
+        '<sheets><sheet name="S1" sheetId="1" r:id="rId1"/><sheet name="S2" sheetId="2" r:id="rId2"/></sheets>'
+        '</workbook>'),
+    'xl/_rels/workbook.xml.rels': (
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '<Relationship Id="rId2" Target="/xl/worksheets/sheet2.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '<Relationship Id="rId3" Target="sharedStrings.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings"/>'
+        '<Relationship Id="rId4" Target="styles.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"/>'
+        '</Relationships>'),
+    # 两个Sheet共用“名称”（序号0），“共享”（1）只在 S1 中，“其他”（2）只在 S2 中
+    'xl/worksheets/sheet1.xml': (
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+        '<row r="1"><c r="A1" t="s"><v>0</v></c><c r="B1" t="s"><v>1</v></c></row>'
+        '</sheetData></worksheet>'),
+    'xl/worksheets/sheet2.xml': (
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+        '<row r="1"><c r="A1" t="s"><v>0</v></c><c r="B1" t="s"><v>2</v></c></row>'
+        '<row r="2"><c r="A2"><v>1</v></c><c r="B2"><v>2.5</v></c></row>'
+        '</sheetData></worksheet>'),
+    'xl/sharedStrings.xml': (
+        '<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" count="4" uniqueCount="3">'
+        '<si><t>名称</t></si><si><t>共享</t></si><si><r><t>其</t></r><r><t>他</t></r></si></sst>'),
+    'xl/styles.xml': (
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<cellXfs count="1"><xf numFmtId="0"/></cellXfs></styleSheet>'),
+}
+
+
+def write_workbook(path):
+    """只含必要部件的 xlsx：S1、S2 两个Sheet，字符串都在共享字符串表中"""
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for part, text in PARTS.items():
+            zf.writestr(part, text.encode('utf-8'))
+
+
+def rewrite_part(path, part, replace):
+    """替换压缩包中一个部件的内容（replace: bytes → bytes），其余部件原样复制"""
+    tmp_path = str(path) + '.tmp'
+    with zipfile.ZipFile(path) as src, zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as dest:
+        for item in src.infolist():
+            data = src.read(item.filename)
+            dest.writestr(item, replace(data) if item.filename == part else data)
+    os.replace(tmp_path, path)
+
+
+def test_fingerprint_ignores_unrelated_changes(tmp_path):
+    path = tmp_path / 'w.xlsx'
+    write_workbook(path)
+    before = sheet_fingerprints(str(path), SHEETS)
+    assert set(before) == set(SHEETS) and before['S1'] != before['S2']
+    assert pd.read_excel(path, sheet_name='S2', dtype=str).columns.tolist() == ['名称', '其他']
+    # 共享字符串的格式和未被引用的部件不影响指纹
+    rewrite_part(path, 'xl/sharedStrings.xml', lambda data: data.replace(b'<r><t>', b'<r><rPr><b/></rPr><t>'))
+    rewrite_part(path, '_rels/.rels', lambda data: data + b' ')
+    assert sheet_fingerprints(str(path), SHEETS) == before
+
+
+def test_fingerprint_follows_shared_strings(tmp_path):
+    path = tmp_path / 'w.xlsx'
+    write_workbook(path)
+    before = sheet_fingerprints(str(path), SHEETS)
+    # 只被 S2 引用的共享字符串变化：S2 的XML没变，但读取结果变了
+    rewrite_part(path, 'xl/sharedStrings.xml', lambda data: data.replace('<t>他</t>'.encode(), '<t>它</t>'.encode()))
+    after = sheet_fingerprints(str(path), SHEETS)
+    assert after['S1'] == before['S1']
+    assert after['S2'] != before['S2']
+
+
+def test_fingerprint_follows_styles_and_date_system(tmp_path):
+    path = tmp_path / 'w.xlsx'
+    write_workbook(path)
+    before = sheet_fingerprints(str(path), SHEETS)
+    rewrite_part(path, 'xl/styles.xml', lambda data: data.replace(b'</styleSheet>', b'<extLst/></styleSheet>'))
+    styled = sheet_fingerprints(str(path), SHEETS)
+    assert all(styled[name] != before[name] for name in SHEETS)
+    rewrite_part(path, 'xl/workbook.xml', lambda data: data.replace(b'<workbookPr/>', b'<workbookPr date1904="1"/>'))
+    dated = sheet_fingerprints(str(path), SHEETS)
+    assert all(dated[name] != styled[name] for name in SHEETS)
+
+
+def test_not_a_workbook(tmp_path):
+    path = tmp_path / 'w.xlsx'
+    path.write_bytes(b'not a zip')
+    assert sheet_fingerprints(str(path), SHEETS) == {}
+
+
+def test_manifest_lookup_checks_output(tmp_path):
+    output = tmp_path / 'out.csv'
+    output.write_text('a\n1\n', encoding='utf-8')
+    manifest = SheetManifest(str(tmp_path))
+    manifest.update('key', {'sheet': 'S1', 'output': str(output), 'rows': 1, 'warnings': []})
+    manifest.save(['S1'])
+
+    manifest = SheetManifest(str(tmp_path))
+    assert manifest.lookup('S1', 'key', str(output))['rows'] == 1
+    assert manifest.lookup('S1', 'other', str(output)) is None
+    output.write_text('a\n2\n3\n', encoding='utf-8')
+    assert manifest.lookup('S1', 'key', str(output)) is None
@@ -0,0 +1,51 @@
+"""流式读取与 pd.read_excel 整表读取的一致性测试"""
+import random
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from sheet_reader import iter_sheet_chunks, read_sheet
+
+CELLS = [None, None, '', 'a', ' b ', 'NA', '中文', '1', 0, 1, 2.5, -3, '=1/0']
+
+
+def random_workbook(path, rng):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = 'S'
+    width = rng.randint(1, 5)
+    sheet.append([rng.choice([None, f'列{i}', 'a', '']) for i in range(width)])
+    for _ in range(rng.randint(0, 30)):
+        r = rng.random()
+        if r < 0.15:
+            sheet.append([None])
+        else:
+            # 部分行超出表头宽度
+            row_width = rng.randint(1, width + (3 if r > 0.85 else 0))
+            sheet.append([rng.choice(CELLS) for _ in range(row_width)])
+    workbook.save(path)
+
+
+@pytest.mark.parametrize('seed', range(30))
+def test_read_sheet_matches_read_excel(tmp_path, seed):
+    path = tmp_path / 'w.xlsx'
+    random_workbook(path, random.Random(seed))
+    expected = pd.read_excel(path, sheet_name='S', dtype=str)
+    for chunk_size in (1, 2, 7, 1000):
+        pd.testing.assert_frame_equal(read_sheet(str(path), 'S', chunk_size), expected)
+
+
+def test_cells_beyond_header_become_unnamed_columns(tmp_path):
+    path = tmp_path / 'w.xlsx'
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = 'S'
+    for row in (['a', 'b'], ['1'], ['1', '2', '3'], ['4']):
+        sheet.append(row)
+    workbook.save(path)
+    chunks = list(iter_sheet_chunks(str(path), 'S', 1))
+    assert list(chunks[0].columns) == ['a', 'b']
+    assert list(chunks[1].columns) == ['a', 'b', 'Unnamed: 2']
+    assert chunks[2]['Unnamed: 2'].isna().all()
+